@@ -0,0 +1,211 @@
+"""Deadlines and admission control for MCP tool calls.
+
+``AdmissionMiddleware`` wraps every tool call, including the calls made
+through ``call_many``:
+
+- A call is admitted only while fewer than ``max_in_flight`` calls are
+  running in total and fewer than the tool's own limit are running for
+  that tool. Otherwise it is rejected at once. The error result carries a
+  retry-after hint, derived from how long recent calls took, in its text
+  and as ``meta["retry_after_seconds"]``. A full tool executor queue
+  (``ToolBusyError``) is reported the same way.
+- Admitted calls get the tool's deadline. When the deadline passes, the
+  progress reporters of the call are cancelled, so pool work that is
+  running stops at its next progress checkpoint, and the call itself is
+  cancelled, which drops executor work that has not started. Work without
+  checkpoints runs on after the call has timed out and keeps its executor
+  slot; the executor reports it as abandoned.
+
+Limits and deadlines come from settings as ``tool=value`` lists with a
+default for every other tool; 0 means unlimited.
+"""
+import asyncio
+import threading
+import time
+from typing import Any, Dict, Iterable, Mapping, Optional
+
+from fastmcp.server.middleware import Middleware, MiddlewareContext
+from fastmcp.tools import ToolResult
+
+import settings
+from execution import ToolBusyError
+from progress import ProgressReporter, call_reporters
+
+MIN_RETRY_AFTER = 0.05
+MAX_RETRY_AFTER = 30.0
+# Weight of the newest call in the running average of call durations
+DURATION_SMOOTHING = 0.2
+
+
+def parse_tool_values(spec: str) -> Mapping[str, float]:
+    """Parse ``tool=number,tool=number`` overrides."""
+    values = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        tool, _, value = item.partition("=")
+        try:
+            values[tool.strip()] = float(value)
+        except ValueError:
+            raise ValueError(f"Invalid value for {tool.strip()!r}: {value.strip()!r}")
+    return values
+
+
+def _cancel_all(reporters: Iterable[ProgressReporter]) -> None:
+    for reporter in reporters:
+        reporter.cancel()
+
+
+class ToolCallStats:
+    """Counters and the running average duration of one tool, or of all tools."""
+
+    __slots__ = ("in_flight", "admitted", "rejected", "timed_out", "failed", "average_seconds")
+
+    def __init__(self):
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.failed = 0
+        self.average_seconds: Optional[float] = None
+
+    def finished(self, seconds: float) -> None:
+        self.in_flight -= 1
+        if self.average_seconds is None:
+            self.average_seconds = seconds
+        else:
+            self.average_seconds += DURATION_SMOOTHING * (seconds - self.average_seconds)
+
+    def retry_after(self) -> float:
+        """Expected wait until one of the running calls finishes."""
+        if not self.average_seconds or not self.in_flight:
+            return MIN_RETRY_AFTER
+        return min(MAX_RETRY_AFTER, max(MIN_RETRY_AFTER, self.average_seconds / self.in_flight))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "failed": self.failed,
+            "average_ms": round(self.average_seconds * 1000, 2) if self.average_seconds is not None else None
+        }
+
+
+class AdmissionMiddleware(Middleware):
+    """Caps concurrent tool calls and enforces per-tool deadlines."""
+
+    def __init__(
+        self,
+        max_in_flight: int,
+        tool_max_in_flight: int,
+        tool_limits: Mapping[str, float],
+        default_timeout: float,
+        tool_timeouts: Mapping[str, float]
+    ):
+        self.max_in_flight = max_in_flight
+        self.tool_max_in_flight = tool_max_in_flight
+        self.tool_limits = dict(tool_limits)
+        self.default_timeout = default_timeout
+        self.tool_timeouts = dict(tool_timeouts)
+        self._total = ToolCallStats()
+        self._tools: Dict[str, ToolCallStats] = {}
+        # Nested calls finish on the same loop, but stats() may be read from any thread
+        self._lock = threading.Lock()
+
+    def limit_for(self, tool: str) -> int:
+        return int(self.tool_limits.get(tool, self.tool_max_in_flight))
+
+    def timeout_for(self, tool: str) -> Optional[float]:
+        timeout = self.tool_timeouts.get(tool, self.default_timeout)
+        return timeout if timeout > 0 else None
+
+    def _admit(self, tool: str) -> Optional[ToolCallStats]:
+        """Reserve a slot for a call, or return the stats that refused it."""
+        with self._lock:
+            stats = self._tools.setdefault(tool, ToolCallStats())
+            limit = self.limit_for(tool)
+            if limit and stats.in_flight >= limit:
+                refused = stats
+            elif self.max_in_flight and self._total.in_flight >= self.max_in_flight:
+                refused = self._total
+            else:
+                for counters in (stats, self._total):
+                    counters.in_flight += 1
+                    counters.admitted += 1
+                return None
+            stats.rejected += 1
+            self._total.rejected += 1
+            return refused
+
+    def _release(self, tool: str, seconds: float, outcome: Optional[str]) -> None:
+        with self._lock:
+            for counters in (self._tools[tool], self._total):
+                counters.finished(seconds)
+                if outcome == "rejected":
+                    counters.rejected += 1
+                elif outcome == "timed_out":
+                    counters.timed_out += 1
+                elif outcome == "failed":
+                    counters.failed += 1
+
+    @staticmethod
+    def _overloaded(message: str, retry_after: float) -> ToolResult:
+        retry_after = round(retry_after, 2)
+        return ToolResult(
+            content=f"{message}. Retry after {retry_after} seconds.",
+            meta={"retry_after_seconds": retry_after},
+            is_error=True
+        )
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next) -> Any:
+        tool = context.message.name
+        refused = self._admit(tool)
+        if refused is not None:
+            scope = "the server" if refused is self._total else tool
+            return self._overloaded(f"Too many concurrent calls to {scope}", refused.retry_after())
+
+        timeout = self.timeout_for(tool)
+        started = time.perf_counter()
+        outcome = None
+        expire = None
+        try:
+            with call_reporters() as reporters:
+                if timeout is not None:
+                    # Stop cooperative pool work at the deadline, before the call's
+                    # own cancellation has gone through
+                    expire = asyncio.get_running_loop().call_later(timeout, _cancel_all, reporters)
+                return await asyncio.wait_for(call_next(context), timeout)
+        except asyncio.TimeoutError:
+            outcome = "timed_out"
+            return ToolResult(content=f"{tool} did not finish within {timeout:g} seconds", is_error=True)
+        except Exception as e:
+            # fastmcp reports tool exceptions as a ToolError caused by them
+            busy = e if isinstance(e, ToolBusyError) else e.__cause__
+            if isinstance(busy, ToolBusyError):
+                outcome = "rejected"
+                return self._overloaded(str(busy), self._tools[tool].retry_after())
+            outcome = "failed"
+            raise
+        finally:
+            if expire is not None:
+                expire.cancel()
+            self._release(tool, time.perf_counter() - started, outcome)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_in_flight": self.max_in_flight,
+                **self._total.to_dict(),
+                "tools": {tool: stats.to_dict() for tool, stats in sorted(self._tools.items())}
+            }
+
+
+def create_admission_middleware() -> AdmissionMiddleware:
+    """Admission control configured from settings."""
+    return AdmissionMiddleware(
+        settings.MAX_CONCURRENT_TOOL_CALLS,
+        settings.TOOL_MAX_CONCURRENCY,
+        parse_tool_values(settings.TOOL_CONCURRENCY_LIMITS),
+        settings.TOOL_TIMEOUT_SECONDS,
+        parse_tool_values(settings.TOOL_TIMEOUTS)
+    )
@@ -0,0 +1,263 @@
+"""Many tool calls in one round trip.
+
+``run_calls`` backs the ``call_many`` tool. It runs a list of tool calls
+concurrently with at most ``max_parallel`` running at a time and returns
+one entry per call, in request order. A failing call is reported in its
+own entry and does not affect the others.
+
+``JSONRPCBatchMiddleware`` adds JSON-RPC 2.0 batch arrays to the MCP
+streamable HTTP endpoint. The MCP transport itself only takes one message
+per POST. The middleware splits an array into single messages, sends them
+concurrently through the wrapped app with the original headers (and so the
+same session), and answers with an array of the responses. Notifications
+get no entry, as JSON-RPC specifies.
+
+When tracing is on, the middleware also puts the HTTP request's
+``traceparent`` into the ``_meta`` of requests that have none, so tool
+calls continue the trace of the HTTP request that carried them.
+"""
+import asyncio
+import json
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from tracing import tracer
+
+ToolCaller = Callable[[str, Dict[str, Any]], Awaitable[Any]]
+
+INVALID_REQUEST = -32600
+PARSE_ERROR = -32700
+
+
+def _validate_calls(calls: List[Dict[str, Any]], max_calls: int) -> None:
+    if len(calls) > max_calls:
+        raise ValueError(f"At most {max_calls} calls are allowed per batch")
+    for index, call in enumerate(calls):
+        if not isinstance(call, dict) or not isinstance(call.get("name"), str):
+            raise ValueError(f"Call {index} needs a tool name")
+        if not isinstance(call.get("arguments", {}), dict):
+            raise ValueError(f"Arguments of call {index} must be an object")
+
+
+async def run_calls(
+    call_tool: ToolCaller,
+    calls: List[Dict[str, Any]],
+    max_parallel: int,
+    max_calls: int,
+    on_result: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> List[Dict[str, Any]]:
+    """Run ``{"name", "arguments"}`` calls concurrently; results keep the call order.
+
+    ``on_result`` sees each entry as soon as its call finishes.
+    """
+    _validate_calls(calls, max_calls)
+    semaphore = asyncio.Semaphore(max(1, max_parallel))
+
+    async def run(index: int, call: Dict[str, Any]) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                result = await call_tool(call["name"], call.get("arguments") or {})
+                entry = {"index": index, "name": call["name"], "ok": True, "result": result}
+            except Exception as e:
+                entry = {"index": index, "name": call["name"], "ok": False, "error": str(e) or type(e).__name__}
+        if on_result is not None:
+            on_result(entry)
+        return entry
+
+    return await asyncio.gather(*(run(index, call) for index, call in enumerate(calls)))
+
+
+def _error(code: int, message: str, request_id: Any = None) -> Dict[str, Any]:
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+
+def _with_trace_context(message: Dict[str, Any]) -> bool:
+    """Add the current traceparent to a request's _meta; True if the message changed."""
+    span = tracer.current()
+    params = message.get("params")
+    if span is None or "id" not in message or not isinstance(params, dict):
+        return False
+    meta = params.setdefault("_meta", {})
+    if not isinstance(meta, dict) or "traceparent" in meta:
+        return False
+    meta["traceparent"] = span.traceparent
+    return True
+
+
+def _json_response_messages(content_type: str, body: bytes) -> List[Dict[str, Any]]:
+    """JSON-RPC messages of a response sent as JSON or as a server-sent event stream."""
+    if not body.strip():
+        return []
+    if content_type.startswith("text/event-stream"):
+        messages = []
+        for event in body.decode("utf-8").replace("\r\n", "\n").split("\n\n"):
+            data = "\n".join(line[5:].lstrip() for line in event.split("\n") if line.startswith("data:"))
+            if data:
+                messages.append(json.loads(data))
+        return messages
+    message = json.loads(body)
+    return message if isinstance(message, list) else [message]
+
+
+class JSONRPCBatchMiddleware:
+    """Accepts JSON-RPC batch arrays on ``path`` and passes everything else through."""
+
+    def __init__(self, app: ASGIApp, path: str, max_parallel: int, max_calls: int):
+        self.app = app
+        self.path = path.rstrip("/")
+        self.max_parallel = max(1, max_parallel)
+        self.max_calls = max_calls
+        self.batches = 0
+        self.batched_messages = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"].rstrip("/") != self.path:
+            await self.app(scope, receive, send)
+            return
+
+        body = await self._read_body(receive)
+        if not body.lstrip().startswith(b"["):
+            if tracer.enabled:
+                scope, body = self._traced_single(scope, body)
+            await self.app(scope, self._replay(body, receive), send)
+            return
+
+        try:
+            messages = json.loads(body)
+        except ValueError:
+            await self._respond(send, 400, [_error(PARSE_ERROR, "Parse error")])
+            return
+        if not messages:
+            await self._respond(send, 400, [_error(INVALID_REQUEST, "Empty batch")])
+            return
+        if len(messages) > self.max_calls:
+            await self._respond(send, 400, [_error(INVALID_REQUEST, f"At most {self.max_calls} messages per batch")])
+            return
+
+        self.batches += 1
+        self.batched_messages += len(messages)
+        semaphore = asyncio.Semaphore(self.max_parallel)
+
+        async def dispatch(message: Any) -> Tuple[List[Dict[str, Any]], List[Tuple[bytes, bytes]]]:
+            if not isinstance(message, dict):
+                return [_error(INVALID_REQUEST, "Invalid Request")], []
+            async with semaphore:
+                return await self._dispatch_one(scope, message)
+
+        outcomes = await asyncio.gather(*(dispatch(message) for message in messages))
+        responses = [response for replies, _ in outcomes for response in replies]
+        # The session id of an initialize inside the batch has to reach the client
+        session_headers = next((headers for _, headers in outcomes if headers), [])
+        if responses:
+            await self._respond(send, 200, responses, session_headers)
+        else:
+            await self._respond(send, 202, None, session_headers)
+
+    @staticmethod
+    def _with_body(scope: Scope, body: bytes) -> Scope:
+        headers = [(name, value) for name, value in scope["headers"] if name != b"content-length"]
+        headers.append((b"content-length", str(len(body)).encode("ascii")))
+        return dict(scope, headers=headers)
+
+    def _traced_single(self, scope: Scope, body: bytes) -> Tuple[Scope, bytes]:
+        try:
+            message = json.loads(body)
+        except ValueError:
+            return scope, body
+        if not isinstance(message, dict) or not _with_trace_context(message):
+            return scope, body
+        body = json.dumps(message).encode("utf-8")
+        return self._with_body(scope, body), body
+
+    async def _dispatch_one(
+        self, scope: Scope, message: Dict[str, Any]
+    ) -> Tuple[List[Dict[str, Any]], List[Tuple[bytes, bytes]]]:
+        with tracer.span(f"jsonrpc {message.get('method')}"):
+            _with_trace_context(message)
+            body = json.dumps(message).encode("utf-8")
+            status, response_headers, response_body = await self._capture(
+                self._with_body(scope, body), self._replay(body)
+            )
+
+        content_type = dict(response_headers).get(b"content-type", b"").decode("latin-1")
+        session_headers = [(name, value) for name, value in response_headers if name == b"mcp-session-id"]
+        request_id = message.get("id")
+        try:
+            replies = _json_response_messages(content_type, response_body)
+        except ValueError:
+            replies = []
+        if request_id is None:
+            return [], session_headers
+        # Keep only the answer to this request, not notifications streamed before it
+        replies = [reply for reply in replies if "id" in reply and ("result" in reply or "error" in reply)]
+        for reply in replies:
+            if reply.get("id") is None:
+                reply["id"] = request_id
+        if not replies:
+            replies = [_error(INVALID_REQUEST, f"HTTP {status} without a JSON-RPC response", request_id)]
+        return replies[:1], session_headers
+
+    async def _capture(self, scope: Scope, receive: Receive) -> Tuple[int, List[Tuple[bytes, bytes]], bytes]:
+        status = 500
+        headers: List[Tuple[bytes, bytes]] = []
+        chunks: List[bytes] = []
+
+        async def send(message: Message) -> None:
+            nonlocal status, headers
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = [(name.lower(), value) for name, value in message.get("headers", [])]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, send)
+        return status, headers, b"".join(chunks)
+
+    @staticmethod
+    async def _read_body(receive: Receive) -> bytes:
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                break
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        return b"".join(chunks)
+
+    @staticmethod
+    def _replay(body: bytes, then: Optional[Receive] = None) -> Receive:
+        """A receive channel that delivers an already read body first."""
+        sent = False
+
+        async def receive() -> Message:
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            if then is not None:
+                return await then()
+            # Messages of a batch share one client connection; behave as if
+            # each stays connected until its response is complete
+            await asyncio.Event().wait()
+            return {"type": "http.disconnect"}
+
+        return receive
+
+    @staticmethod
+    async def _respond(
+        send: Send,
+        status: int,
+        payload: Optional[List[Dict[str, Any]]],
+        extra_headers: Optional[List[Tuple[bytes, bytes]]] = None
+    ) -> None:
+        body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+        headers = [(b"content-length", str(len(body)).encode("ascii"))] + list(extra_headers or [])
+        if payload is not None:
+            headers.append((b"content-type", b"application/json"))
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    def stats(self) -> Dict[str, int]:
+        return {"batches": self.batches, "batched_messages": self.batched_messages}
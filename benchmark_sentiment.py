@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Benchmark for batch sentiment scoring
+"""
+import random
+import sys
+import time
+
+from sentiment import LEXICON, score_sentiments
+
+FILLER = "the a to of and in it is was for on with as at by this that we our todo task".split()
+MODIFIERS = ["not", "very", "really", "never", "slightly", "extremely"]
+
+
+def make_texts(count, words_per_text, seed=42):
+    """Build a reproducible batch of synthetic review-like texts"""
+    rng = random.Random(seed)
+    vocabulary = list(LEXICON) + FILLER * 10 + MODIFIERS * 3
+    return [" ".join(rng.choice(vocabulary) for _ in range(words_per_text)) for _ in range(count)]
+
+
+def benchmark(count=5000, words_per_text=40, rounds=5):
+    """Time score_sentiments over a batch and report throughput"""
+    texts = make_texts(count, words_per_text)
+    score_sentiments(texts[:100])  # warm up
+
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = score_sentiments(texts)
+        timings.append(time.perf_counter() - start)
+
+    best = min(timings)
+    print("Sentiment Batch Benchmark")
+    print("=" * 50)
+    print(f"Lexicon entries:   {len(LEXICON)}")
+    print(f"Texts per batch:   {count} ({words_per_text} words each)")
+    print(f"Best batch time:   {best * 1000:.1f} ms (of {rounds} rounds)")
+    print(f"Throughput:        {count / best:,.0f} texts/s, {count * words_per_text / best:,.0f} tokens/s")
+    print(f"Label counts:      {result['label_counts']}")
+
+
+if __name__ == "__main__":
+    benchmark(count=int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -0,0 +1,50 @@
+"""A compact Bloom filter for fast, memory-light membership checks."""
+import hashlib
+import math
+from typing import Iterable
+
+
+class BloomFilter:
+    """Probabilistic set: no false negatives, tunable false-positive rate.
+
+    Bit positions come from double hashing of a single BLAKE2b digest, so
+    every lookup costs one hash plus a fixed number of bit tests.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        capacity = max(1, capacity)
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    @classmethod
+    def from_iterable(cls, items: Iterable[str], error_rate: float = 0.001) -> "BloomFilter":
+        items = list(items)
+        bloom = cls(len(items), error_rate)
+        for item in items:
+            bloom.add(item)
+        return bloom
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        size = self.size
+        for i in range(self.hash_count):
+            yield (first + i * second) % size
+
+    def add(self, item: str) -> None:
+        bits = self._bits
+        for position in self._positions(item):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self._bits)
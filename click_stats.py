@@ -0,0 +1,213 @@
+"""Click analytics for short URLs.
+
+Recording a click only increments a counter in one of several pending
+shards. A background task on the event loop periodically swaps the shards
+out, folds them into per-code ring buffers of minute, hour and day buckets,
+and persists daily totals to SQLite from a worker thread.
+
+``record``, ``fold`` and ``code_stats`` must all be called from the event
+loop thread, which is what lets the hot path run without locks. SQLite is
+only touched from worker threads. Persisting and ``code_stats`` take turns
+under one asyncio lock, so a total never counts clicks both as persisted
+and as pending.
+"""
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from array import array
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+NUM_SHARDS = 16
+FLUSH_INTERVAL = 1.0
+PERSIST_INTERVAL = 10.0
+
+# (name, bucket width in seconds, buckets kept)
+RESOLUTIONS = (
+    ("minute", 60, 60),
+    ("hour", 3600, 48),
+    ("day", 86400, 30),
+)
+
+
+class RingCounter:
+    """Fixed number of time buckets; a slot is reset when its bucket expires."""
+
+    __slots__ = ("width", "counts", "stamps")
+
+    def __init__(self, width: int, size: int):
+        self.width = width
+        self.counts = array("Q", bytes(8 * size))
+        self.stamps = array("q", [-1] * size)
+
+    def count(self, timestamp: float) -> int:
+        """Clicks in the bucket holding ``timestamp``, 0 once it has expired."""
+        bucket = int(timestamp // self.width)
+        slot = bucket % len(self.counts)
+        return self.counts[slot] if self.stamps[slot] == bucket else 0
+
+    def add(self, timestamp: float, amount: int) -> None:
+        bucket = int(timestamp // self.width)
+        slot = bucket % len(self.counts)
+        if self.stamps[slot] != bucket:
+            self.stamps[slot] = bucket
+            self.counts[slot] = 0
+        self.counts[slot] += amount
+
+    def series(self, now: float) -> List[Dict[str, Any]]:
+        """Bucket counts from oldest to newest, ending with the current bucket."""
+        current = int(now // self.width)
+        size = len(self.counts)
+        points = []
+        for bucket in range(current - size + 1, current + 1):
+            slot = bucket % size
+            count = self.counts[slot] if self.stamps[slot] == bucket else 0
+            points.append({"start": bucket * self.width, "clicks": count})
+        return points
+
+
+class ClickCounters:
+    """Sharded click counters with time-bucketed history per short code."""
+
+    def __init__(self, db_path: str, num_shards: int = NUM_SHARDS):
+        self._pending = [Counter() for _ in range(num_shards)]
+        self._rings: Dict[str, Dict[str, RingCounter]] = {}
+        # Codes whose day history includes totals persisted by earlier runs
+        self._seeded = set()
+        self._unpersisted = Counter()
+        self._task: Optional[asyncio.Task] = None
+        self._storage_lock = asyncio.Lock()
+        self._db_lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        with self._db_lock:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS click_counts ("
+                "code TEXT NOT NULL, day INTEGER NOT NULL, clicks INTEGER NOT NULL, "
+                "PRIMARY KEY (code, day))"
+            )
+            self._db.commit()
+
+    def record(self, code: str) -> None:
+        """Count one click. This is the redirect hot path."""
+        self._pending[hash(code) % len(self._pending)][code] += 1
+
+    def fold(self, now: Optional[float] = None) -> None:
+        """Move pending clicks into the ring buffers, one shard at a time."""
+        now = time.time() if now is None else now
+        day = int(now // 86400)
+        for index, shard in enumerate(self._pending):
+            if not shard:
+                continue
+            self._pending[index] = Counter()
+            for code, clicks in shard.items():
+                for ring in self._rings_for(code).values():
+                    ring.add(now, clicks)
+                self._unpersisted[(code, day)] += clicks
+
+    def _rings_for(self, code: str) -> Dict[str, RingCounter]:
+        rings = self._rings.get(code)
+        if rings is None:
+            rings = self._rings[code] = {name: RingCounter(width, size) for name, width, size in RESOLUTIONS}
+        return rings
+
+    def _persist(self, deltas: Counter) -> None:
+        with self._db_lock:
+            self._db.executemany(
+                "INSERT INTO click_counts (code, day, clicks) VALUES (?, ?, ?) "
+                "ON CONFLICT (code, day) DO UPDATE SET clicks = clicks + excluded.clicks",
+                [(code, day, clicks) for (code, day), clicks in deltas.items()]
+            )
+            self._db.commit()
+
+    def _read(self, code: str, oldest_day: Optional[int]) -> Tuple[int, List[Tuple[int, int]]]:
+        """Persisted total of a code, plus its daily totals from ``oldest_day`` on if asked for."""
+        with self._db_lock:
+            total = self._db.execute(
+                "SELECT COALESCE(SUM(clicks), 0) FROM click_counts WHERE code = ?", (code,)
+            ).fetchone()[0]
+            rows = []
+            if oldest_day is not None:
+                rows = self._db.execute(
+                    "SELECT day, clicks FROM click_counts WHERE code = ? AND day >= ?", (code, oldest_day)
+                ).fetchall()
+        return total, rows
+
+    async def persist(self) -> None:
+        """Write accumulated daily deltas to storage off the event loop."""
+        async with self._storage_lock:
+            if not self._unpersisted:
+                return
+            deltas, self._unpersisted = self._unpersisted, Counter()
+            try:
+                await asyncio.to_thread(self._persist, deltas)
+            except Exception:
+                self._unpersisted.update(deltas)
+                raise
+
+    @staticmethod
+    def _seed(ring: RingCounter, rows: List[Tuple[int, int]], unsaved: Counter) -> None:
+        """Add the daily totals persisted by earlier runs to a day ring.
+
+        Until it is seeded, the ring holds exactly the clicks of this run, so
+        the part of a stored total that came from this run is the ring's
+        count minus what is still pending.
+        """
+        for day, clicks in rows:
+            this_run = ring.count(day * 86400) - unsaved[day]
+            ring.add(day * 86400, clicks - this_run)
+
+    async def _run(self) -> None:
+        last_persist = time.monotonic()
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL)
+            self.fold()
+            if time.monotonic() - last_persist >= PERSIST_INTERVAL:
+                last_persist = time.monotonic()
+                try:
+                    await self.persist()
+                except Exception:
+                    logger.exception("Failed to persist click counts; will retry")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.fold()
+        await self.persist()
+
+    async def code_stats(self, code: str) -> Dict[str, Any]:
+        """Click totals and minute/hour/day series for one short code."""
+        now = time.time()
+        # Nothing is persisted while the lock is held, so the stored totals
+        # and the pending deltas do not overlap
+        async with self._storage_lock:
+            oldest_day = int(now // 86400) - RESOLUTIONS[-1][2] + 1
+            persisted, rows = await asyncio.to_thread(
+                self._read, code, None if code in self._seeded else oldest_day
+            )
+            self.fold(now)
+            unsaved = Counter()
+            for (c, day), clicks in self._unpersisted.items():
+                if c == code:
+                    unsaved[day] += clicks
+            rings = self._rings_for(code)
+            if code not in self._seeded:
+                self._seed(rings["day"], rows, unsaved)
+                self._seeded.add(code)
+        return {
+            "short_code": code,
+            "total_clicks": persisted + sum(unsaved.values()),
+            **{f"by_{name}": rings[name].series(now) for name, _, _ in RESOLUTIONS}
+        }
@@ -0,0 +1,109 @@
+"""Single-flight execution of identical concurrent tool calls.
+
+Agents that fan out often send the same call several times at once. For
+tools tagged ``SINGLE_FLIGHT``, ``SingleFlightMiddleware`` runs only the
+first of a set of identical calls in flight. The others wait for it and
+get the same result, or the same error. Calls are identical when the tool
+name and the canonical JSON of the arguments (sorted keys, no whitespace)
+match.
+
+Only calls that overlap in time are merged. Nothing is cached: a call that
+arrives after the shared one finished runs again. Tagging is therefore safe
+for any tool that returns the same answer to concurrent identical calls
+and has no side effects, which excludes password generation and the
+``create_*`` tools.
+
+Followers share the leader's execution and nothing else: they get no
+progress notifications or partial results, since those go to the leader's
+progress token, and their spans and profiles contain none of the shared
+work. Tools that report progress are therefore not tagged. A call whose
+``_meta`` asks for a profile always runs on its own, so that its profile
+shows its work.
+
+The middleware is added ahead of admission control, so followers take no
+admission slot. The shared execution is cancelled only when every caller
+waiting on it has gone.
+"""
+import asyncio
+import json
+from typing import Any, Dict, Tuple
+
+from fastmcp.server.middleware import Middleware, MiddlewareContext
+
+from profiling import PROFILE_META_KEY
+from tracing import request_meta
+
+SINGLE_FLIGHT = "single_flight"
+
+
+def call_key(tool: str, arguments: Dict[str, Any]) -> Tuple[str, str]:
+    """Tool name plus canonical JSON of its arguments."""
+    return tool, json.dumps(arguments or {}, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlightMiddleware(Middleware):
+    """Merges identical concurrent calls of tools tagged ``SINGLE_FLIGHT``."""
+
+    def __init__(self):
+        self._flights: Dict[Tuple[str, str], _Flight] = {}
+        self._opted_in: Dict[str, bool] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    async def _is_opted_in(self, context: MiddlewareContext, tool_name: str) -> bool:
+        opted_in = self._opted_in.get(tool_name)
+        if opted_in is None:
+            server = context.fastmcp_context.fastmcp if context.fastmcp_context is not None else None
+            tool = await server.get_tool(tool_name) if server is not None else None
+            opted_in = tool is not None and SINGLE_FLIGHT in (tool.tags or set())
+            if tool is not None:
+                self._opted_in[tool_name] = opted_in
+        return opted_in
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next) -> Any:
+        tool = context.message.name
+        if PROFILE_META_KEY in request_meta(context) or not await self._is_opted_in(context, tool):
+            return await call_next(context)
+
+        self.calls += 1
+        key = call_key(tool, context.message.arguments)
+        flight = self._flights.get(key)
+        if flight is None:
+            self.executions += 1
+            flight = _Flight(asyncio.get_running_loop().create_task(call_next(context)))
+            flight.task.add_done_callback(lambda _task, key=key, flight=flight: self._land(key, flight))
+            self._flights[key] = flight
+        else:
+            self.coalesced += 1
+
+        flight.waiters += 1
+        try:
+            # Shielded so that one caller going away does not cancel the call for the others
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if not flight.waiters and not flight.task.done():
+                flight.task.cancel()
+
+    def _land(self, key: Tuple[str, str], flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "hit_rate": round(self.coalesced / self.calls, 4) if self.calls else 0.0,
+            "in_flight": len(self._flights),
+            "tools": sorted(tool for tool, opted_in in self._opted_in.items() if opted_in)
+        }
@@ -0,0 +1,320 @@
+"""Color conversions, naming and harmonies over NumPy batches.
+
+Conversions take and return ``(n, 3)`` arrays:
+
+- RGB channels are 0-255 sRGB;
+- HSL is hue in degrees, then saturation and lightness in percent;
+- CIELAB uses the D65 white point.
+
+Colors are named after their nearest neighbour, in CIELAB, among the CSS
+named colors bundled in ``data/color_names.tsv``. The lookup goes through
+a KD-tree that is built once at import.
+"""
+import os
+import random
+import re
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+COLOR_NAMES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "color_names.tsv")
+
+# Hue offsets in degrees of each harmony, the base color included
+HARMONIES = MappingProxyType({
+    "complementary": (0, 180),
+    "analogous": (-30, 0, 30),
+    "triadic": (0, 120, 240),
+    "split_complementary": (0, 150, 210),
+    "tetradic": (0, 90, 180, 270),
+})
+
+MAX_PALETTE_COLORS = 1000
+
+_SRGB_TO_XYZ = np.array([
+    [0.4124564, 0.3575761, 0.1804375],
+    [0.2126729, 0.7151522, 0.0721750],
+    [0.0193339, 0.1191920, 0.9503041],
+])
+_XYZ_TO_SRGB = np.linalg.inv(_SRGB_TO_XYZ)
+_D65_WHITE = np.array([0.95047, 1.0, 1.08883])
+_LAB_DELTA = 6 / 29
+
+_HEX_RE = re.compile(r"#?([0-9a-fA-F]{6}|[0-9a-fA-F]{3})")
+_RGB_RE = re.compile(r"rgb\(\s*(\d{1,3})\s*,\s*(\d{1,3})\s*,\s*(\d{1,3})\s*\)", re.IGNORECASE)
+
+
+# Conversions
+
+def rgb_to_hsl(rgb: np.ndarray) -> np.ndarray:
+    rgb = np.asarray(rgb, dtype=np.float64) / 255
+    high = rgb.max(axis=1)
+    low = rgb.min(axis=1)
+    chroma = high - low
+    lightness = (high + low) / 2
+
+    safe_chroma = np.where(chroma == 0, 1, chroma)
+    r, g, b = rgb.T
+    hue = np.select(
+        [chroma == 0, high == r, high == g],
+        [0.0, ((g - b) / safe_chroma) % 6, (b - r) / safe_chroma + 2],
+        (r - g) / safe_chroma + 4
+    ) * 60
+    denominator = 1 - np.abs(2 * lightness - 1)
+    saturation = np.where(denominator == 0, 0.0, chroma / np.where(denominator == 0, 1, denominator))
+    return np.stack([hue % 360, saturation * 100, lightness * 100], axis=1)
+
+
+def hsl_to_rgb(hsl: np.ndarray) -> np.ndarray:
+    hsl = np.asarray(hsl, dtype=np.float64)
+    hue = (hsl[:, 0] % 360) / 60
+    saturation = np.clip(hsl[:, 1], 0, 100) / 100
+    lightness = np.clip(hsl[:, 2], 0, 100) / 100
+    chroma = (1 - np.abs(2 * lightness - 1)) * saturation
+    x = chroma * (1 - np.abs(hue % 2 - 1))
+    zero = np.zeros_like(chroma)
+    sector = hue.astype(int) % 6
+    r = np.choose(sector, [chroma, x, zero, zero, x, chroma])
+    g = np.choose(sector, [x, chroma, chroma, x, zero, zero])
+    b = np.choose(sector, [zero, zero, x, chroma, chroma, x])
+    match = (lightness - chroma / 2)[:, None]
+    return (np.stack([r, g, b], axis=1) + match) * 255
+
+
+def rgb_to_lab(rgb: np.ndarray) -> np.ndarray:
+    srgb = np.asarray(rgb, dtype=np.float64) / 255
+    linear = np.where(srgb <= 0.04045, srgb / 12.92, ((srgb + 0.055) / 1.055) ** 2.4)
+    xyz = linear @ _SRGB_TO_XYZ.T / _D65_WHITE
+    f = np.where(xyz > _LAB_DELTA ** 3, np.cbrt(xyz), xyz / (3 * _LAB_DELTA ** 2) + 4 / 29)
+    return np.stack([116 * f[:, 1] - 16, 500 * (f[:, 0] - f[:, 1]), 200 * (f[:, 1] - f[:, 2])], axis=1)
+
+
+def lab_to_rgb(lab: np.ndarray) -> np.ndarray:
+    """sRGB for CIELAB colors; colors outside the sRGB gamut are clipped."""
+    lab = np.asarray(lab, dtype=np.float64)
+    fy = (lab[:, 0] + 16) / 116
+    f = np.stack([fy + lab[:, 1] / 500, fy, fy - lab[:, 2] / 200], axis=1)
+    xyz = np.where(f > _LAB_DELTA, f ** 3, 3 * _LAB_DELTA ** 2 * (f - 4 / 29)) * _D65_WHITE
+    linear = np.clip(xyz @ _XYZ_TO_SRGB.T, 0, 1)
+    srgb = np.where(linear <= 0.0031308, linear * 12.92, 1.055 * linear ** (1 / 2.4) - 0.055)
+    return srgb * 255
+
+
+_CONVERSIONS = {
+    ("rgb", "hsl"): rgb_to_hsl,
+    ("hsl", "rgb"): hsl_to_rgb,
+    ("rgb", "lab"): rgb_to_lab,
+    ("lab", "rgb"): lab_to_rgb,
+}
+COLOR_SPACES = ("rgb", "hsl", "lab")
+
+
+def convert(colors: np.ndarray, source: str, target: str) -> np.ndarray:
+    """Convert an (n, 3) array between any two of the supported color spaces."""
+    if source not in COLOR_SPACES or target not in COLOR_SPACES:
+        raise ValueError(f"Color spaces must be one of: {', '.join(COLOR_SPACES)}")
+    colors = np.asarray(colors, dtype=np.float64).reshape(-1, 3)
+    if source == target:
+        return colors
+    if source != "rgb" and target != "rgb":
+        colors = _CONVERSIONS[(source, "rgb")](colors)
+        source = "rgb"
+    return _CONVERSIONS[(source, target)](colors)
+
+
+# Nearest named color
+
+class KDTree:
+    """Static three-dimensional k-d tree for nearest-neighbour queries."""
+
+    def __init__(self, points: np.ndarray):
+        self.points = np.asarray(points, dtype=np.float64)
+        count = len(self.points)
+        # Node i splits on axis[i] at point[i]; children are node indexes or -1
+        self.point = np.full(count, -1, dtype=np.intp)
+        self.axis = np.zeros(count, dtype=np.intp)
+        self.left = np.full(count, -1, dtype=np.intp)
+        self.right = np.full(count, -1, dtype=np.intp)
+        self._next = 0
+        self.root = self._build(np.arange(count), 0) if count else -1
+        # Queries walk the tree one node at a time, which is faster on lists
+        self._nodes = list(zip(self.point.tolist(), self.axis.tolist(), self.left.tolist(), self.right.tolist()))
+        self._coordinates = self.points.tolist()
+
+    def _build(self, indexes: np.ndarray, depth: int) -> int:
+        if len(indexes) == 0:
+            return -1
+        # Split on the axis with the widest spread
+        spread = np.ptp(self.points[indexes], axis=0)
+        axis = int(spread.argmax())
+        indexes = indexes[np.argsort(self.points[indexes, axis], kind="stable")]
+        middle = len(indexes) // 2
+        node = self._next
+        self._next += 1
+        self.point[node] = indexes[middle]
+        self.axis[node] = axis
+        self.left[node] = self._build(indexes[:middle], depth + 1)
+        self.right[node] = self._build(indexes[middle + 1:], depth + 1)
+        return node
+
+    def nearest(self, target: Sequence[float]) -> Tuple[int, float]:
+        """Index of the point closest to target and its distance."""
+        nodes = self._nodes
+        coordinates = self._coordinates
+        best_index, best_distance = -1, float("inf")
+        # Each entry holds a subtree and a lower bound on its squared distance
+        stack = [(self.root, 0.0)]
+        while stack:
+            node, bound = stack.pop()
+            if node < 0 or bound >= best_distance:
+                continue
+            index, axis, left, right = nodes[node]
+            point = coordinates[index]
+            distance = (point[0] - target[0]) ** 2 + (point[1] - target[1]) ** 2 + (point[2] - target[2]) ** 2
+            if distance < best_distance:
+                best_index, best_distance = index, distance
+            offset = target[axis] - point[axis]
+            near, far = (left, right) if offset < 0 else (right, left)
+            # Searched after the near side, the far side is usually pruned by then
+            stack.append((far, offset * offset))
+            stack.append((near, bound))
+        return int(best_index), best_distance ** 0.5
+
+    def query(self, targets: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Nearest point index and distance for each row of targets."""
+        results = [self.nearest(target) for target in np.asarray(targets, dtype=np.float64).tolist()]
+        indexes = np.array([index for index, _ in results], dtype=np.intp)
+        distances = np.array([distance for _, distance in results])
+        return indexes, distances
+
+
+def load_color_names(path: str = COLOR_NAMES_PATH) -> Mapping[str, str]:
+    """Read a ``name<TAB>#rrggbb`` table into a frozen mapping."""
+    names = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                name, hex_color = line.split("\t")
+                names[name] = hex_color
+    return MappingProxyType(names)
+
+
+NAMED_COLORS = load_color_names()
+# Aliases such as gray/grey share a color; index each color once under its first name
+_NAME_BY_HEX = {}
+for _name, _hex in NAMED_COLORS.items():
+    _NAME_BY_HEX.setdefault(_hex, _name)
+_INDEXED_NAMES = list(_NAME_BY_HEX.values())
+_INDEXED_RGB = np.array([[int(hex_color[i:i + 2], 16) for i in (1, 3, 5)] for hex_color in _NAME_BY_HEX])
+NAME_INDEX = KDTree(rgb_to_lab(_INDEXED_RGB))
+
+
+def nearest_color_names(rgb: np.ndarray) -> List[Tuple[str, float]]:
+    """Closest CSS color name and its CIELAB distance (delta E 1976) for each color."""
+    indexes, distances = NAME_INDEX.query(rgb_to_lab(rgb))
+    return [(_INDEXED_NAMES[index], round(float(distance), 2)) for index, distance in zip(indexes, distances)]
+
+
+# Parsing and formatting
+
+def parse_color(value: str) -> Tuple[int, int, int]:
+    """RGB of a ``#rrggbb``, ``#rgb``, ``rgb(r, g, b)`` or CSS color name string."""
+    text = value.strip()
+    match = _HEX_RE.fullmatch(text)
+    if match:
+        digits = match.group(1)
+        if len(digits) == 3:
+            digits = "".join(digit * 2 for digit in digits)
+        return int(digits[0:2], 16), int(digits[2:4], 16), int(digits[4:6], 16)
+    match = _RGB_RE.fullmatch(text)
+    if match and all(int(channel) <= 255 for channel in match.groups()):
+        return tuple(int(channel) for channel in match.groups())
+    named = NAMED_COLORS.get(text.lower().replace(" ", ""))
+    if named:
+        return parse_color(named)
+    raise ValueError(f"Unrecognised color: {value}")
+
+
+def describe_colors(rgb: np.ndarray) -> List[Dict[str, Any]]:
+    """Hex, RGB, HSL, CIELAB and nearest name of every color in a batch."""
+    rgb = np.clip(np.rint(np.asarray(rgb, dtype=np.float64).reshape(-1, 3)), 0, 255)
+    hsl = rgb_to_hsl(rgb)
+    lab = rgb_to_lab(rgb)
+    names = nearest_color_names(rgb)
+    described = []
+    for (r, g, b), (h, s, l), (lightness, a, b_axis), (name, distance) in zip(
+        rgb.astype(int).tolist(), hsl.tolist(), lab.tolist(), names
+    ):
+        described.append({
+            "hex": f"#{r:02x}{g:02x}{b:02x}",
+            "rgb": f"rgb({r}, {g}, {b})",
+            "hsl": f"hsl({round(h)}, {round(s)}%, {round(l)}%)",
+            "lab": [round(lightness, 2), round(a, 2), round(b_axis, 2)],
+            "name": name,
+            "name_distance": distance
+        })
+    return described
+
+
+# Harmonies
+
+def harmonies(base_rgb: np.ndarray, harmony: str) -> np.ndarray:
+    """Harmony colors for each base color, shaped (bases, colors in harmony, 3)."""
+    if harmony not in HARMONIES:
+        raise ValueError(f"harmony must be one of: {', '.join(HARMONIES)}")
+    base_hsl = rgb_to_hsl(np.asarray(base_rgb, dtype=np.float64).reshape(-1, 3))
+    offsets = np.array(HARMONIES[harmony], dtype=np.float64)
+    hsl = np.repeat(base_hsl[:, None, :], len(offsets), axis=1)
+    hsl[:, :, 0] = (hsl[:, :, 0] + offsets) % 360
+    return hsl_to_rgb(hsl.reshape(-1, 3)).reshape(len(base_hsl), len(offsets), 3)
+
+
+def generate_palette(
+    color_count: int = 5,
+    harmony: Optional[str] = None,
+    base_color: Optional[str] = None
+) -> Dict[str, Any]:
+    """A random palette, or a harmony around a base color, with every color described."""
+    if not 1 <= color_count <= MAX_PALETTE_COLORS:
+        raise ValueError(f"color_count must be between 1 and {MAX_PALETTE_COLORS}")
+    if harmony is None:
+        rgb = np.array([[random.randint(0, 255) for _ in range(3)] for _ in range(color_count)])
+        palette_name = "Random Palette"
+    else:
+        base = parse_color(base_color) if base_color else tuple(random.randint(0, 255) for _ in range(3))
+        colors = harmonies(np.array([base]), harmony)[0]
+        # Past the harmony's own colors, add lighter and darker tints of it
+        shades = [colors]
+        step = 1
+        while sum(len(shade) for shade in shades) < color_count:
+            hsl = rgb_to_hsl(colors)
+            hsl[:, 2] = np.clip(hsl[:, 2] + (12 * ((step + 1) // 2) * (1 if step % 2 else -1)), 5, 95)
+            shades.append(hsl_to_rgb(hsl))
+            step += 1
+        rgb = np.concatenate(shades)[:color_count]
+        palette_name = f"{harmony.replace('_', ' ').title()} Palette"
+
+    return {
+        "palette_name": palette_name,
+        "color_count": color_count,
+        "colors": describe_colors(rgb)
+    }
+
+
+def harmony_palettes(base_colors: List[str], harmony: str) -> List[Dict[str, Any]]:
+    """One described harmony per base color, computed as a single batch."""
+    base_rgb = np.array([parse_color(color) for color in base_colors], dtype=np.float64).reshape(-1, 3)
+    palettes = harmonies(base_rgb, harmony)
+    described = describe_colors(palettes.reshape(-1, 3))
+    size = palettes.shape[1]
+    return [
+        {"base_color": base, "colors": described[i * size:(i + 1) * size]}
+        for i, base in enumerate(base_colors)
+    ]
+
+
+def describe_color_strings(values: List[str]) -> List[Dict[str, Any]]:
+    """Parse color strings and describe them as one batch."""
+    rgb = np.array([parse_color(value) for value in values], dtype=np.float64).reshape(-1, 3)
+    return describe_colors(rgb)
@@ -1,20 +1,110 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, File, HTTPException, Request, UploadFile
+from fastapi.responses import HTMLResponse, RedirectResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from contextlib import asynccontextmanager
+import asyncio
+import json
+import uuid
 import uvicorn
 from datetime import datetime
-from fastmcp import FastMCP
+from fastmcp import Context, FastMCP
+from starlette.concurrency import run_in_threadpool
+
+import settings
+
+from text_analysis import TEXT_CHUNK_CHARS, analyze_texts as analyze_text_batch
+from uploads import MultipartTextAnalyzer, UploadTracker
+from sentiment import analyze_text_with_sentiment, score_sentiment, score_sentiments
+from keywords import KeywordIndex
+from similarity import DEFAULT_THRESHOLD as DUPLICATE_THRESHOLD, LSHIndex
+from passwords import (
+    DEFAULT_CHARACTER_SETS,
+    MIN_PROCESS_CHARACTERS,
+    build_alphabet,
+    check_password_strength as password_strength,
+    generate_passwords as generate_password_batch,
+)
+from url_store import ShortUrlStore, validate_url
+from click_stats import ClickCounters
+from qr_encoder import iter_qr_zip, render_qr_cached
+import file_tools
+import file_content
+from weather import create_weather_service
+from weather_history import WeatherHistory
+from palette import extract_palette, load_image
+import colors
+import numpy as np
+from execution import INLINE, PROCESS, THREAD, tool_executor
+from batch import JSONRPCBatchMiddleware, run_calls
+from progress import nested_call, tool_progress
+from admission import create_admission_middleware
+from coalescing import SINGLE_FLIGHT, SingleFlightMiddleware
+from metrics import HTTPMetricsMiddleware, MetricsRegistry, ToolMetricsMiddleware
+from tracing import ToolTracingMiddleware, TracedJSONResponse, TracingMiddleware, tracer
+from profiling import (
+    PROFILE_HEADER,
+    PROFILE_QUERY_PARAMETER,
+    PROFILES_PATH,
+    ProfilingMiddleware,
+    ToolProfilingMiddleware,
+    profiler,
+)
+from loop_monitor import SlowRequestMiddleware, SlowToolCallMiddleware, loop_monitor
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop background tasks and the MCP session manager with the web server"""
+    async with mcp_app.lifespan(app):
+        click_counters.start()
+        loop_monitor.start()
+        yield
+        await loop_monitor.stop()
+        await click_counters.stop()
+        await weather_service.aclose()
+        if tracer.exporter is not None:
+            tracer.exporter.shutdown()
 
 # Create FastAPI app
 app = FastAPI(
     title="Enhanced FastAPI App with MCP",
     description="A professional FastAPI application with integrated MCP server and beautiful frontend",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan,
+    default_response_class=TracedJSONResponse
 )
 
-# Create MCP server
+# Create MCP server; its HTTP transport is mounted into the FastAPI app below
 mcp = FastMCP(name="Enhanced FastAPI MCP Server")
+# Tracing and metrics see every call, including merged and rejected ones;
+# identical concurrent calls are merged before they count against admission limits
+metrics = MetricsRegistry()
+tool_single_flight = SingleFlightMiddleware()
+tool_admission = create_admission_middleware()
+mcp.add_middleware(ToolTracingMiddleware(tracer))
+if profiler.enabled:
+    mcp.add_middleware(ToolProfilingMiddleware(profiler))
+mcp.add_middleware(ToolMetricsMiddleware(metrics))
+mcp.add_middleware(SlowToolCallMiddleware(loop_monitor))
+mcp.add_middleware(tool_single_flight)
+mcp.add_middleware(tool_admission)
+if profiler.enabled:
+    app.add_middleware(ProfilingMiddleware, profiler=profiler)
+app.add_middleware(SlowRequestMiddleware, monitor=loop_monitor, upload_paths=["/analyze/upload"])
+app.add_middleware(HTTPMetricsMiddleware, registry=metrics, routes_app=app, mount_paths=[settings.MCP_HTTP_PATH])
+# Added last so that it runs first and the request span covers everything else
+app.add_middleware(TracingMiddleware, tracer=tracer)
+mcp_app = mcp.http_app(path=settings.MCP_HTTP_PATH)
+
+# These tools hand the executor progress reporters, in-process indexes or work
+# that itself uses the pools, none of which can move to a worker process
+tool_executor.restrict(
+    (
+        "text_analyzer", "analyze_texts", "sentiment_batch", "scan_directory", "hash_file",
+        "extract_keywords", "weather_history"
+    ),
+    (INLINE, THREAD)
+)
 
 # Pydantic models
 class User(BaseModel):
@@ -31,9 +121,48 @@ class CalculationRequest(BaseModel):
     a: float
     b: float
 
+class TextBatchRequest(BaseModel):
+    texts: List[str]
+
+class ShortenRequest(BaseModel):
+    url: str
+
+class ColorBatchRequest(BaseModel):
+    colors: List[str]
+
+class QRBatchRequest(BaseModel):
+    texts: List[str]
+    error_correction: str = "M"
+    output_format: str = "png"
+    scale: int = 8
+    border: int = 4
+
 # In-memory storage
 users_db = []
 todos_db = []
+upload_tracker = UploadTracker()
+todo_keywords = KeywordIndex()
+todo_similarity = LSHIndex()
+short_urls = ShortUrlStore(settings.SHORTENER_DB_PATH, settings.SHORTENER_CACHE_SIZE)
+click_counters = ClickCounters(settings.SHORTENER_DB_PATH)
+weather_history_store = WeatherHistory(
+    settings.WEATHER_HISTORY_DAYS, settings.WEATHER_HISTORY_CITIES, settings.WEATHER_SEED
+)
+weather_service = create_weather_service(weather_history_store)
+
+def store_todo(todo: Dict[str, Any]) -> None:
+    """Save a todo and update the indexes built over todo tasks."""
+    with tracer.span("todos.add"):
+        todo_similarity.add(len(todos_db), todo["task"])
+        todos_db.append(todo)
+        todo_keywords.add_document(todo["task"])
+
+def similar_todos(task: str, threshold: float = DUPLICATE_THRESHOLD, limit: int = 10) -> List[Dict[str, Any]]:
+    """Stored todos whose task is similar to the given one."""
+    return [
+        {"todo_id": todo_id, "similarity": round(similarity, 3), "todo": todos_db[todo_id]}
+        for todo_id, similarity in todo_similarity.query(task, threshold, limit)
+    ]
 
 # Enhanced MCP Tools
 @mcp.tool
@@ -55,26 +184,37 @@ def multiply_numbers(a: float, b: float) -> float:
 def create_user_mcp(name: str, email: str, age: int) -> Dict[str, Any]:
     """Create a new user via MCP."""
     user = {"name": name, "email": email, "age": age}
-    users_db.append(user)
+    with tracer.span("users.add"):
+        users_db.append(user)
     return {"message": "User created successfully", "user": user}
 
-@mcp.tool
+@mcp.tool(tags={SINGLE_FLIGHT})
 def get_all_users() -> Dict[str, Any]:
     """Get all users via MCP."""
     return {"users": users_db, "count": len(users_db)}
 
 @mcp.tool
-def create_todo_mcp(task: str) -> Dict[str, Any]:
-    """Create a new todo via MCP."""
+def create_todo_mcp(task: str, reject_duplicates: bool = False) -> Dict[str, Any]:
+    """Create a new todo via MCP, optionally rejecting near-duplicates of existing todos."""
+    if reject_duplicates:
+        duplicates = similar_todos(task, limit=3)
+        if duplicates:
+            return {"message": "Similar todo already exists", "todo": None, "similar_todos": duplicates}
     todo = {"task": task, "completed": False}
-    todos_db.append(todo)
+    store_todo(todo)
     return {"message": "Todo created successfully", "todo": todo}
 
-@mcp.tool
+@mcp.tool(tags={SINGLE_FLIGHT})
 def get_all_todos() -> Dict[str, Any]:
     """Get all todos via MCP."""
     return {"todos": todos_db, "count": len(todos_db)}
 
+@mcp.tool(tags={SINGLE_FLIGHT})
+def find_similar_todos(task: str, threshold: float = DUPLICATE_THRESHOLD, limit: int = 10) -> Dict[str, Any]:
+    """Find existing todos that are near-duplicates of a task."""
+    matches = similar_todos(task, threshold, limit)
+    return {"task": task, "threshold": threshold, "similar_todos": matches, "count": len(matches)}
+
 @mcp.tool
 def calculate_area(length: float, width: float) -> Dict[str, float]:
     """Calculate area and perimeter of a rectangle."""
@@ -87,7 +227,7 @@ def calculate_area(length: float, width: float) -> Dict[str, float]:
         "perimeter": perimeter
     }
 
-@mcp.tool
+@mcp.tool(tags={SINGLE_FLIGHT})
 def get_system_info() -> Dict[str, Any]:
     """Get system information."""
     import platform
@@ -99,25 +239,54 @@ def get_system_info() -> Dict[str, Any]:
         "server_name": "Enhanced FastAPI MCP Server"
     }
 
-@mcp.tool
-def get_app_stats() -> Dict[str, Any]:
-    """Get application statistics."""
+@mcp.tool(tags={SINGLE_FLIGHT})
+async def get_app_stats() -> Dict[str, Any]:
+    """Get application statistics, including call counts and p50/p95/p99 latency per tool and route."""
     return {
         "total_users": len(users_db),
         "total_todos": len(todos_db),
         "completed_todos": len([t for t in todos_db if t.get("completed", False)]),
         "server_status": "Running",
-        "mcp_tools_count": 15
+        "mcp_tools_count": len(await mcp.list_tools()),
+        **metrics.summary()
     }
 
 @mcp.tool
-def generate_password(length: int = 12) -> str:
+async def generate_password(length: int = 12) -> str:
     """Generate a secure random password."""
-    import secrets
-    import string
-    alphabet = string.ascii_letters + string.digits + "!@#$%^&*"
-    password = ''.join(secrets.choice(alphabet) for _ in range(length))
-    return password
+    policy = PROCESS if length >= MIN_PROCESS_CHARACTERS else INLINE
+    passwords = await tool_executor.run(
+        "generate_password", generate_password_batch, 1, length, build_alphabet(), policy=policy
+    )
+    return passwords[0]
+
+@mcp.tool
+async def generate_passwords(
+    count: int = 10,
+    length: int = 16,
+    character_sets: str = DEFAULT_CHARACTER_SETS,
+    alphabet: Optional[str] = None
+) -> Dict[str, Any]:
+    """Generate many secure random passwords at once.
+
+    character_sets is a comma-separated list of lowercase, uppercase, letters,
+    digits, symbols and punctuation; alphabet overrides it with custom characters.
+    """
+    chars = build_alphabet(character_sets, alphabet)
+    policy = PROCESS if count * length >= MIN_PROCESS_CHARACTERS else INLINE
+    return {
+        "count": count,
+        "length": length,
+        "alphabet_size": len(chars),
+        "passwords": await tool_executor.run(
+            "generate_passwords", generate_password_batch, count, length, chars, policy=policy
+        )
+    }
+
+@mcp.tool
+def check_password_strength(password: str) -> Dict[str, Any]:
+    """Check password strength: entropy estimate and common-password lookup."""
+    return password_strength(password)
 
 @mcp.tool
 def convert_temperature(value: float, from_unit: str, to_unit: str) -> Dict[str, Any]:
@@ -145,73 +314,258 @@ def convert_temperature(value: float, from_unit: str, to_unit: str) -> Dict[str,
     }
 
 @mcp.tool
-def text_analyzer(text: str) -> Dict[str, Any]:
+async def text_analyzer(text: str, ctx: Context) -> Dict[str, Any]:
     """Analyze text and provide statistics."""
-    words = text.split()
-    sentences = text.split('.')
-    characters = len(text)
-    characters_no_spaces = len(text.replace(' ', ''))
-    
+    async with tool_progress(ctx, "characters") as progress:
+        if len(text) > TEXT_CHUNK_CHARS:
+            # Long texts are analyzed chunk by chunk, reporting progress as they go
+            return await tool_executor.run(
+                "text_analyzer", analyze_text_with_sentiment, text, progress, policy=THREAD
+            )
+        return await tool_executor.run("text_analyzer", analyze_text_with_sentiment, text, policy=PROCESS)
+
+@mcp.tool
+async def analyze_texts(texts: List[str], ctx: Context) -> Dict[str, Any]:
+    """Analyze many texts in parallel and return per-document and corpus-wide statistics."""
+    # Shards itself across the process pool, so it only needs a thread to wait in
+    async with tool_progress(ctx, "documents") as progress:
+        return await tool_executor.run("analyze_texts", analyze_text_batch, texts, progress, policy=THREAD)
+
+@mcp.tool(tags={SINGLE_FLIGHT})
+async def sentiment_analyzer(text: str) -> Dict[str, Any]:
+    """Score the sentiment of a text using the bundled lexicon."""
+    return await tool_executor.run("sentiment_analyzer", score_sentiment, text, policy=PROCESS)
+
+@mcp.tool
+async def sentiment_batch(texts: List[str], ctx: Context) -> Dict[str, Any]:
+    """Score the sentiment of many texts in one call."""
+    async with tool_progress(ctx, "texts") as progress:
+        return await tool_executor.run("sentiment_batch", score_sentiments, texts, progress, policy=THREAD)
+
+@mcp.tool(tags={SINGLE_FLIGHT})
+async def extract_keywords(text: Optional[str] = None, top_k: int = 10) -> Dict[str, Any]:
+    """Get the top TF-IDF keywords of a text, or of all todos when no text is given."""
+    # The index lives in this process; the todo ranking is reused until a todo is added
+    keywords = await tool_executor.run("extract_keywords", todo_keywords.top_keywords, text, top_k, policy=INLINE)
     return {
-        "character_count": characters,
-        "character_count_no_spaces": characters_no_spaces,
-        "word_count": len(words),
-        "sentence_count": len([s for s in sentences if s.strip()]),
-        "average_word_length": round(sum(len(word) for word in words) / len(words), 2) if words else 0,
-        "most_common_word": max(set(words), key=words.count) if words else None
+        "scope": "text" if text is not None else "todos",
+        "documents_indexed": todo_keywords.document_count,
+        "keywords": keywords
     }
 
-@mcp.tool
-def url_shortener(url: str) -> Dict[str, str]:
-    """Create a shortened URL (simulated)."""
-    import hashlib
-    short_code = hashlib.md5(url.encode()).hexdigest()[:8]
-    short_url = f"https://short.ly/{short_code}"
-    
+def shorten_url(url: str) -> Dict[str, str]:
+    """Store a URL and describe its short link."""
+    url = validate_url(url)
+    with tracer.span("short_urls.shorten", attributes={"db.system": "sqlite"}):
+        short_code = short_urls.shorten(url)
     return {
         "original_url": url,
-        "short_url": short_url,
+        "short_url": f"{settings.SHORTENER_BASE_URL}/{short_code}",
         "short_code": short_code
     }
 
 @mcp.tool
-def weather_info(city: str) -> Dict[str, Any]:
-    """Get weather information for a city (simulated)."""
-    import random
-    temperatures = [random.randint(-10, 35) for _ in range(3)]
-    conditions = ["Sunny", "Cloudy", "Rainy", "Snowy", "Foggy"]
+def url_shortener(url: str) -> Dict[str, str]:
+    """Create a shortened URL that redirects through this server."""
+    return shorten_url(url)
+
+@mcp.tool
+def expand_short_url(short_code: str) -> Dict[str, Any]:
+    """Resolve a short code back to its original URL."""
+    with tracer.span("short_urls.resolve", attributes={"db.system": "sqlite"}):
+        url = short_urls.resolve(short_code)
+    return {"short_code": short_code, "original_url": url, "found": url is not None}
+
+async def resolve_short_code(short_code: str) -> Optional[str]:
+    """URL of a short code; only lookups the hot set and Bloom filter cannot answer leave the loop."""
+    answered, url = short_urls.resolve_cached(short_code)
+    if answered:
+        return url
+    with tracer.span("short_urls.resolve", attributes={"db.system": "sqlite"}):
+        return await run_in_threadpool(short_urls.resolve_stored, short_code)
+
+async def short_url_stats(short_code: str) -> Optional[Dict[str, Any]]:
+    """Click statistics for a short code, or None if the code does not exist."""
+    url = await resolve_short_code(short_code)
+    if url is None:
+        return None
+    with tracer.span("click_stats.read", attributes={"db.system": "sqlite"}):
+        return {"original_url": url, **await click_counters.code_stats(short_code)}
+
+@mcp.tool
+async def url_stats(short_code: str) -> Dict[str, Any]:
+    """Get click counts for a short URL by minute, hour and day."""
+    stats = await short_url_stats(short_code)
+    if stats is None:
+        return {"short_code": short_code, "found": False}
+    return {"found": True, **stats}
+
+@mcp.tool(tags={SINGLE_FLIGHT})
+async def qr_code_generator(
+    text: str,
+    error_correction: str = "M",
+    output_format: str = "png",
+    scale: int = 8,
+    border: int = 4
+) -> Dict[str, Any]:
+    """Generate a QR code as a PNG or SVG data URL."""
+    import base64
+    image, info = await tool_executor.run(
+        "qr_code_generator", render_qr_cached, text, error_correction, output_format, scale, border, policy=THREAD
+    )
+    qr_url = f"data:{info['mime_type']};base64,{base64.b64encode(image).decode()}"
     
     return {
-        "city": city,
-        "current_temperature": temperatures[0],
-        "min_temperature": min(temperatures),
-        "max_temperature": max(temperatures),
-        "condition": random.choice(conditions),
-        "humidity": random.randint(30, 90),
-        "wind_speed": random.randint(5, 25)
+        "text": text,
+        "qr_code_url": qr_url,
+        **info,
+        "message": "QR code generated successfully"
     }
 
+@mcp.tool(tags={SINGLE_FLIGHT})
+async def weather_info(city: str) -> Dict[str, Any]:
+    """Get weather information for a city from the configured weather provider."""
+    return await weather_service.get(city)
+
+@mcp.tool(tags={SINGLE_FLIGHT})
+async def weather_history(
+    city: str,
+    metric: str = "temperature",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    points: int = 300,
+    method: str = "buckets"
+) -> Dict[str, Any]:
+    """Get downsampled minute-level weather history for a city between two ISO 8601 times."""
+    return await tool_executor.run(
+        "weather_history", weather_history_store.query, city, metric, start, end, points, method, policy=THREAD
+    )
+
+@mcp.tool(tags={SINGLE_FLIGHT})
+async def file_info(file_path: str) -> Dict[str, Any]:
+    """Get size, type and timestamps of a file inside the sandbox directory."""
+    return await tool_executor.run("file_info", file_tools.file_info, file_path, policy=THREAD)
+
 @mcp.tool
-def color_palette_generator(color_count: int = 5) -> Dict[str, Any]:
-    """Generate a random color palette."""
-    import random
-    
-    colors = []
-    for _ in range(color_count):
-        r = random.randint(0, 255)
-        g = random.randint(0, 255)
-        b = random.randint(0, 255)
-        hex_color = f"#{r:02x}{g:02x}{b:02x}"
-        colors.append({
-            "hex": hex_color,
-            "rgb": f"rgb({r}, {g}, {b})",
-            "name": f"Color {len(colors) + 1}"
-        })
-    
+async def scan_directory(
+    ctx: Context,
+    path: str = ".",
+    max_depth: Optional[int] = None,
+    top_n: int = 10
+) -> Dict[str, Any]:
+    """Get total size, file counts and largest files of a directory tree."""
+    async with tool_progress(ctx, "directories") as progress:
+        return await tool_executor.run(
+            "scan_directory", file_tools.scan_directory, path, max_depth, top_n, progress, policy=THREAD
+        )
+
+@mcp.tool
+async def hash_file(file_path: str, ctx: Context, algorithm: str = "sha256") -> Dict[str, Any]:
+    """Get a SHA-256, SHA-512, BLAKE2 or parallel BLAKE2b tree checksum of a file."""
+    async with tool_progress(ctx, "bytes") as progress:
+        return await tool_executor.run(
+            "hash_file", file_content.hash_file, file_path, algorithm, progress, policy=THREAD
+        )
+
+@mcp.tool(tags={SINGLE_FLIGHT})
+async def read_file_slice(
+    file_path: str,
+    offset: Optional[int] = None,
+    length: Optional[int] = None,
+    start_line: Optional[int] = None,
+    line_count: Optional[int] = None
+) -> Dict[str, Any]:
+    """Read a byte range or a range of lines (counted from 1) of a file."""
+    return await tool_executor.run(
+        "read_file_slice", file_content.read_file_slice, file_path, offset, length, start_line, line_count,
+        policy=THREAD
+    )
+
+@mcp.tool
+async def color_palette_generator(
+    color_count: int = 5,
+    harmony: Optional[str] = None,
+    base_color: Optional[str] = None
+) -> Dict[str, Any]:
+    """Generate a random color palette, or a complementary, analogous, triadic, split_complementary or tetradic one."""
+    return await tool_executor.run(
+        "color_palette_generator", colors.generate_palette, color_count, harmony, base_color, policy=THREAD
+    )
+
+@mcp.tool(tags={SINGLE_FLIGHT})
+async def describe_colors(color_values: List[str]) -> Dict[str, Any]:
+    """Get hex, RGB, HSL, CIELAB and the nearest CSS name of each color."""
+    described = await tool_executor.run("describe_colors", colors.describe_color_strings, color_values, policy=THREAD)
+    return {"count": len(color_values), "colors": described}
+
+def _convert_colors(color_values: List[List[float]], from_space: str, to_space: str) -> List[List[float]]:
+    converted = colors.convert(np.array(color_values, dtype=np.float64).reshape(-1, 3), from_space, to_space)
+    return np.round(converted, 3).tolist()
+
+@mcp.tool(tags={SINGLE_FLIGHT})
+async def convert_colors(color_values: List[List[float]], from_space: str = "rgb", to_space: str = "lab") -> Dict[str, Any]:
+    """Convert a batch of color triples between rgb, hsl and lab."""
+    converted = await tool_executor.run(
+        "convert_colors", _convert_colors, color_values, from_space, to_space, policy=THREAD
+    )
+    return {"from_space": from_space, "to_space": to_space, "colors": converted}
+
+@mcp.tool(tags={SINGLE_FLIGHT})
+async def color_harmonies(base_colors: List[str], harmony: str = "complementary") -> Dict[str, Any]:
+    """Get a color harmony for each of many base colors."""
+    palettes = await tool_executor.run("color_harmonies", colors.harmony_palettes, base_colors, harmony, policy=THREAD)
+    return {"harmony": harmony, "palettes": palettes}
+
+def _palette_from_image(image_base64: Optional[str], file_path: Optional[str], color_count: int) -> Dict[str, Any]:
+    return extract_palette(load_image(image_base64, file_path), color_count)
+
+@mcp.tool(tags={SINGLE_FLIGHT})
+async def palette_from_image(
+    image_base64: Optional[str] = None,
+    file_path: Optional[str] = None,
+    color_count: int = 5
+) -> Dict[str, Any]:
+    """Extract the dominant colors of an image given as base64 data or a sandbox file path."""
+    return await tool_executor.run(
+        "palette_from_image", _palette_from_image, image_base64, file_path, color_count, policy=THREAD
+    )
+
+async def call_tool_value(name: str, arguments: Dict[str, Any]) -> Any:
+    """Call an MCP tool by name and return what the tool function returned."""
+    if name == "call_many":
+        raise ValueError("call_many cannot be nested")
+    with nested_call():
+        result = await mcp.call_tool(name, arguments)
+    if result.is_error:
+        raise RuntimeError(" ".join(getattr(block, "text", "") for block in result.content))
+    if result.structured_content is None:
+        return [block.model_dump(exclude_none=True) for block in result.content]
+    if (result.meta or {}).get("fastmcp", {}).get("wrap_result"):
+        return result.structured_content["result"]
+    return result.structured_content
+
+@mcp.tool
+async def call_many(calls: List[Dict[str, Any]], ctx: Context) -> Dict[str, Any]:
+    """Run many independent tool calls concurrently, each given as {"name": ..., "arguments": {...}}.
+
+    Results come back in the order of the calls; each has ok plus result or error.
+    """
+    async with tool_progress(ctx, "calls") as progress:
+        finished = 0
+
+        def on_result(entry: Dict[str, Any]) -> None:
+            nonlocal finished
+            finished += 1
+            progress.partial(entry)
+            progress(finished, len(calls))
+
+        results = await run_calls(
+            call_tool_value, calls, settings.BATCH_MAX_PARALLEL, settings.BATCH_MAX_CALLS, on_result
+        )
     return {
-        "palette_name": "Random Palette",
-        "color_count": color_count,
-        "colors": colors
+        "count": len(results),
+        "failed": sum(not result["ok"] for result in results),
+        "results": results
     }
 
 # FastAPI Routes
@@ -249,7 +603,7 @@ async def root():
                                 <i class="fas fa-circle text-xs mr-1"></i>
                                 Online
                             </span>
-                            <span class="text-sm">15 MCP Tools Available</span>
+                            <span class="text-sm" x-text="stats.mcp_tools ? `${stats.mcp_tools} MCP Tools Available` : 'MCP Tools Available'"></span>
                         </div>
                     </div>
                 </div>
@@ -602,7 +956,8 @@ async def root():
                     stats: {
                         total_users: 0,
                         total_todos: 0,
-                        completed_todos: 0
+                        completed_todos: 0,
+                        mcp_tools: null
                     },
                     result: null,
                     loading: false,
@@ -692,7 +1047,7 @@ async def root():
                                     total_todos: 0,
                                     completed_todos: 0,
                                     server_status: 'Running',
-                                    mcp_tools_count: 15
+                                    mcp_tools_count: this.stats.mcp_tools
                                 },
                                 'calculate_area': {
                                     length: 10,
@@ -890,7 +1245,8 @@ async def get_users():
 @app.post("/users")
 async def create_user(user: User):
     """Create a new user"""
-    users_db.append(user.dict())
+    with tracer.span("users.add"):
+        users_db.append(user.dict())
     return {"message": "User created successfully", "user": user}
 
 @app.get("/todos")
@@ -899,9 +1255,13 @@ async def get_todos():
     return {"todos": todos_db, "count": len(todos_db)}
 
 @app.post("/todos")
-async def create_todo(todo: TodoItem):
+async def create_todo(todo: TodoItem, reject_duplicates: bool = False):
     """Create a new todo"""
-    todos_db.append(todo.dict())
+    if reject_duplicates:
+        duplicates = similar_todos(todo.task, limit=3)
+        if duplicates:
+            raise HTTPException(status_code=409, detail={"message": "Similar todo already exists", "similar_todos": duplicates})
+    store_todo(todo.dict())
     return {"message": "Todo created successfully", "todo": todo}
 
 @app.post("/calculate")
@@ -930,6 +1290,186 @@ async def calculate(request: CalculationRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/analyze/batch")
+async def analyze_batch(request: TextBatchRequest):
+    """Analyze many texts across the worker process pool"""
+    return await run_in_threadpool(analyze_text_batch, request.texts)
+
+@app.post("/shorten")
+async def create_short_url(request: ShortenRequest):
+    """Create a short URL"""
+    try:
+        return await run_in_threadpool(shorten_url, request.url)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/s/{code}")
+async def redirect_short_url(code: str):
+    """Redirect a short code to its original URL"""
+    url = await resolve_short_code(code)
+    if url is None:
+        raise HTTPException(status_code=404, detail="Short URL not found")
+    click_counters.record(code)
+    return RedirectResponse(url, status_code=302)
+
+@app.get("/s/{code}/stats")
+async def get_short_url_stats(code: str):
+    """Click statistics for a short URL"""
+    stats = await short_url_stats(code)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="Short URL not found")
+    return stats
+
+@app.get("/qr")
+async def get_qr_code(text: str, error_correction: str = "M", output_format: str = "png", scale: int = 8, border: int = 4):
+    """Render a QR code image"""
+    try:
+        image, info = await run_in_threadpool(render_qr_cached, text, error_correction, output_format, scale, border)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return Response(content=image, media_type=info["mime_type"])
+
+@app.post("/qr/batch")
+async def qr_code_batch(request: QRBatchRequest):
+    """Stream many QR codes as a ZIP archive"""
+    try:
+        # Validate the options up front so errors surface before streaming starts
+        render_qr_cached("", request.error_correction, request.output_format, request.scale, request.border)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    archive = iter_qr_zip(request.texts, request.error_correction, request.output_format, request.scale, request.border)
+    return StreamingResponse(archive, media_type="application/zip",
+                             headers={"Content-Disposition": 'attachment; filename="qr_codes.zip"'})
+
+@app.get("/weather")
+async def get_weather(city: str):
+    """Get weather for a city"""
+    try:
+        return await weather_service.get(city)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Weather provider error: {e}")
+
+@app.get("/weather/history")
+async def get_weather_history(
+    city: str,
+    metric: str = "temperature",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    points: int = 300,
+    method: str = "buckets"
+):
+    """Get downsampled weather history for a city"""
+    try:
+        return await run_in_threadpool(weather_history_store.query, city, metric, start, end, points, method)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/files/info")
+async def get_file_info(path: str):
+    """Get metadata of a file in the sandbox directory"""
+    try:
+        return await run_in_threadpool(file_tools.file_info, path)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/files/scan")
+async def scan_files(path: str = ".", max_depth: Optional[int] = None, top_n: int = 10):
+    """Stream a directory scan as newline-delimited JSON"""
+    try:
+        records = await run_in_threadpool(file_tools.scan_records, path, max_depth, top_n)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    lines = (json.dumps(record) + "\n" for record in records)
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
+@app.get("/files/hash")
+async def get_file_hash(path: str, algorithm: str = "sha256"):
+    """Checksum a file in the sandbox directory"""
+    try:
+        return await run_in_threadpool(file_content.hash_file, path, algorithm)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/files/slice")
+async def get_file_slice(
+    path: str,
+    offset: Optional[int] = None,
+    length: Optional[int] = None,
+    start_line: Optional[int] = None,
+    line_count: Optional[int] = None
+):
+    """Read a byte or line range of a file in the sandbox directory"""
+    try:
+        return await run_in_threadpool(file_content.read_file_slice, path, offset, length, start_line, line_count)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/palette/from-image")
+async def palette_from_upload(file: UploadFile = File(...), color_count: int = 5):
+    """Extract the dominant colors of an uploaded image"""
+    data = await file.read(settings.PALETTE_MAX_IMAGE_BYTES + 1)
+    if len(data) > settings.PALETTE_MAX_IMAGE_BYTES:
+        raise HTTPException(status_code=413, detail="Image is too large")
+    try:
+        return await run_in_threadpool(extract_palette, data, color_count)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/colors/describe")
+async def describe_colors_endpoint(request: ColorBatchRequest):
+    """Convert and name a batch of colors"""
+    try:
+        described = await run_in_threadpool(colors.describe_color_strings, request.colors)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"count": len(request.colors), "colors": described}
+
+@app.post("/colors/harmonies")
+async def color_harmonies_endpoint(request: ColorBatchRequest, harmony: str = "complementary"):
+    """Build a color harmony for each color in a batch"""
+    try:
+        palettes = await run_in_threadpool(colors.harmony_palettes, request.colors, harmony)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"harmony": harmony, "palettes": palettes}
+
+@app.post("/sentiment/batch")
+async def sentiment_batch_endpoint(request: TextBatchRequest):
+    """Score the sentiment of many texts"""
+    return await run_in_threadpool(score_sentiments, request.texts)
+
+@app.post("/analyze/upload")
+async def analyze_upload(request: Request, upload_id: Optional[str] = None):
+    """Analyze uploaded text files as the multipart body streams in"""
+    try:
+        analyzer = MultipartTextAnalyzer(request.headers.get("content-type", ""))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    content_length = request.headers.get("content-length")
+    progress = upload_tracker.start(upload_id or uuid.uuid4().hex, int(content_length) if content_length else None)
+    try:
+        # Parsing and analysis run off the loop, one chunk at a time and in order
+        async for chunk in request.stream():
+            await run_in_threadpool(analyzer.write, chunk)
+            progress.bytes_received += len(chunk)
+        result = await run_in_threadpool(analyzer.finish)
+    except Exception as e:
+        progress.fail()
+        raise HTTPException(status_code=400, detail=f"Invalid multipart body: {e}")
+    progress.complete()
+    return {**progress.to_dict(), **result}
+
+@app.get("/analyze/upload/{upload_id}")
+async def get_upload_progress(upload_id: str):
+    """Get progress of a streaming upload"""
+    progress = upload_tracker.get(upload_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return progress.to_dict()
+
 @app.get("/stats")
 async def get_stats():
     """Get application statistics"""
@@ -938,12 +1478,55 @@ async def get_stats():
         "total_todos": len(todos_db),
         "completed_todos": len([t for t in todos_db if t.get("completed", False)]),
         "uptime": "Running",
-        "mcp_tools": 15
+        "mcp_tools": len(await mcp.list_tools()),
+        "weather": weather_service.stats(),
+        "execution": tool_executor.stats(),
+        "admission": tool_admission.stats(),
+        "single_flight": tool_single_flight.stats(),
+        "jsonrpc_batches": mcp_batches.stats(),
+        "tracing": tracer.stats(),
+        "profiling": profiler.stats(),
+        "event_loop": loop_monitor.stats()
     }
 
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics for tools and routes"""
+    return Response(metrics.prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+def _check_profile_token(request: Request) -> None:
+    """Reject profile reads without the profiling token."""
+    token = request.headers.get(PROFILE_HEADER.decode()) or request.query_params.get(PROFILE_QUERY_PARAMETER)
+    if not profiler.enabled:
+        raise HTTPException(status_code=404, detail="Profiling is not enabled")
+    if not profiler.authorized(token):
+        raise HTTPException(status_code=403, detail="Invalid profiling token")
+
+@app.get(PROFILES_PATH)
+async def list_profiles(request: Request):
+    """List stored request profiles, newest first"""
+    _check_profile_token(request)
+    return {"profiles": profiler.list()}
+
+@app.get(PROFILES_PATH + "/{profile_id}")
+async def get_profile(profile_id: str, request: Request):
+    """Collapsed stacks of a request profile, ready for flamegraph tools"""
+    _check_profile_token(request)
+    profile = profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return Response(profile.collapsed, media_type="text/plain; charset=utf-8")
+
+# Serve MCP over streamable HTTP from the same process and state as the REST API.
+# Mounted last so that it only receives paths no REST route matched.
+mcp_batches = JSONRPCBatchMiddleware(
+    mcp_app, settings.MCP_HTTP_PATH, settings.BATCH_MAX_PARALLEL, settings.BATCH_MAX_CALLS
+)
+app.mount("/", mcp_batches)
+
 # MCP Server runner
 def run_mcp_server():
-    """Run the MCP server"""
+    """Run the MCP server over stdio"""
     mcp.run()
 
 if __name__ == "__main__":
@@ -952,5 +1535,5 @@ if __name__ == "__main__":
         # Run MCP server
         run_mcp_server()
     else:
-        # Run FastAPI server
+        # Run FastAPI server, with MCP served at MCP_HTTP_PATH
         uvicorn.run(app, host="0.0.0.0", port=8001)
@@ -0,0 +1,179 @@
+"""Where MCP tools run: inline, on a thread pool or on a process pool.
+
+Each offloaded tool names the policy that suits it when it calls
+``tool_executor.run``:
+
+- ``inline`` runs on the event loop, for work too small to be worth a hop;
+- ``thread`` runs on the tool thread pool, for blocking I/O, code that
+  releases the GIL and tools that share in-process state such as caches;
+- ``process`` runs on the shared process pool, for pure-Python CPU work.
+  The function and its arguments must be picklable, so it has to be a
+  module-level function of an engine module.
+
+``TOOL_EXECUTION_POLICIES`` can override the policy of any tool, except
+that tools restricted with ``ToolExecutor.restrict`` refuse, at startup,
+an override they cannot run under. Each pool
+admits a bounded number of calls (running plus waiting). Once that many are
+in flight, further calls fail fast with ``ToolBusyError`` rather than
+queueing without limit. Work whose caller stopped waiting for it, after a
+cancel or a deadline, but which had already started keeps its slot until
+it ends and is counted as abandoned.
+"""
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Mapping, Optional
+
+import settings
+from tracing import Span, tracer
+from workers import get_process_pool, get_tool_thread_pool
+
+INLINE = "inline"
+THREAD = "thread"
+PROCESS = "process"
+POLICIES = (INLINE, THREAD, PROCESS)
+
+
+class ToolBusyError(RuntimeError):
+    """Raised when a pool already has as many calls in flight as it admits."""
+
+
+def parse_policies(spec: str) -> Mapping[str, str]:
+    """Parse ``tool=policy,tool=policy`` overrides."""
+    policies = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        tool, _, policy = item.partition("=")
+        if policy.strip() not in POLICIES:
+            raise ValueError(f"Invalid execution policy for {tool.strip()!r}: {policy.strip()!r}")
+        policies[tool.strip()] = policy.strip()
+    return policies
+
+
+class _Lane:
+    """One pool plus the bookkeeping that bounds its queue."""
+
+    def __init__(self, get_executor: Callable[[], Any], max_in_flight: int, copy_context: bool):
+        self._get_executor = get_executor
+        self.max_in_flight = max_in_flight
+        self._copy_context = copy_context
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.abandoned_in_flight = 0
+        self.abandoned = 0
+
+    def _release(self, _future) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+
+    def _abandon(self, future) -> None:
+        # Work that had not started was cancelled along with the caller
+        if future.done():
+            return
+        with self._lock:
+            self.abandoned_in_flight += 1
+            self.abandoned += 1
+        future.add_done_callback(self._abandoned_done)
+
+    def _abandoned_done(self, _future) -> None:
+        with self._lock:
+            self.abandoned_in_flight -= 1
+
+    async def run(self, tool: str, fn: Callable[..., Any], args: tuple, span: Optional[Span] = None) -> Any:
+        with self._lock:
+            if self.in_flight >= self.max_in_flight:
+                self.rejected += 1
+                raise ToolBusyError(f"{tool} is busy with {self.in_flight} calls in flight")
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+        if self._copy_context:
+            if span is not None:
+                fn = _timed(fn, span, time.perf_counter())
+            # Threads see the caller's context variables, as they would inline
+            fn = functools.partial(contextvars.copy_context().run, fn)
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._release(None)
+            raise
+        # Free the slot when the work ends, not when the caller stops waiting
+        future.add_done_callback(self._release)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            self._abandon(future)
+            raise
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "max_in_flight": self.max_in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "abandoned_in_flight": self.abandoned_in_flight,
+            "abandoned": self.abandoned
+        }
+
+
+def _timed(fn: Callable[..., Any], span: Span, submitted: float) -> Callable[..., Any]:
+    def run(*args: Any) -> Any:
+        span.set_attribute("queue_wait_ms", round((time.perf_counter() - submitted) * 1000, 3))
+        return fn(*args)
+    return run
+
+
+class ToolExecutor:
+    """Dispatches tool work according to its execution policy."""
+
+    def __init__(self, overrides: Mapping[str, str], thread_queue_depth: int, process_queue_depth: int):
+        self.overrides = dict(overrides)
+        self._lanes = {
+            THREAD: _Lane(get_tool_thread_pool, thread_queue_depth, copy_context=True),
+            PROCESS: _Lane(get_process_pool, process_queue_depth, copy_context=False),
+        }
+        self.policies: Dict[str, str] = {}
+        self.inline_calls = 0
+
+    def restrict(self, tools: Iterable[str], policies: Iterable[str]) -> None:
+        """Allow only ``policies`` for ``tools``; raises ValueError if an override asks for another."""
+        policies = tuple(policies)
+        for tool in tools:
+            override = self.overrides.get(tool)
+            if override is not None and override not in policies:
+                raise ValueError(
+                    f"{tool} cannot run with the {override!r} execution policy; use one of {', '.join(policies)}"
+                )
+
+    def policy_for(self, tool: str, default: str) -> str:
+        return self.overrides.get(tool, default)
+
+    async def run(self, tool: str, fn: Callable[..., Any], *args: Any, policy: str = THREAD) -> Any:
+        """Run ``fn(*args)`` for a tool under its configured policy."""
+        policy = self.policy_for(tool, policy)
+        self.policies[tool] = policy
+        with tracer.span(f"execute {tool}", attributes={"execution.policy": policy}) as span:
+            if policy == INLINE:
+                self.inline_calls += 1
+                return fn(*args)
+            return await self._lanes[policy].run(tool, fn, args, span)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "inline_calls": self.inline_calls,
+            **{name: lane.stats() for name, lane in self._lanes.items()},
+            "tool_policies": dict(sorted(self.policies.items()))
+        }
+
+
+tool_executor = ToolExecutor(
+    parse_policies(settings.TOOL_EXECUTION_POLICIES),
+    settings.TOOL_THREAD_QUEUE_DEPTH,
+    settings.TOOL_PROCESS_QUEUE_DEPTH
+)
@@ -4,24 +4,49 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi import Request
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from contextlib import asynccontextmanager
 import uvicorn
 from datetime import datetime
 from fastmcp import FastMCP
 import os
 
+import settings
+
+from qr_encoder import render_qr_cached
+import file_tools
+import file_content
+from weather import create_weather_service
+from weather_history import WeatherHistory
+from palette import extract_palette, load_image
+import colors
+import numpy as np
+
+@asynccontextmanager
+async def lifespan(_app):
+    """Close the weather service's upstream connections when the web app or MCP server stops"""
+    try:
+        yield {}
+    finally:
+        await weather_service.aclose()
+
 # Create FastAPI app
 app = FastAPI(
     title="Enhanced FastAPI App with MCP",
     description="A professional FastAPI application with integrated MCP server and beautiful frontend",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
 # Setup templates
 templates = Jinja2Templates(directory="templates")
 
 # Create MCP server
-mcp = FastMCP(name="FastAPI MCP Server")
+mcp = FastMCP(name="FastAPI MCP Server", lifespan=lifespan)
+weather_history_store = WeatherHistory(
+    settings.WEATHER_HISTORY_DAYS, settings.WEATHER_HISTORY_CITIES, settings.WEATHER_SEED
+)
+weather_service = create_weather_service(weather_history_store)
 
 # Pydantic models
 class User(BaseModel):
@@ -107,14 +132,14 @@ def get_system_info() -> Dict[str, Any]:
     }
 
 @mcp.tool
-def get_app_stats() -> Dict[str, Any]:
+async def get_app_stats() -> Dict[str, Any]:
     """Get application statistics."""
     return {
         "total_users": len(users_db),
         "total_todos": len(todos_db),
         "completed_todos": len([t for t in todos_db if t.get("completed", False)]),
         "server_status": "Running",
-        "mcp_tools_count": 15
+        "mcp_tools_count": len(await mcp.list_tools())
     }
 
 @mcp.tool
@@ -182,77 +207,101 @@ def url_shortener(url: str) -> Dict[str, str]:
     }
 
 @mcp.tool
-def qr_code_generator(text: str) -> Dict[str, str]:
-    """Generate QR code data URL (simulated)."""
+def qr_code_generator(
+    text: str,
+    error_correction: str = "M",
+    output_format: str = "png",
+    scale: int = 8,
+    border: int = 4
+) -> Dict[str, Any]:
+    """Generate a QR code as a PNG or SVG data URL."""
     import base64
-    # Simulate QR code generation
-    qr_data = base64.b64encode(text.encode()).decode()
-    qr_url = f"data:image/png;base64,{qr_data}"
+    image, info = render_qr_cached(text, error_correction, output_format, scale, border)
+    qr_url = f"data:{info['mime_type']};base64,{base64.b64encode(image).decode()}"
     
     return {
         "text": text,
         "qr_code_url": qr_url,
+        **info,
         "message": "QR code generated successfully"
     }
 
 @mcp.tool
-def weather_info(city: str) -> Dict[str, Any]:
-    """Get weather information for a city (simulated)."""
-    import random
-    temperatures = [random.randint(-10, 35) for _ in range(3)]
-    conditions = ["Sunny", "Cloudy", "Rainy", "Snowy", "Foggy"]
-    
-    return {
-        "city": city,
-        "current_temperature": temperatures[0],
-        "min_temperature": min(temperatures),
-        "max_temperature": max(temperatures),
-        "condition": random.choice(conditions),
-        "humidity": random.randint(30, 90),
-        "wind_speed": random.randint(5, 25)
-    }
+async def weather_info(city: str) -> Dict[str, Any]:
+    """Get weather information for a city from the configured weather provider."""
+    return await weather_service.get(city)
+
+@mcp.tool
+def weather_history(
+    city: str,
+    metric: str = "temperature",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    points: int = 300,
+    method: str = "buckets"
+) -> Dict[str, Any]:
+    """Get downsampled minute-level weather history for a city between two ISO 8601 times."""
+    return weather_history_store.query(city, metric, start, end, points, method)
 
 @mcp.tool
 def file_info(filename: str) -> Dict[str, Any]:
-    """Get file information (simulated)."""
-    import os
-    import datetime
-    
-    # Simulate file info
-    file_size = len(filename) * 1024  # Simulated size
-    created_time = datetime.datetime.now().isoformat()
-    
-    return {
-        "filename": filename,
-        "file_size_bytes": file_size,
-        "file_size_mb": round(file_size / (1024 * 1024), 2),
-        "created_time": created_time,
-        "file_type": filename.split('.')[-1] if '.' in filename else "unknown",
-        "exists": True
-    }
+    """Get size, type and timestamps of a file inside the sandbox directory."""
+    return file_tools.file_info(filename)
 
 @mcp.tool
-def color_palette_generator(color_count: int = 5) -> Dict[str, Any]:
-    """Generate a random color palette."""
-    import random
-    
-    colors = []
-    for _ in range(color_count):
-        r = random.randint(0, 255)
-        g = random.randint(0, 255)
-        b = random.randint(0, 255)
-        hex_color = f"#{r:02x}{g:02x}{b:02x}"
-        colors.append({
-            "hex": hex_color,
-            "rgb": f"rgb({r}, {g}, {b})",
-            "name": f"Color {len(colors) + 1}"
-        })
-    
-    return {
-        "palette_name": "Random Palette",
-        "color_count": color_count,
-        "colors": colors
-    }
+def scan_directory(path: str = ".", max_depth: Optional[int] = None, top_n: int = 10) -> Dict[str, Any]:
+    """Get total size, file counts and largest files of a directory tree."""
+    return file_tools.scan_directory(path, max_depth, top_n)
+
+@mcp.tool
+def hash_file(file_path: str, algorithm: str = "sha256") -> Dict[str, Any]:
+    """Get a SHA-256, SHA-512, BLAKE2 or parallel BLAKE2b tree checksum of a file."""
+    return file_content.hash_file(file_path, algorithm)
+
+@mcp.tool
+def read_file_slice(
+    file_path: str,
+    offset: Optional[int] = None,
+    length: Optional[int] = None,
+    start_line: Optional[int] = None,
+    line_count: Optional[int] = None
+) -> Dict[str, Any]:
+    """Read a byte range or a range of lines (counted from 1) of a file."""
+    return file_content.read_file_slice(file_path, offset, length, start_line, line_count)
+
+@mcp.tool
+def color_palette_generator(
+    color_count: int = 5,
+    harmony: Optional[str] = None,
+    base_color: Optional[str] = None
+) -> Dict[str, Any]:
+    """Generate a random color palette, or a complementary, analogous, triadic, split_complementary or tetradic one."""
+    return colors.generate_palette(color_count, harmony, base_color)
+
+@mcp.tool
+def describe_colors(color_values: List[str]) -> Dict[str, Any]:
+    """Get hex, RGB, HSL, CIELAB and the nearest CSS name of each color."""
+    return {"count": len(color_values), "colors": colors.describe_color_strings(color_values)}
+
+@mcp.tool
+def convert_colors(color_values: List[List[float]], from_space: str = "rgb", to_space: str = "lab") -> Dict[str, Any]:
+    """Convert a batch of color triples between rgb, hsl and lab."""
+    converted = colors.convert(np.array(color_values, dtype=np.float64).reshape(-1, 3), from_space, to_space)
+    return {"from_space": from_space, "to_space": to_space, "colors": np.round(converted, 3).tolist()}
+
+@mcp.tool
+def color_harmonies(base_colors: List[str], harmony: str = "complementary") -> Dict[str, Any]:
+    """Get a color harmony for each of many base colors."""
+    return {"harmony": harmony, "palettes": colors.harmony_palettes(base_colors, harmony)}
+
+@mcp.tool
+def palette_from_image(
+    image_base64: Optional[str] = None,
+    file_path: Optional[str] = None,
+    color_count: int = 5
+) -> Dict[str, Any]:
+    """Extract the dominant colors of an image given as base64 data or a sandbox file path."""
+    return extract_palette(load_image(image_base64, file_path), color_count)
 
 # FastAPI Routes
 @app.get("/", response_class=HTMLResponse)
@@ -326,7 +375,7 @@ async def get_stats():
         "total_todos": len(todos_db),
         "completed_todos": len([t for t in todos_db if t.get("completed", False)]),
         "uptime": "Running",
-        "mcp_tools": 9
+        "mcp_tools": len(await mcp.list_tools())
     }
 
 # MCP Server runner
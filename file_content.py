@@ -0,0 +1,317 @@
+"""Checksums and partial reads of large files inside the file sandbox.
+
+Both tools are built for multi-gigabyte logs. Hashing feeds a memory map to
+the hash in chunks, so pages are read straight from the page cache without
+copying them into Python objects first. The ``blake2b-tree`` algorithm hashes
+fixed-size leaves on the shared I/O thread pool and combines them with
+BLAKE2's tree-hashing parameters. hashlib releases the GIL while it hashes,
+so the leaves really are hashed in parallel. The resulting digest is a
+different value from a plain BLAKE2b digest of the same file.
+
+Line-range reads go through a sparse line index. For every 64 KiB block of
+the file it stores the number of newlines before that block, in an
+``array('Q')``. To find a line, a bisect picks the right block and a scan
+of that single block does the rest. The index is built the first time a
+file is read by line, kept in memory, and written next to other indexes in
+``settings.LINE_INDEX_DIR`` for large files. It is rebuilt whenever the
+file's size or mtime changes.
+"""
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import time
+from array import array
+from bisect import bisect_left
+from concurrent.futures import wait
+from typing import Any, Callable, Dict, Optional
+
+import settings
+from caching import LRUCache
+from file_tools import resolve_path, sandbox_path
+from progress import ProgressCallback
+from workers import get_thread_pool
+
+HASH_CHUNK_SIZE = 8 * 1024 * 1024
+HASH_LEAF_SIZE = 4 * 1024 * 1024
+HASH_ALGORITHMS: Dict[str, Callable[[], Any]] = {
+    "sha256": hashlib.sha256,
+    "sha512": hashlib.sha512,
+    "blake2b": hashlib.blake2b,
+    "blake2s": hashlib.blake2s,
+}
+TREE_ALGORITHM = "blake2b-tree"
+
+LINE_INDEX_BLOCK_SIZE = 64 * 1024
+# Smaller files are indexed in memory only
+LINE_INDEX_MIN_DISK_BYTES = 8 * 1024 * 1024
+_INDEX_HEADER = struct.Struct("<8sQqQQ")
+_INDEX_MAGIC = b"LINEIDX1"
+
+_digest_cache = LRUCache(1024)
+_line_indexes = LRUCache(256)
+
+
+def _stat_file(path: str):
+    full = resolve_path(path)
+    try:
+        st = os.stat(full)
+    except FileNotFoundError:
+        raise ValueError("File does not exist")
+    if not os.path.isfile(full):
+        raise ValueError("Path is not a regular file")
+    return full, st
+
+
+# Hashing
+
+def _hash_sequential(view: memoryview, constructor: Callable[[], Any], progress: Optional[ProgressCallback]) -> str:
+    digest = constructor()
+    for start in range(0, len(view), HASH_CHUNK_SIZE):
+        digest.update(view[start:start + HASH_CHUNK_SIZE])
+        if progress is not None:
+            progress(min(start + HASH_CHUNK_SIZE, len(view)), len(view))
+    return digest.hexdigest()
+
+
+def _tree_node(data, node_offset: int, node_depth: int, last_node: bool) -> bytes:
+    return hashlib.blake2b(
+        data, fanout=0, depth=2, leaf_size=HASH_LEAF_SIZE, inner_size=64,
+        node_offset=node_offset, node_depth=node_depth, last_node=last_node
+    ).digest()
+
+
+def _hash_tree(view: memoryview, progress: Optional[ProgressCallback]) -> str:
+    leaf_count = max(1, -(-len(view) // HASH_LEAF_SIZE))
+    pool = get_thread_pool()
+
+    def leaf(index: int) -> bytes:
+        return _tree_node(view[index * HASH_LEAF_SIZE:(index + 1) * HASH_LEAF_SIZE], index, 0, index == leaf_count - 1)
+
+    futures = [pool.submit(leaf, index) for index in range(leaf_count)]
+    try:
+        leaves = []
+        for future in futures:
+            leaves.append(future.result())
+            if progress is not None:
+                progress(min(len(leaves) * HASH_LEAF_SIZE, len(view)), len(view))
+    finally:
+        # Leaves still hold slices of the memory map, which cannot be closed under them
+        for future in futures:
+            future.cancel()
+        wait(futures)
+    return _tree_node(b"".join(leaves), 0, 1, True).hex()
+
+
+def hash_file(path: str, algorithm: str = "sha256", progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+    """Checksum of a file, reusing the last result while the file is unchanged.
+
+    ``progress`` is called with the number of bytes hashed so far.
+    """
+    if algorithm != TREE_ALGORITHM and algorithm not in HASH_ALGORITHMS:
+        raise ValueError(f"algorithm must be one of: {', '.join([*HASH_ALGORITHMS, TREE_ALGORITHM])}")
+    full, st = _stat_file(path)
+    result = {"path": sandbox_path(full), "algorithm": algorithm, "size_bytes": st.st_size}
+
+    cached = _digest_cache.get((full, algorithm))
+    if cached is not None and cached[:2] == (st.st_size, st.st_mtime_ns):
+        return {**result, "digest": cached[2], "cached": True, "elapsed_ms": 0.0}
+
+    started = time.perf_counter()
+    with open(full, "rb") as f:
+        if st.st_size == 0:
+            # Empty files cannot be memory-mapped
+            view = memoryview(b"")
+            mapped = None
+        else:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            view = memoryview(mapped)
+        try:
+            if algorithm == TREE_ALGORITHM:
+                digest = _hash_tree(view, progress)
+            else:
+                digest = _hash_sequential(view, HASH_ALGORITHMS[algorithm], progress)
+        finally:
+            view.release()
+            if mapped is not None:
+                mapped.close()
+
+    _digest_cache.put((full, algorithm), (st.st_size, st.st_mtime_ns, digest))
+    return {
+        **result,
+        "digest": digest,
+        "cached": False,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)
+    }
+
+
+# Line index
+
+class LineIndex:
+    """Newline counts at fixed block boundaries of one version of a file."""
+
+    __slots__ = ("size", "mtime_ns", "counts", "line_count")
+
+    def __init__(self, size: int, mtime_ns: int, counts: array, ends_with_newline: bool):
+        self.size = size
+        self.mtime_ns = mtime_ns
+        # counts[i] is the number of newlines in the first i blocks
+        self.counts = counts
+        self.line_count = counts[-1] + (0 if ends_with_newline or size == 0 else 1)
+
+    @classmethod
+    def build(cls, f, st) -> "LineIndex":
+        counts = array("Q", [0])
+        newlines = 0
+        last = b"\n"
+        buffer = bytearray(LINE_INDEX_BLOCK_SIZE)
+        view = memoryview(buffer)
+        while True:
+            read = f.readinto(buffer)
+            if not read:
+                break
+            newlines += buffer.count(b"\n", 0, read)
+            counts.append(newlines)
+            last = view[read - 1:read].tobytes()
+        view.release()
+        return cls(st.st_size, st.st_mtime_ns, counts, last == b"\n")
+
+    def line_offset(self, f, line: int) -> Optional[int]:
+        """Byte offset where a zero-based line starts, or None past the end."""
+        if line == 0:
+            return 0
+        if line > self.counts[-1]:
+            return None
+        # The line starts after the newline that brings the count up to `line`
+        block = bisect_left(self.counts, line) - 1
+        remaining = line - self.counts[block]
+        f.seek(block * LINE_INDEX_BLOCK_SIZE)
+        data = f.read(LINE_INDEX_BLOCK_SIZE)
+        position = -1
+        for _ in range(remaining):
+            position = data.find(b"\n", position + 1)
+        return block * LINE_INDEX_BLOCK_SIZE + position + 1
+
+
+def _index_file(full: str) -> str:
+    name = hashlib.blake2b(full.encode("utf-8"), digest_size=16).hexdigest()
+    return os.path.join(settings.LINE_INDEX_DIR, name + ".idx")
+
+
+def _load_index(full: str, st) -> Optional[LineIndex]:
+    try:
+        with open(_index_file(full), "rb") as f:
+            magic, size, mtime_ns, block_size, entries = _INDEX_HEADER.unpack(f.read(_INDEX_HEADER.size))
+            if (magic, size, mtime_ns, block_size) != (_INDEX_MAGIC, st.st_size, st.st_mtime_ns, LINE_INDEX_BLOCK_SIZE):
+                return None
+            counts = array("Q")
+            counts.fromfile(f, entries)
+            ends_with_newline = f.read(1) == b"\n"
+    except (OSError, EOFError, struct.error):
+        return None
+    return LineIndex(size, mtime_ns, counts, ends_with_newline)
+
+
+def _save_index(full: str, index: LineIndex, ends_with_newline: bool) -> None:
+    os.makedirs(settings.LINE_INDEX_DIR, exist_ok=True)
+    # Write to a temporary file first so readers never see a partial index
+    with tempfile.NamedTemporaryFile(dir=settings.LINE_INDEX_DIR, suffix=".tmp", delete=False) as f:
+        f.write(_INDEX_HEADER.pack(_INDEX_MAGIC, index.size, index.mtime_ns, LINE_INDEX_BLOCK_SIZE, len(index.counts)))
+        index.counts.tofile(f)
+        f.write(b"\n" if ends_with_newline else b"\0")
+    os.replace(f.name, _index_file(full))
+
+
+def line_index(full: str, f, st) -> LineIndex:
+    """Line index for the current version of a file: memory, then disk, then build."""
+    index = _line_indexes.get(full)
+    if index is not None and (index.size, index.mtime_ns) == (st.st_size, st.st_mtime_ns):
+        return index
+    index = _load_index(full, st)
+    if index is None:
+        index = LineIndex.build(f, st)
+        if st.st_size >= LINE_INDEX_MIN_DISK_BYTES:
+            ends_with_newline = index.line_count == index.counts[-1]
+            try:
+                _save_index(full, index, ends_with_newline)
+            except OSError:
+                pass  # the on-disk copy is only an optimisation
+    _line_indexes.put(full, index)
+    return index
+
+
+# Slices
+
+def read_file_slice(
+    path: str,
+    offset: Optional[int] = None,
+    length: Optional[int] = None,
+    start_line: Optional[int] = None,
+    line_count: Optional[int] = None
+) -> Dict[str, Any]:
+    """Read a byte range, or a range of lines counted from 1, of a file."""
+    max_bytes = settings.FILE_SLICE_MAX_BYTES
+    by_lines = start_line is not None or line_count is not None
+    if by_lines and (offset is not None or length is not None):
+        raise ValueError("Give either offset/length or start_line/line_count, not both")
+    full, st = _stat_file(path)
+    result = {"path": sandbox_path(full), "file_size_bytes": st.st_size}
+
+    with open(full, "rb") as f:
+        if not by_lines:
+            offset = offset or 0
+            length = max_bytes if length is None else length
+            if offset < 0 or length < 0:
+                raise ValueError("offset and length must not be negative")
+            f.seek(offset)
+            data = f.read(min(length, max_bytes))
+            return {
+                **result,
+                "offset": offset,
+                "bytes_returned": len(data),
+                "truncated": length > max_bytes and offset + max_bytes < st.st_size,
+                "eof": offset + len(data) >= st.st_size,
+                "content": data.decode("utf-8", errors="replace")
+            }
+
+        start_line = 1 if start_line is None else start_line
+        line_count = 100 if line_count is None else line_count
+        if start_line < 1 or line_count < 0:
+            raise ValueError("start_line must be at least 1 and line_count must not be negative")
+        index = line_index(full, f, st)
+        result.update({"start_line": start_line, "total_lines": index.line_count})
+        start = index.line_offset(f, start_line - 1)
+        if start is None:
+            return {**result, "offset": st.st_size, "lines_returned": 0, "truncated": False, "eof": True, "content": ""}
+
+        f.seek(start)
+        data = bytearray()
+        end = 0
+        lines = 0
+        cut = False
+        while lines < line_count:
+            newline = data.find(b"\n", end)
+            if newline < 0:
+                # Read on only as far as the requested lines need
+                chunk = f.read(min(LINE_INDEX_BLOCK_SIZE, max_bytes - len(data)))
+                if chunk:
+                    data += chunk
+                    continue
+                if end == len(data):
+                    break
+                # The line runs past the byte limit, or is the unterminated last line
+                end = len(data)
+                cut = start + end < st.st_size
+            else:
+                end = newline + 1
+            lines += 1
+        truncated = cut or (lines < line_count and start + len(data) < st.st_size)
+        return {
+            **result,
+            "offset": start,
+            "lines_returned": lines,
+            "truncated": truncated,
+            "eof": start + end >= st.st_size,
+            "content": data[:end].decode("utf-8", errors="replace")
+        }
@@ -0,0 +1,263 @@
+"""File system tools confined to a sandbox directory.
+
+Every path passed in is resolved, symlinks included, relative to
+``settings.FILE_SANDBOX_ROOT`` and rejected if it ends up outside it.
+
+Directory scans list each directory with ``os.scandir`` on the shared I/O
+thread pool, so sibling directories are read concurrently. A directory's
+listing is cached together with its mtime, which makes rescanning an
+unchanged tree cost a single ``stat`` per directory. Creating, deleting or
+renaming an entry updates the mtime of its parent; rewriting a file in place
+does not, so the cached size of such a file is only refreshed once something
+else in its directory changes.
+"""
+import heapq
+import os
+import stat
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import settings
+from progress import ProgressCallback
+from caching import LRUCache
+from workers import get_thread_pool
+
+SANDBOX_ROOT = os.path.realpath(settings.FILE_SANDBOX_ROOT)
+
+# Largest files remembered per directory, which also caps top_n for scans
+MAX_LARGEST_FILES = 100
+# Listings of directories changed this recently are not cached: a second
+# change within the same timestamp tick would leave the mtime unchanged
+MTIME_SETTLE_NS = 2_000_000_000
+
+
+def resolve_path(path: str) -> str:
+    """Real absolute path for a path inside the sandbox, else raise ValueError."""
+    full = os.path.realpath(os.path.join(SANDBOX_ROOT, path))
+    if os.path.commonpath([SANDBOX_ROOT, full]) != SANDBOX_ROOT:
+        raise ValueError("Path is outside the file sandbox")
+    return full
+
+
+def sandbox_path(full: str) -> str:
+    """Path relative to the sandbox root, as shown to clients."""
+    return os.path.relpath(full, SANDBOX_ROOT)
+
+
+def _timestamp(seconds: float) -> str:
+    return datetime.fromtimestamp(seconds, timezone.utc).isoformat()
+
+
+def file_info(path: str) -> Dict[str, Any]:
+    """Metadata for a file or directory from ``os.stat``."""
+    full = resolve_path(path)
+    name = os.path.basename(full)
+    info = {"filename": name, "path": sandbox_path(full)}
+    try:
+        st = os.stat(full)
+    except FileNotFoundError:
+        return {**info, "exists": False}
+
+    is_dir = stat.S_ISDIR(st.st_mode)
+    if is_dir:
+        file_type = "directory"
+    else:
+        file_type = name.rsplit(".", 1)[-1] if "." in name else "unknown"
+    return {
+        **info,
+        "exists": True,
+        "is_directory": is_dir,
+        "file_type": file_type,
+        "file_size_bytes": st.st_size,
+        "file_size_mb": round(st.st_size / (1024 * 1024), 2),
+        # st_birthtime is only available on some platforms
+        "created_time": _timestamp(getattr(st, "st_birthtime", st.st_ctime)),
+        "modified_time": _timestamp(st.st_mtime),
+        "accessed_time": _timestamp(st.st_atime),
+        "permissions": stat.filemode(st.st_mode)
+    }
+
+
+class DirectoryListing(NamedTuple):
+    """What a scan needs to know about the direct entries of one directory."""
+
+    mtime_ns: int
+    file_count: int
+    total_bytes: int
+    largest: Tuple[Tuple[int, str], ...]  # (size, name), largest first
+    subdirs: Tuple[str, ...]
+    errors: int
+
+
+_listing_cache = LRUCache(settings.SCAN_CACHE_DIRS)
+
+
+def list_directory(full: str) -> Tuple[DirectoryListing, bool]:
+    """Listing of one directory and whether it came from the cache."""
+    # Read the mtime before listing: a change made during the listing then
+    # leaves a stale mtime in the cache and forces a rescan next time
+    mtime_ns = os.stat(full).st_mtime_ns
+    cached = _listing_cache.get(full)
+    if cached is not None and cached.mtime_ns == mtime_ns:
+        return cached, True
+
+    files: List[Tuple[int, str]] = []
+    subdirs = []
+    errors = 0
+    with os.scandir(full) as entries:
+        for entry in entries:
+            try:
+                # Symlinks are skipped so scans never leave the sandbox
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.name)
+                elif entry.is_file(follow_symlinks=False):
+                    files.append((entry.stat(follow_symlinks=False).st_size, entry.name))
+            except OSError:
+                errors += 1
+
+    listing = DirectoryListing(
+        mtime_ns=mtime_ns,
+        file_count=len(files),
+        total_bytes=sum(size for size, _ in files),
+        largest=tuple(heapq.nlargest(MAX_LARGEST_FILES, files)),
+        subdirs=tuple(subdirs),
+        errors=errors
+    )
+    if time.time_ns() - mtime_ns > MTIME_SETTLE_NS:
+        _listing_cache.put(full, listing)
+    return listing, False
+
+
+def _walk(root: str, max_depth: Optional[int]) -> Iterator[Tuple[str, int, Optional[DirectoryListing], bool, Optional[OSError]]]:
+    """Breadth-first parallel walk yielding directories as their listings finish."""
+    pool = get_thread_pool()
+    pending = {pool.submit(list_directory, root): (root, 0)}
+    try:
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                full, depth = pending.pop(future)
+                try:
+                    listing, cached = future.result()
+                except OSError as e:
+                    yield full, depth, None, False, e
+                    continue
+                if max_depth is None or depth < max_depth:
+                    for name in listing.subdirs:
+                        child = os.path.join(full, name)
+                        pending[pool.submit(list_directory, child)] = (child, depth + 1)
+                yield full, depth, listing, cached, None
+    finally:
+        # The consumer may stop early, e.g. when a streaming client disconnects
+        for future in pending:
+            future.cancel()
+
+
+class ScanSummary:
+    """Running totals over the directories of a scan."""
+
+    def __init__(self, root: str, top_n: int):
+        self.root = root
+        self.top_n = top_n
+        self.directories = 0
+        self.cached_directories = 0
+        self.files = 0
+        self.total_bytes = 0
+        self.errors = 0
+        self._largest: List[Tuple[int, str]] = []
+        self._started = time.perf_counter()
+
+    def add(self, full: str, listing: DirectoryListing, cached: bool) -> None:
+        self.directories += 1
+        self.cached_directories += cached
+        self.files += listing.file_count
+        self.total_bytes += listing.total_bytes
+        self.errors += listing.errors
+        largest = self._largest
+        for size, name in listing.largest[:self.top_n]:
+            if len(largest) < self.top_n:
+                heapq.heappush(largest, (size, os.path.join(full, name)))
+            elif size > largest[0][0]:
+                heapq.heapreplace(largest, (size, os.path.join(full, name)))
+            else:
+                break  # the listing is sorted, nothing smaller can qualify
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "type": "summary",
+            "path": sandbox_path(self.root),
+            "directories": self.directories,
+            "files": self.files,
+            "total_bytes": self.total_bytes,
+            "total_mb": round(self.total_bytes / (1024 * 1024), 2),
+            "largest_files": [
+                {"path": sandbox_path(full), "size_bytes": size}
+                for size, full in sorted(self._largest, reverse=True)
+            ],
+            "errors": self.errors,
+            "cached_directories": self.cached_directories,
+            "elapsed_ms": round((time.perf_counter() - self._started) * 1000, 2)
+        }
+
+
+def _scan_root(path: str, top_n: int) -> str:
+    if not 1 <= top_n <= MAX_LARGEST_FILES:
+        raise ValueError(f"top_n must be between 1 and {MAX_LARGEST_FILES}")
+    root = resolve_path(path)
+    if not os.path.isdir(root):
+        raise ValueError("Path is not a directory")
+    return root
+
+
+def _scan_records(root: str, max_depth: Optional[int], top_n: int) -> Iterator[Dict[str, Any]]:
+    summary = ScanSummary(root, top_n)
+    for full, depth, listing, cached, error in _walk(root, max_depth):
+        if error is not None:
+            summary.errors += 1
+            yield {"type": "error", "path": sandbox_path(full), "error": error.strerror or str(error)}
+            continue
+        summary.add(full, listing, cached)
+        yield {
+            "type": "directory",
+            "path": sandbox_path(full),
+            "depth": depth,
+            "files": listing.file_count,
+            "subdirectories": len(listing.subdirs),
+            "bytes": listing.total_bytes,
+            "cached": cached
+        }
+    yield summary.to_dict()
+
+
+def scan_records(path: str, max_depth: Optional[int] = None, top_n: int = 10) -> Iterator[Dict[str, Any]]:
+    """Stream one record per directory followed by a summary record.
+
+    Arguments are validated before the first record is requested, so errors
+    surface before a response starts streaming.
+    """
+    return _scan_records(_scan_root(path, top_n), max_depth, top_n)
+
+
+def scan_directory(
+    path: str,
+    max_depth: Optional[int] = None,
+    top_n: int = 10,
+    progress: Optional[ProgressCallback] = None
+) -> Dict[str, Any]:
+    """Aggregate size, counts and largest files of a directory tree.
+
+    ``progress`` is called with the number of directories scanned so far;
+    the total is not known until the walk ends.
+    """
+    root = _scan_root(path, top_n)
+    summary = ScanSummary(root, top_n)
+    for full, _, listing, cached, error in _walk(root, max_depth):
+        if error is not None:
+            summary.errors += 1
+        else:
+            summary.add(full, listing, cached)
+        if progress is not None:
+            progress(summary.directories + summary.errors, None)
+    return summary.to_dict()
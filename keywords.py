@@ -0,0 +1,86 @@
+"""Incremental TF-IDF keyword extraction.
+
+The document-frequency table is updated as each document is added, so
+keyword queries never rescan the stored documents. The corpus ranking is
+computed once after each change and reused until the next one.
+"""
+import heapq
+import math
+import threading
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from text_analysis import tokenize
+
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being
+below between both but by can could did do does doing down during each few for from further
+had has have having he her here hers herself him himself his how i if in into is it its itself
+just me more most my myself no nor not now of off on once only or other our ours ourselves out
+over own same she should so some such than that the their theirs them themselves then there
+these they this those through to too under until up very was we were what when where which
+while who whom why will with would you your yours yourself yourselves also get got make
+""".split())
+
+
+class KeywordIndex:
+    """Document frequencies and corpus term counts, maintained on insert."""
+
+    def __init__(self):
+        self.document_count = 0
+        self.document_frequency = Counter()
+        self.term_frequency = Counter()
+        self.token_count = 0
+        # Corpus terms by TF-IDF, best first; built on demand, dropped on insert
+        self._corpus_ranking: Optional[List[Tuple[float, str, int, int]]] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def terms(text: str) -> List[str]:
+        """Tokens of a text that can be keywords."""
+        return [t for t in tokenize(text) if t not in STOPWORDS and len(t) > 1 and not t.isdigit()]
+
+    def add_document(self, text: str) -> None:
+        """Count one new document into the index."""
+        terms = self.terms(text)
+        with self._lock:
+            self.document_count += 1
+            self.document_frequency.update(set(terms))
+            self.term_frequency.update(terms)
+            self.token_count += len(terms)
+            self._corpus_ranking = None
+
+    def idf(self, term: str) -> float:
+        """Smoothed inverse document frequency of a term."""
+        return math.log((1 + self.document_count) / (1 + self.document_frequency[term])) + 1
+
+    def _ranked(self, counts: Iterable[Tuple[str, int]], top_k: Optional[int]) -> List[Tuple[float, str, int, int]]:
+        # Called with the lock held
+        scored = ((count * self.idf(term), term, count, self.document_frequency[term]) for term, count in counts)
+        return sorted(scored, reverse=True) if top_k is None else heapq.nlargest(top_k, scored)
+
+    def top_keywords(self, text: Optional[str] = None, top_k: int = 10) -> List[Dict[str, Any]]:
+        """Highest TF-IDF terms of one text, or of the whole corpus when no text is given."""
+        if text is None:
+            with self._lock:
+                total = self.token_count
+                if self._corpus_ranking is None:
+                    self._corpus_ranking = self._ranked(self.term_frequency.items(), None)
+                best = self._corpus_ranking[:top_k]
+        else:
+            terms = self.terms(text)
+            total = len(terms)
+            counts = Counter(terms)
+            with self._lock:
+                best = self._ranked(counts.items(), top_k)
+        if not total:
+            return []
+        return [
+            {
+                "term": term,
+                "tf_idf": round(score / total, 4),
+                "count": count,
+                "document_frequency": document_frequency
+            }
+            for score, term, count, document_frequency in best
+        ]
@@ -0,0 +1,306 @@
+"""Event-loop lag monitoring and a slow-request log.
+
+Anything that runs on the event loop without awaiting, such as an async
+tool doing CPU work or ``jsonable_encoder`` on a large response, delays
+every other request. ``LoopMonitor`` makes that visible in three ways:
+
+- A sampler task sleeps for ``LOOP_LAG_INTERVAL_MS`` over and over and
+  records how much later than asked it woke up. That lag goes into a
+  latency histogram whose percentiles ``/stats`` reports.
+- A watchdog thread notices when the sampler has not woken up for
+  ``LOOP_BLOCK_THRESHOLD_MS``. It then captures the stack of the event loop
+  thread and the request that the blocking task belongs to, once per
+  block. The watchdog runs outside the loop, so it sees the block while it
+  is happening, not only after it ends.
+- HTTP requests and tool calls that take longer than ``SLOW_REQUEST_MS``
+  are recorded with their duration, outcome and the number of loop blocks
+  seen while they ran. HTTP requests are timed until the response starts,
+  so event streams and streamed downloads that stay open are not slow.
+  Paths that receive streamed uploads are left out, as their time is set
+  by the client's upload.
+
+Blocks and slow requests are written as one JSON object per line to a
+size-rotated log. The file is opened when the monitor starts and written
+by a ``QueueListener`` thread, so the loop never waits on disk I/O.
+"""
+import asyncio
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from fastmcp.server.middleware import Middleware, MiddlewareContext
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+import settings
+from metrics import LatencyHistogram
+
+# Innermost frames kept in a stack snapshot
+STACK_DEPTH = 40
+# Requests in flight listed with a loop block
+IN_FLIGHT_LISTED = 10
+
+
+class RequestRecord:
+    """One HTTP request or tool call in flight."""
+
+    __slots__ = ("kind", "target", "started", "responded", "status", "loop_blocks")
+
+    def __init__(self, kind: str, target: str):
+        self.kind = kind
+        self.target = target
+        self.started = time.monotonic()
+        # When the response started, for requests that keep streaming after that
+        self.responded: Optional[float] = None
+        self.status: Any = None
+        self.loop_blocks = 0
+
+    def to_dict(self, now: float) -> Dict[str, Any]:
+        return {"kind": self.kind, "target": self.target, "running_ms": round((now - self.started) * 1000, 1)}
+
+
+def _stack_snapshot(frame) -> List[Dict[str, Any]]:
+    return [
+        {"file": entry.filename, "line": entry.lineno, "function": entry.name, "code": entry.line}
+        for entry in traceback.extract_stack(frame)[-STACK_DEPTH:]
+    ]
+
+
+class SlowLog:
+    """Rotating JSON Lines log written from a background thread."""
+
+    def __init__(self, path: str, max_bytes: int, backups: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._logger = logging.getLogger("slow_requests")
+        self._logger.setLevel(logging.INFO)
+        self._logger.propagate = False
+        self._queue_handler: Optional[logging.handlers.QueueHandler] = None
+        self._listener: Optional[logging.handlers.QueueListener] = None
+
+    def open(self) -> None:
+        handler = logging.handlers.RotatingFileHandler(
+            self.path, maxBytes=self.max_bytes, backupCount=self.backups, encoding="utf-8", delay=True
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        records: queue.SimpleQueue = queue.SimpleQueue()
+        self._queue_handler = logging.handlers.QueueHandler(records)
+        self._listener = logging.handlers.QueueListener(records, handler)
+        self._listener.start()
+        self._logger.addHandler(self._queue_handler)
+
+    def write(self, record: Dict[str, Any]) -> None:
+        if self._queue_handler is not None:
+            self._logger.info(json.dumps(record, default=str))
+
+    def close(self) -> None:
+        if self._listener is None:
+            return
+        self._logger.removeHandler(self._queue_handler)
+        self._listener.stop()
+        for handler in self._listener.handlers:
+            handler.close()
+        self._queue_handler = self._listener = None
+
+
+class LoopMonitor:
+    """Measures event-loop lag, catches loop blocks and records slow requests."""
+
+    def __init__(
+        self,
+        interval: float,
+        block_threshold: float,
+        slow_threshold: float,
+        log: Optional[SlowLog] = None
+    ):
+        self.interval = interval
+        self.block_threshold = block_threshold
+        self.slow_threshold = slow_threshold
+        self.lag = LatencyHistogram()
+        self.blocks = 0
+        self.slow_requests = 0
+        self.last_block: Optional[Dict[str, Any]] = None
+        self._log = log
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._beat = time.monotonic()
+        # Written on the loop, read by the watchdog
+        self._requests: Dict[asyncio.Task, RequestRecord] = {}
+        self._requests_lock = threading.Lock()
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopped.clear()
+        if self._log is not None:
+            self._log.open()
+        self._task = self._loop.create_task(self._sample())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._stopped.set()
+        self._watchdog.join()
+        if self._log is not None:
+            self._log.close()
+
+    async def _sample(self) -> None:
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._beat = now
+            self.lag.record(max(0.0, now - started - self.interval))
+
+    def _watch(self) -> None:
+        captured_beat = None
+        while not self._stopped.wait(min(self.interval, self.block_threshold) / 2):
+            beat = self._beat
+            blocked = time.monotonic() - beat - self.interval
+            if blocked >= self.block_threshold and beat != captured_beat:
+                captured_beat = beat
+                self._capture_block(blocked)
+
+    def _capture_block(self, blocked: float) -> None:
+        frame = sys._current_frames().get(self._loop_thread)
+        task = asyncio.current_task(self._loop)
+        now = time.monotonic()
+        with self._requests_lock:
+            request = self._requests.get(task) if task is not None else None
+            in_flight = sorted(self._requests.values(), key=lambda record: record.started)
+            for record in in_flight:
+                record.loop_blocks += 1
+        block = {
+            "event": "loop_blocked",
+            "time": datetime.now(timezone.utc).isoformat(),
+            "blocked_so_far_ms": round(blocked * 1000, 1),
+            "task": task.get_name() if task is not None else None,
+            "request": request.to_dict(now) if request is not None else None,
+            "in_flight": [record.to_dict(now) for record in in_flight[:IN_FLIGHT_LISTED]],
+            "stack": _stack_snapshot(frame) if frame is not None else []
+        }
+        self.blocks += 1
+        self.last_block = block
+        self._write(block)
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        if self._log is not None:
+            self._log.write(record)
+
+    @contextmanager
+    def track(self, kind: str, target: str, log_slow: bool = True) -> Iterator[RequestRecord]:
+        """Register a request for loop-block reports and, if ``log_slow``, record it when it turns out slow."""
+        record = RequestRecord(kind, target)
+        task = asyncio.current_task()
+        with self._requests_lock:
+            previous = self._requests.get(task)
+            self._requests[task] = record
+        try:
+            yield record
+        finally:
+            with self._requests_lock:
+                if previous is not None:
+                    self._requests[task] = previous
+                else:
+                    self._requests.pop(task, None)
+            duration = (record.responded or time.monotonic()) - record.started
+            if log_slow and duration >= self.slow_threshold:
+                self.slow_requests += 1
+                self._write({
+                    "event": "slow_request",
+                    "time": datetime.now(timezone.utc).isoformat(),
+                    "kind": record.kind,
+                    "target": record.target,
+                    "duration_ms": round(duration * 1000, 1),
+                    "status": record.status,
+                    "loop_blocks": record.loop_blocks
+                })
+
+    def stats(self) -> Dict[str, Any]:
+        percentiles = self.lag.percentiles()
+        with self._requests_lock:
+            in_flight = len(self._requests)
+        return {
+            "running": self._task is not None,
+            "samples": self.lag.count,
+            **{f"lag_p{int(quantile * 100)}_ms": round(seconds * 1000, 3) for quantile, seconds in percentiles.items()},
+            "lag_max_ms": round(self.lag.max_micros / 1000, 3),
+            "blocks": self.blocks,
+            "slow_requests": self.slow_requests,
+            "in_flight": in_flight,
+            "last_block": self.last_block
+        }
+
+
+class SlowRequestMiddleware:
+    """Tracks HTTP requests for the loop monitor, timing them until the response starts."""
+
+    def __init__(self, app: ASGIApp, monitor: LoopMonitor, upload_paths: Iterable[str] = ()):
+        self.app = app
+        self.monitor = monitor
+        self._upload_paths = tuple(upload_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        log_slow = not (self._upload_paths and scope["path"].startswith(self._upload_paths))
+        with self.monitor.track("http", f"{scope['method']} {scope['path']}", log_slow) as record:
+            async def send_with_status(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    record.status = message["status"]
+                    record.responded = time.monotonic()
+                await send(message)
+
+            await self.app(scope, receive, send_with_status)
+
+
+class SlowToolCallMiddleware(Middleware):
+    """Tracks MCP tool calls for the loop monitor."""
+
+    def __init__(self, monitor: LoopMonitor):
+        self.monitor = monitor
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next) -> Any:
+        with self.monitor.track("tool", context.message.name) as record:
+            record.status = "error"
+            result = await call_next(context)
+            record.status = "error" if result.is_error else "ok"
+            return result
+
+
+def create_loop_monitor() -> LoopMonitor:
+    """Loop monitor configured from settings."""
+    return LoopMonitor(
+        settings.LOOP_LAG_INTERVAL_MS / 1000,
+        settings.LOOP_BLOCK_THRESHOLD_MS / 1000,
+        settings.SLOW_REQUEST_MS / 1000,
+        SlowLog(settings.SLOW_LOG_PATH, settings.SLOW_LOG_MAX_BYTES, settings.SLOW_LOG_BACKUPS)
+        if settings.SLOW_LOG_PATH else None
+    )
+
+
+loop_monitor = create_loop_monitor()
@@ -0,0 +1,167 @@
+"""Dominant colors of an image with vectorized k-means.
+
+Decoding and clustering both run in a worker process. JPEGs are decoded
+with Pillow's draft mode straight at a reduced scale, and at most
+``MAX_SAMPLE_PIXELS`` randomly chosen pixels are clustered. A 4K photo
+therefore costs about the same as a thumbnail. K-means starts from k-means++
+seeds and stops as soon as no center moves more than ``TOLERANCE``.
+"""
+import base64
+import binascii
+import io
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+import settings
+from colors import nearest_color_names
+from file_tools import resolve_path
+from workers import get_process_pool, process_pool_size
+
+MAX_COLORS = 16
+MAX_SAMPLE_PIXELS = 50_000
+# Images are decoded at no more than about this many pixels before sampling
+DECODE_PIXELS = 1_000_000
+MAX_ITERATIONS = 50
+TOLERANCE = 0.5  # in 0-255 RGB units
+ALPHA_THRESHOLD = 128
+
+
+def decode_pixels(data: bytes) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """Opaque pixels of an encoded image as an (n, 3) float32 array."""
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        image = Image.open(io.BytesIO(data))
+        info = {"format": image.format, "width": image.width, "height": image.height}
+        scale = min(1.0, (DECODE_PIXELS / (image.width * image.height)) ** 0.5)
+        target = (max(1, int(image.width * scale)), max(1, int(image.height * scale)))
+        # Only JPEG honours draft, by decoding at 1/2, 1/4 or 1/8 scale
+        image.draft("RGB", target)
+        image = image.convert("RGBA")
+        image.thumbnail(target)
+    except UnidentifiedImageError:
+        raise ValueError("Unsupported or corrupt image")
+    except (OSError, Image.DecompressionBombError) as e:
+        raise ValueError(f"Could not decode image: {e}")
+
+    rgba = np.asarray(image, dtype=np.uint8).reshape(-1, 4)
+    pixels = rgba[rgba[:, 3] >= ALPHA_THRESHOLD, :3]
+    return pixels.astype(np.float32), info
+
+
+def _kmeans_plus_plus(points: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+    centers = np.empty((k, 3), dtype=np.float32)
+    centers[0] = points[rng.integers(len(points))]
+    closest = ((points - centers[0]) ** 2).sum(axis=1)
+    for i in range(1, k):
+        total = closest.sum()
+        if total == 0:
+            # Fewer distinct colors than clusters
+            centers[i:] = centers[0]
+            break
+        centers[i] = points[rng.choice(len(points), p=closest / total)]
+        np.minimum(closest, ((points - centers[i]) ** 2).sum(axis=1), out=closest)
+    return centers
+
+
+def _squared_distances(points: np.ndarray, squared_norms: np.ndarray, centers: np.ndarray) -> np.ndarray:
+    # |p - c|^2 = |p|^2 - 2 p.c + |c|^2, one matrix product for all pairs
+    distances = squared_norms[:, None] - 2 * points @ centers.T + (centers ** 2).sum(axis=1)
+    return np.maximum(distances, 0, out=distances)
+
+
+def kmeans(points: np.ndarray, k: int, seed: int = 0) -> Tuple[np.ndarray, np.ndarray, int, bool]:
+    """Cluster points into k colors; returns centers, labels, iterations and convergence."""
+    rng = np.random.default_rng(seed)
+    centers = _kmeans_plus_plus(points, k, rng)
+    squared_norms = (points ** 2).sum(axis=1)
+    labels = np.zeros(len(points), dtype=np.intp)
+    converged = False
+    iteration = 0
+    for iteration in range(1, MAX_ITERATIONS + 1):
+        labels = _squared_distances(points, squared_norms, centers).argmin(axis=1)
+        counts = np.bincount(labels, minlength=k)
+        sums = np.stack([np.bincount(labels, weights=points[:, channel], minlength=k) for channel in range(3)], axis=1)
+        updated = centers.copy()
+        filled = counts > 0
+        updated[filled] = sums[filled] / counts[filled, None]
+        shift = np.abs(updated - centers).max()
+        centers = updated
+        if shift <= TOLERANCE:
+            converged = True
+            break
+    labels = _squared_distances(points, squared_norms, centers).argmin(axis=1)
+    return centers, labels, iteration, converged
+
+
+def _extract_palette(data: bytes, color_count: int, seed: int) -> Dict[str, Any]:
+    started = time.perf_counter()
+    pixels, image_info = decode_pixels(data)
+    if len(pixels) == 0:
+        raise ValueError("Image has no opaque pixels")
+    rng = np.random.default_rng(seed)
+    if len(pixels) > MAX_SAMPLE_PIXELS:
+        pixels = pixels[rng.choice(len(pixels), MAX_SAMPLE_PIXELS, replace=False)]
+
+    centers, labels, iterations, converged = kmeans(pixels, color_count, seed)
+    counts = np.bincount(labels, minlength=color_count)
+    order = [index for index in np.argsort(-counts) if counts[index] > 0]
+    names = nearest_color_names(centers[order])
+    colors = []
+    for index, (name, _) in zip(order, names):
+        r, g, b = (int(round(value)) for value in centers[index])
+        colors.append({
+            "hex": f"#{r:02x}{g:02x}{b:02x}",
+            "rgb": f"rgb({r}, {g}, {b})",
+            "name": name,
+            "proportion": round(float(counts[index]) / len(labels), 4)
+        })
+
+    return {
+        "image": image_info,
+        "color_count": len(colors),
+        "colors": colors,
+        "sampled_pixels": len(pixels),
+        "iterations": iterations,
+        "converged": converged,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)
+    }
+
+
+def extract_palette(data: bytes, color_count: int = 5, seed: int = 0) -> Dict[str, Any]:
+    """Dominant colors of an encoded image, largest share first.
+
+    Runs in the shared process pool when it has more than one worker.
+    """
+    if not 1 <= color_count <= MAX_COLORS:
+        raise ValueError(f"color_count must be between 1 and {MAX_COLORS}")
+    if process_pool_size() > 1:
+        return get_process_pool().submit(_extract_palette, data, color_count, seed).result()
+    return _extract_palette(data, color_count, seed)
+
+
+def load_image(image_base64: Optional[str] = None, file_path: Optional[str] = None) -> bytes:
+    """Encoded image bytes from base64 text or a file in the sandbox directory."""
+    if (image_base64 is None) == (file_path is None):
+        raise ValueError("Give exactly one of image_base64 or file_path")
+    if image_base64 is not None:
+        if image_base64.startswith("data:"):
+            image_base64 = image_base64.partition(",")[2]
+        try:
+            data = base64.b64decode(image_base64, validate=True)
+        except binascii.Error:
+            raise ValueError("image_base64 is not valid base64")
+    else:
+        full = resolve_path(file_path)
+        if not os.path.isfile(full):
+            raise ValueError("File does not exist")
+        if os.path.getsize(full) > settings.PALETTE_MAX_IMAGE_BYTES:
+            raise ValueError("Image is too large")
+        with open(full, "rb") as f:
+            data = f.read()
+    if len(data) > settings.PALETTE_MAX_IMAGE_BYTES:
+        raise ValueError("Image is too large")
+    return data
@@ -0,0 +1,135 @@
+"""Bulk password generation and local password-strength checks."""
+import math
+import os
+import secrets
+import string
+from typing import Any, Dict, List, Optional
+
+from bloom import BloomFilter
+
+COMMON_PASSWORDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "common_passwords.txt")
+
+CHARACTER_SETS = {
+    "lowercase": string.ascii_lowercase,
+    "uppercase": string.ascii_uppercase,
+    "letters": string.ascii_letters,
+    "digits": string.digits,
+    "symbols": "!@#$%^&*",
+    "punctuation": string.punctuation,
+}
+DEFAULT_CHARACTER_SETS = "letters,digits,symbols"
+
+# Upper bound on characters produced by one batch call
+MAX_BATCH_CHARACTERS = 1_000_000
+# Below this many characters generating them costs less than a process pool round trip
+MIN_PROCESS_CHARACTERS = 10_000
+
+
+def build_alphabet(character_sets: str = DEFAULT_CHARACTER_SETS, alphabet: Optional[str] = None) -> str:
+    """Resolve named character sets, or a custom alphabet, into unique characters."""
+    if alphabet is None:
+        names = [name.strip() for name in character_sets.split(",") if name.strip()]
+        unknown = [name for name in names if name not in CHARACTER_SETS]
+        if unknown:
+            raise ValueError(f"Unknown character sets: {', '.join(unknown)}")
+        alphabet = "".join(CHARACTER_SETS[name] for name in names)
+    alphabet = "".join(dict.fromkeys(alphabet))
+    if len(alphabet) < 2:
+        raise ValueError("Alphabet must contain at least two distinct characters")
+    if not alphabet.isascii():
+        raise ValueError("Alphabet must contain only ASCII characters")
+    return alphabet
+
+
+def generate_passwords(count: int, length: int, alphabet: str) -> List[str]:
+    """Generate passwords from one block of random bytes.
+
+    Bytes at or above the largest multiple of the alphabet size are rejected,
+    so every character is drawn uniformly. Mapping and rejection both happen
+    in a single ``bytes.translate`` call over the whole buffer.
+    """
+    if count < 1 or length < 1:
+        raise ValueError("count and length must be positive")
+    if count * length > MAX_BATCH_CHARACTERS:
+        raise ValueError(f"count * length must not exceed {MAX_BATCH_CHARACTERS}")
+
+    size = len(alphabet)
+    limit = 256 - 256 % size
+    table = bytes(ord(alphabet[b % size]) for b in range(256))
+    rejected = bytes(range(limit, 256))
+
+    needed = count * length
+    # Expected yield is limit/256 of the buffer; over-draw a little to avoid a top-up
+    accepted = secrets.token_bytes(math.ceil(needed * 256 / limit * 1.05) + 64).translate(table, rejected)
+    while len(accepted) < needed:
+        accepted += secrets.token_bytes(needed - len(accepted) + 64).translate(table, rejected)
+
+    text = accepted[:needed].decode("ascii")
+    return [text[i:i + length] for i in range(0, needed, length)]
+
+
+def load_common_passwords(path: str = COMMON_PASSWORDS_PATH) -> BloomFilter:
+    """Compile the bundled common-password list into a Bloom filter."""
+    with open(path, encoding="utf-8") as f:
+        passwords = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    return BloomFilter.from_iterable(passwords, error_rate=0.0001)
+
+
+COMMON_PASSWORDS = load_common_passwords()
+
+_CLASS_POOLS = (
+    ("lowercase", str.islower, 26),
+    ("uppercase", str.isupper, 26),
+    ("digits", str.isdigit, 10),
+)
+
+
+def check_password_strength(password: str) -> Dict[str, Any]:
+    """Estimate password entropy and check it against common passwords."""
+    classes = []
+    pool = 0
+    for name, test, pool_size in _CLASS_POOLS:
+        if any(test(c) and c.isascii() for c in password):
+            classes.append(name)
+            pool += pool_size
+    if any(c in string.punctuation or c == " " for c in password):
+        classes.append("symbols")
+        pool += 33
+    if not password.isascii():
+        classes.append("other")
+        pool += 100
+
+    is_common = password in COMMON_PASSWORDS or password.lower() in COMMON_PASSWORDS
+    entropy = len(password) * math.log2(pool) if pool else 0.0
+    if is_common:
+        # A listed password falls to a dictionary attack almost immediately
+        entropy = min(entropy, math.log2(COMMON_PASSWORDS.count))
+
+    if entropy < 28:
+        strength = "very weak"
+    elif entropy < 36:
+        strength = "weak"
+    elif entropy < 60:
+        strength = "reasonable"
+    elif entropy < 128:
+        strength = "strong"
+    else:
+        strength = "very strong"
+
+    suggestions = []
+    if is_common:
+        suggestions.append("This password appears in a list of commonly used passwords")
+    if len(password) < 12:
+        suggestions.append("Use at least 12 characters")
+    if len(classes) < 3:
+        suggestions.append("Mix lowercase, uppercase, digits and symbols")
+
+    return {
+        "length": len(password),
+        "character_classes": classes,
+        "pool_size": pool,
+        "entropy_bits": round(entropy, 1),
+        "is_common": is_common,
+        "strength": strength,
+        "suggestions": suggestions
+    }
@@ -0,0 +1,259 @@
+"""On-demand sampling profiles of single requests and tool calls.
+
+A request is profiled only when it carries the profiling token, which is
+the value of ``settings.PROFILE_TOKEN``:
+
+- HTTP requests send it as an ``X-Profile`` header or a ``profile`` query
+  parameter. The response carries an ``X-Profile-Id`` header.
+- MCP ``tools/call`` requests send it as ``profile`` in their ``_meta``.
+  The result's ``_meta`` carries ``profile_id``.
+
+While the request runs, ``StackSampler`` reads the stack of every thread
+in the process every ``PROFILE_SAMPLE_INTERVAL_MS``. This covers the event
+loop and the tool and I/O thread pools, but not the worker processes:
+process-pool time shows up as the loop awaiting the result. Other requests
+running at the same time show up too. The stacks are kept in collapsed
+form, one ``frame;frame;frame count`` line per distinct stack, which
+flamegraph.pl, speedscope and inferno read directly. Finished profiles go
+to a bounded side store and are fetched with ``GET /profiles/{id}``.
+
+Only one profile runs at a time. A request that asks for one while
+another runs is served normally and marked as not profiled. Without a
+token configured, the middlewares are not installed at all, so
+unprofiled requests pay nothing.
+"""
+import collections
+import contextvars
+import hmac
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from types import CodeType, FrameType
+from typing import Any, Counter, Dict, Iterator, List, Optional
+from urllib.parse import parse_qs
+
+from fastmcp.server.middleware import Middleware, MiddlewareContext
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+import settings
+from caching import LRUCache
+from tracing import request_meta
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_QUERY_PARAMETER = "profile"
+PROFILE_META_KEY = "profile"
+# Where stored profiles are read; reading them is never profiled
+PROFILES_PATH = "/profiles"
+
+# Innermost frames of threads that are only waiting for work
+_IDLE_FRAMES = {("threading.py", "wait"), ("thread.py", "_worker")}
+_profiling = contextvars.ContextVar("profiling", default=False)
+
+
+def _frame_label(code: CodeType, labels: Dict[CodeType, str]) -> str:
+    label = labels.get(code)
+    if label is None:
+        name = getattr(code, "co_qualname", code.co_name)
+        label = labels[code] = f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    return label
+
+
+class StackSampler:
+    """Counts the collapsed stacks of all threads from a background thread."""
+
+    def __init__(self, interval: float, max_seconds: float):
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.stacks: Counter[str] = collections.Counter()
+        self.samples = 0
+        self._labels: Dict[CodeType, str] = {}
+        self._thread_names: Dict[int, str] = {}
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+    def _thread_name(self, ident: int) -> str:
+        name = self._thread_names.get(ident)
+        if name is None:
+            self._thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            name = self._thread_names.setdefault(ident, f"thread-{ident}")
+        return name
+
+    def _collapse(self, frame: FrameType) -> Optional[str]:
+        code = frame.f_code
+        if (os.path.basename(code.co_filename), code.co_name) in _IDLE_FRAMES:
+            return None
+        frames: List[str] = []
+        current: Optional[FrameType] = frame
+        while current is not None:
+            frames.append(_frame_label(current.f_code, self._labels))
+            current = current.f_back
+        return ";".join(reversed(frames))
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        deadline = time.monotonic() + self.max_seconds
+        while not self._stopped.wait(self.interval) and time.monotonic() < deadline:
+            self.samples += 1
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = self._collapse(frame)
+                if stack is not None:
+                    self.stacks[f"{self._thread_name(ident)};{stack}"] += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class Profile:
+    """Samples of one profiled request or tool call."""
+
+    def __init__(self, target: str, interval: float):
+        self.id = uuid.uuid4().hex[:12]
+        self.target = target
+        self.interval = interval
+        self.started_at = time.time()
+        self.duration = 0.0
+        self.samples = 0
+        self.collapsed = ""
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "target": self.target,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 2),
+            "samples": self.samples,
+            "sample_interval_ms": round(self.interval * 1000, 3)
+        }
+
+
+class Profiler:
+    """Runs one sampling profile at a time and keeps the latest ones."""
+
+    def __init__(self, token: str, interval: float, max_seconds: float, store_size: int):
+        self.token = token
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self._profiles = LRUCache(store_size)
+        self._running = threading.Lock()
+        self.profiled = 0
+        self.busy = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.token)
+
+    def authorized(self, token: Optional[str]) -> bool:
+        return self.enabled and token is not None and hmac.compare_digest(token.encode(), self.token.encode())
+
+    @contextmanager
+    def profile(self, target: str) -> Iterator[Optional[Profile]]:
+        """Sample the enclosed block, or yield None while another profile runs."""
+        if _profiling.get() or not self._running.acquire(blocking=False):
+            self.busy += 1
+            yield None
+            return
+        profile = Profile(target, self.interval)
+        sampler = StackSampler(self.interval, self.max_seconds)
+        token = _profiling.set(True)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            yield profile
+        finally:
+            sampler.stop()
+            _profiling.reset(token)
+            self._running.release()
+            profile.duration = time.perf_counter() - started
+            profile.samples = sampler.samples
+            profile.collapsed = sampler.collapsed()
+            self._profiles.put(profile.id, profile)
+            self.profiled += 1
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        return self._profiles.get(profile_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        return [profile.summary() for profile in reversed(self._profiles.values())]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, "profiled": self.profiled, "busy": self.busy, "stored": len(self._profiles)}
+
+
+class ProfilingMiddleware:
+    """Profiles HTTP requests that carry the profiling token."""
+
+    def __init__(self, app: ASGIApp, profiler: Profiler):
+        self.app = app
+        self.profiler = profiler
+
+    @staticmethod
+    def _token(scope: Scope) -> Optional[str]:
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                return value.decode("latin-1")
+        query = scope.get("query_string", b"")
+        if PROFILE_QUERY_PARAMETER.encode() in query:
+            values = parse_qs(query.decode("latin-1")).get(PROFILE_QUERY_PARAMETER)
+            return values[0] if values else None
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["path"].startswith(PROFILES_PATH)
+            or not self.profiler.authorized(self._token(scope))
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        with self.profiler.profile(f"{scope['method']} {scope['path']}") as profile:
+            header = (b"x-profile-id", profile.id.encode()) if profile else (b"x-profile-status", b"busy")
+
+            async def send_with_profile(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    message = dict(message)
+                    message["headers"] = [*message.get("headers", []), header]
+                await send(message)
+
+            await self.app(scope, receive, send_with_profile)
+
+
+class ToolProfilingMiddleware(Middleware):
+    """Profiles MCP tool calls whose _meta carries the profiling token."""
+
+    def __init__(self, profiler: Profiler):
+        self.profiler = profiler
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next) -> Any:
+        if _profiling.get() or not self.profiler.authorized(request_meta(context).get(PROFILE_META_KEY)):
+            return await call_next(context)
+        tool = context.message.name
+        with self.profiler.profile(f"tools/call {tool}") as profile:
+            result = await call_next(context)
+        meta = {"profile_id": profile.id} if profile else {"profile_status": "busy"}
+        return result.model_copy(update={"meta": {**(result.meta or {}), **meta}})
+
+
+def create_profiler() -> Profiler:
+    """Profiler configured from settings; disabled without ``PROFILE_TOKEN``."""
+    return Profiler(
+        settings.PROFILE_TOKEN,
+        settings.PROFILE_SAMPLE_INTERVAL_MS / 1000,
+        settings.PROFILE_MAX_SECONDS,
+        settings.PROFILE_STORE_SIZE
+    )
+
+
+profiler = create_profiler()
@@ -0,0 +1,159 @@
+"""Progress, partial results and cancellation for long-running tools.
+
+Engine functions that take a while accept an optional ``progress``
+callable and call it as ``progress(done, total)`` at natural checkpoints:
+per shard, per chunk or per directory. ``total`` may be None when it is not
+known up front. The callable is safe to use from worker threads. It does
+two things:
+
+- it forwards MCP progress notifications with throughput and an ETA to the
+  client, if the client sent a progress token, at most once per
+  ``settings.PROGRESS_INTERVAL_MS``;
+- it raises ``ToolCancelled`` once the tool call has been cancelled, has
+  run past its deadline or has finished, so that work still running in a
+  pool stops at its next checkpoint instead of running to completion for
+  nobody.
+
+``ProgressReporter.partial`` sends a piece of the result ahead of the
+final response, as a log notification from the ``partial_result`` logger.
+"""
+import asyncio
+import contextvars
+import json
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Callable, Iterator, Optional, Set
+
+import settings
+
+PARTIAL_RESULT_LOGGER = "partial_result"
+
+# progress(done, total) as passed to engine functions
+ProgressCallback = Callable[[int, Optional[int]], None]
+
+# Tools called from inside another tool (call_many) must not send their own
+# notifications for the outer call's progress token
+_notify = contextvars.ContextVar("progress_notify", default=True)
+# Reporters created by the tool call that is running, for cancelling them
+# from the middleware that gave up on it
+_call_reporters = contextvars.ContextVar("call_reporters", default=None)
+
+
+class ToolCancelled(Exception):
+    """Raised at a progress checkpoint of work whose tool call has ended."""
+
+
+@contextmanager
+def nested_call() -> Iterator[None]:
+    """Silence progress notifications of tools called by another tool."""
+    token = _notify.set(False)
+    try:
+        yield
+    finally:
+        _notify.reset(token)
+
+
+@contextmanager
+def call_reporters() -> Iterator[Set["ProgressReporter"]]:
+    """Collect the progress reporters created while a tool call runs."""
+    reporters: Set[ProgressReporter] = set()
+    token = _call_reporters.set(reporters)
+    try:
+        yield reporters
+    finally:
+        _call_reporters.reset(token)
+
+
+def _format_seconds(seconds: float) -> str:
+    if seconds < 60:
+        return f"{seconds:.1f}s"
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes}m{seconds:02d}s" if minutes < 60 else f"{minutes // 60}h{minutes % 60:02d}m"
+
+
+class ProgressReporter:
+    """Progress callback for one tool call."""
+
+    def __init__(self, ctx: Any, unit: str, interval: float):
+        self._ctx = ctx if _notify.get() else None
+        self.unit = unit
+        self.interval = interval
+        self.cancelled = threading.Event()
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self._last_sent = 0.0
+        self._tasks: Set[asyncio.Task] = set()
+        self.done = 0
+        self.total: Optional[int] = None
+
+    def __call__(self, done: int, total: Optional[int] = None) -> None:
+        if self.cancelled.is_set():
+            raise ToolCancelled("Tool call was cancelled")
+        now = time.monotonic()
+        with self._lock:
+            self.done, self.total = done, total
+            finished = total is not None and done >= total
+            if self._ctx is None or (now - self._last_sent < self.interval and not finished):
+                return
+            self._last_sent = now
+        elapsed = max(now - self._started, 1e-9)
+        rate = done / elapsed
+        message = f"{done:,}{f'/{total:,}' if total is not None else ''} {self.unit}, {rate:,.0f} {self.unit}/s"
+        if total is not None and 0 < rate and done < total:
+            message += f", ETA {_format_seconds((total - done) / rate)}"
+        self._send(self._ctx.report_progress(done, total, message))
+
+    def partial(self, data: Any) -> None:
+        """Send part of the result to the client before the tool returns."""
+        if self.cancelled.is_set():
+            raise ToolCancelled("Tool call was cancelled")
+        if self._ctx is not None:
+            self._send(self._ctx.log(json.dumps(data), level="info", logger_name=PARTIAL_RESULT_LOGGER))
+
+    def _send(self, notification) -> None:
+        if threading.get_ident() == self._loop_thread:
+            self._start(notification)
+        else:
+            self._loop.call_soon_threadsafe(self._start, notification)
+
+    def _start(self, notification) -> None:
+        if self.cancelled.is_set():
+            notification.close()
+            return
+        task = self._loop.create_task(notification)
+        self._tasks.add(task)
+        task.add_done_callback(self._finished)
+
+    def _finished(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled():
+            # A client that went away is no reason to fail the tool
+            task.exception()
+
+    def cancel(self) -> None:
+        """Make work still running stop at its next checkpoint."""
+        self.cancelled.set()
+
+    async def close(self) -> None:
+        """Stop further progress and let notifications already sent go out first."""
+        if self._tasks:
+            await asyncio.wait(set(self._tasks), timeout=1.0)
+        self.cancelled.set()
+
+
+@asynccontextmanager
+async def tool_progress(ctx: Any, unit: str) -> AsyncIterator[ProgressReporter]:
+    """A progress reporter that cancels leftover pool work when the call ends."""
+    reporter = ProgressReporter(ctx, unit, settings.PROGRESS_INTERVAL_MS / 1000)
+    reporters = _call_reporters.get()
+    if reporters is not None:
+        reporters.add(reporter)
+    try:
+        yield reporter
+    except BaseException:
+        reporter.cancel()
+        raise
+    await reporter.close()
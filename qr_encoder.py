@@ -0,0 +1,478 @@
+"""Pure-Python QR code encoder with PNG and SVG rendering.
+
+Supports byte-mode segments, versions 1-40 and all four error-correction
+levels. The smallest version that fits the data is chosen, and unless a
+mask is requested the one with the lowest penalty score is used.
+"""
+import re
+import struct
+import zipfile
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import settings
+from caching import ByteLRUCache
+
+ERROR_CORRECTION_LEVELS = ("L", "M", "Q", "H")
+# Format-information bits of each level (ISO/IEC 18004 table 12)
+_FORMAT_BITS = {"L": 1, "M": 0, "Q": 3, "H": 2}
+
+# Indexed by [level][version]; index 0 is unused
+_ECC_CODEWORDS_PER_BLOCK = {
+    "L": (-1, 7, 10, 15, 20, 26, 18, 20, 24, 30, 18, 20, 24, 26, 30, 22, 24, 28, 30, 28, 28, 28, 28, 30, 30, 26, 28, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30),
+    "M": (-1, 10, 16, 26, 18, 24, 16, 18, 22, 22, 26, 30, 22, 22, 24, 24, 28, 28, 26, 26, 26, 26, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28),
+    "Q": (-1, 13, 22, 18, 26, 18, 24, 18, 22, 20, 24, 28, 26, 24, 20, 30, 24, 28, 28, 26, 30, 28, 30, 30, 30, 30, 28, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30),
+    "H": (-1, 17, 28, 22, 16, 22, 28, 26, 26, 24, 28, 24, 28, 22, 24, 24, 30, 28, 28, 26, 28, 30, 24, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30),
+}
+_NUM_ERROR_CORRECTION_BLOCKS = {
+    "L": (-1, 1, 1, 1, 1, 1, 2, 2, 2, 2, 4, 4, 4, 4, 4, 6, 6, 6, 6, 7, 8, 8, 9, 9, 10, 12, 12, 12, 13, 14, 15, 16, 17, 18, 19, 19, 20, 21, 22, 24, 25),
+    "M": (-1, 1, 1, 1, 2, 2, 4, 4, 4, 5, 5, 5, 8, 9, 9, 10, 10, 11, 13, 14, 16, 17, 17, 18, 20, 21, 23, 25, 26, 28, 29, 31, 33, 35, 37, 38, 40, 43, 45, 47, 49),
+    "Q": (-1, 1, 1, 2, 2, 4, 4, 6, 6, 8, 8, 8, 10, 12, 16, 12, 17, 16, 18, 21, 20, 23, 23, 25, 27, 29, 34, 34, 35, 38, 40, 43, 45, 48, 51, 53, 56, 59, 62, 65, 68),
+    "H": (-1, 1, 1, 2, 4, 4, 4, 5, 6, 8, 8, 11, 11, 16, 16, 18, 16, 19, 21, 25, 25, 25, 34, 30, 32, 35, 37, 40, 42, 45, 48, 51, 54, 57, 60, 63, 66, 70, 74, 77, 81),
+}
+
+_MASK_PATTERNS = (
+    lambda x, y: (x + y) % 2 == 0,
+    lambda x, y: y % 2 == 0,
+    lambda x, y: x % 3 == 0,
+    lambda x, y: (x + y) % 3 == 0,
+    lambda x, y: (x // 3 + y // 2) % 2 == 0,
+    lambda x, y: x * y % 2 + x * y % 3 == 0,
+    lambda x, y: (x * y % 2 + x * y % 3) % 2 == 0,
+    lambda x, y: ((x + y) % 2 + x * y % 3) % 2 == 0,
+)
+
+# 1:1:3:1:1 finder-like pattern next to four light modules, as row strings
+_FINDER_LIKE = ("10111010000", "00001011101")
+_RUN_RE = re.compile(r"0{5,}|1{5,}")
+_MODULE_CHARS = bytes.maketrans(b"\x00\x01", b"01")
+
+# Per-version XOR masks, one big integer per row (a byte per module)
+_MASK_ROWS = {}
+
+
+class DataTooLongError(ValueError):
+    """The data does not fit in a version 40 symbol at the requested level."""
+
+
+# ---- Reed-Solomon over GF(256) with the 0x11D polynomial ----
+
+def _gf_multiply(x: int, y: int) -> int:
+    z = 0
+    for i in reversed(range(8)):
+        z = (z << 1) ^ ((z >> 7) * 0x11D)
+        z ^= ((y >> i) & 1) * x
+    return z
+
+
+# Antilog table doubled in length so exponent sums need no modulo
+_GF_EXP = [0] * 512
+_GF_LOG = [0] * 256
+_value = 1
+for _exponent in range(255):
+    _GF_EXP[_exponent] = _GF_EXP[_exponent + 255] = _value
+    _GF_LOG[_value] = _exponent
+    _value = _gf_multiply(_value, 0x02)
+
+
+def _rs_divisor(degree: int) -> List[int]:
+    result = [0] * (degree - 1) + [1]
+    root = 1
+    for _ in range(degree):
+        for j in range(degree):
+            result[j] = _gf_multiply(result[j], root)
+            if j + 1 < degree:
+                result[j] ^= result[j + 1]
+        root = _gf_multiply(root, 0x02)
+    return result
+
+
+def _rs_remainder(data: List[int], divisor: List[int]) -> List[int]:
+    exp = _GF_EXP
+    divisor_logs = [_GF_LOG[c] if c else None for c in divisor]
+    result = [0] * len(divisor)
+    for byte in data:
+        factor = byte ^ result.pop(0)
+        result.append(0)
+        if factor:
+            factor_log = _GF_LOG[factor]
+            for i, coefficient_log in enumerate(divisor_logs):
+                if coefficient_log is not None:
+                    result[i] ^= exp[coefficient_log + factor_log]
+    return result
+
+
+# ---- Capacity ----
+
+def _num_raw_data_modules(version: int) -> int:
+    result = (16 * version + 128) * version + 64
+    if version >= 2:
+        num_align = version // 7 + 2
+        result -= (25 * num_align - 10) * num_align - 55
+        if version >= 7:
+            result -= 36
+    return result
+
+
+def _num_data_codewords(version: int, level: str) -> int:
+    return (_num_raw_data_modules(version) // 8
+            - _ECC_CODEWORDS_PER_BLOCK[level][version] * _NUM_ERROR_CORRECTION_BLOCKS[level][version])
+
+
+def _alignment_pattern_positions(version: int) -> List[int]:
+    if version == 1:
+        return []
+    num_align = version // 7 + 2
+    size = version * 4 + 17
+    step = (version * 8 + num_align * 3 + 5) // (num_align * 4 - 4) * 2
+    return [6] + [size - 7 - i * step for i in reversed(range(num_align - 1))]
+
+
+class QrCode:
+    """An encoded QR symbol: a square grid of dark (1) and light (0) modules."""
+
+    def __init__(self, data: bytes, level: str = "M", mask: Optional[int] = None, min_version: int = 1):
+        level = level.upper()
+        if level not in _FORMAT_BITS:
+            raise ValueError(f"Error correction level must be one of {', '.join(ERROR_CORRECTION_LEVELS)}")
+        if mask is not None and not 0 <= mask <= 7:
+            raise ValueError("Mask must be between 0 and 7")
+
+        for version in range(max(1, min_version), 41):
+            count_bits = 8 if version < 10 else 16
+            if 4 + count_bits + 8 * len(data) <= _num_data_codewords(version, level) * 8:
+                break
+        else:
+            raise DataTooLongError("Data too long for a QR code at this error correction level")
+
+        self.version = version
+        self.level = level
+        self.size = version * 4 + 17
+        self._modules = [bytearray(self.size) for _ in range(self.size)]
+        self._is_function = [bytearray(self.size) for _ in range(self.size)]
+
+        self._draw_function_patterns()
+        self._draw_codewords(self._add_ecc_and_interleave(self._data_codewords(data, count_bits)))
+
+        if mask is None:
+            best_penalty = None
+            for candidate in range(8):
+                self._apply_mask(candidate)
+                self._draw_format_bits(candidate)
+                penalty = self._penalty_score()
+                if best_penalty is None or penalty < best_penalty:
+                    mask, best_penalty = candidate, penalty
+                self._apply_mask(candidate)  # masks are XOR, so this undoes it
+        self.mask = mask
+        self._apply_mask(mask)
+        self._draw_format_bits(mask)
+        self._is_function = None
+
+    @property
+    def modules(self) -> List[bytearray]:
+        return self._modules
+
+    # ---- Data encoding ----
+
+    def _data_codewords(self, data: bytes, count_bits: int) -> List[int]:
+        capacity_bits = _num_data_codewords(self.version, self.level) * 8
+        bits = (0b0100 << count_bits | len(data)) << (8 * len(data)) | int.from_bytes(data, "big")
+        bit_length = 4 + count_bits + 8 * len(data)
+
+        terminator = min(4, capacity_bits - bit_length)
+        bits <<= terminator
+        bit_length += terminator
+        padding = -bit_length % 8
+        bits <<= padding
+        bit_length += padding
+
+        codewords = list(bits.to_bytes(bit_length // 8, "big")) if bit_length else []
+        pad = 0xEC
+        while len(codewords) < capacity_bits // 8:
+            codewords.append(pad)
+            pad ^= 0xEC ^ 0x11
+        return codewords
+
+    def _add_ecc_and_interleave(self, data: List[int]) -> List[int]:
+        version, level = self.version, self.level
+        num_blocks = _NUM_ERROR_CORRECTION_BLOCKS[level][version]
+        block_ecc_len = _ECC_CODEWORDS_PER_BLOCK[level][version]
+        raw_codewords = _num_raw_data_modules(version) // 8
+        num_short_blocks = num_blocks - raw_codewords % num_blocks
+        short_block_len = raw_codewords // num_blocks
+
+        divisor = _rs_divisor(block_ecc_len)
+        blocks = []
+        k = 0
+        for i in range(num_blocks):
+            length = short_block_len - block_ecc_len + (0 if i < num_short_blocks else 1)
+            block = data[k:k + length]
+            k += length
+            ecc = _rs_remainder(block, divisor)
+            if i < num_short_blocks:
+                block.append(0)  # placeholder so all blocks have equal length
+            blocks.append(block + ecc)
+
+        result = []
+        for i in range(len(blocks[0])):
+            for j, block in enumerate(blocks):
+                if i != short_block_len - block_ecc_len or j >= num_short_blocks:
+                    result.append(block[i])
+        return result
+
+    # ---- Module placement ----
+
+    def _set_function(self, x: int, y: int, dark: bool) -> None:
+        self._modules[y][x] = dark
+        self._is_function[y][x] = 1
+
+    def _draw_function_patterns(self) -> None:
+        size = self.size
+        for i in range(size):
+            self._set_function(6, i, i % 2 == 0)
+            self._set_function(i, 6, i % 2 == 0)
+
+        for x, y in ((3, 3), (size - 4, 3), (3, size - 4)):
+            for dy in range(-4, 5):
+                for dx in range(-4, 5):
+                    xx, yy = x + dx, y + dy
+                    if 0 <= xx < size and 0 <= yy < size:
+                        self._set_function(xx, yy, max(abs(dx), abs(dy)) not in (2, 4))
+
+        positions = _alignment_pattern_positions(self.version)
+        last = len(positions) - 1
+        for i, x in enumerate(positions):
+            for j, y in enumerate(positions):
+                # Skip the three corners occupied by finder patterns
+                if (i, j) in ((0, 0), (0, last), (last, 0)):
+                    continue
+                for dy in range(-2, 3):
+                    for dx in range(-2, 3):
+                        self._set_function(x + dx, y + dy, max(abs(dx), abs(dy)) != 1)
+
+        self._draw_format_bits(0)  # reserve the area; real bits are drawn after masking
+        self._draw_version()
+
+    def _draw_format_bits(self, mask: int) -> None:
+        data = _FORMAT_BITS[self.level] << 3 | mask
+        remainder = data
+        for _ in range(10):
+            remainder = (remainder << 1) ^ ((remainder >> 9) * 0x537)
+        bits = (data << 10 | remainder) ^ 0x5412
+        size = self.size
+
+        for i in range(6):
+            self._set_function(8, i, (bits >> i) & 1)
+        self._set_function(8, 7, (bits >> 6) & 1)
+        self._set_function(8, 8, (bits >> 7) & 1)
+        self._set_function(7, 8, (bits >> 8) & 1)
+        for i in range(9, 15):
+            self._set_function(14 - i, 8, (bits >> i) & 1)
+
+        for i in range(8):
+            self._set_function(size - 1 - i, 8, (bits >> i) & 1)
+        for i in range(8, 15):
+            self._set_function(8, size - 15 + i, (bits >> i) & 1)
+        self._set_function(8, size - 8, True)  # always-dark module
+
+    def _draw_version(self) -> None:
+        if self.version < 7:
+            return
+        remainder = self.version
+        for _ in range(12):
+            remainder = (remainder << 1) ^ ((remainder >> 11) * 0x1F25)
+        bits = self.version << 12 | remainder
+        for i in range(18):
+            bit = (bits >> i) & 1
+            a, b = self.size - 11 + i % 3, i // 3
+            self._set_function(a, b, bit)
+            self._set_function(b, a, bit)
+
+    def _draw_codewords(self, codewords: List[int]) -> None:
+        size = self.size
+        total_bits = len(codewords) * 8
+        i = 0
+        right = size - 1
+        while right >= 1:
+            if right == 6:
+                right = 5  # skip the vertical timing pattern
+            upward = (right + 1) & 2 == 0
+            for vert in range(size):
+                y = size - 1 - vert if upward else vert
+                for x in (right, right - 1):
+                    if not self._is_function[y][x] and i < total_bits:
+                        self._modules[y][x] = (codewords[i >> 3] >> (7 - (i & 7))) & 1
+                        i += 1
+            right -= 2
+
+    def _mask_rows(self, mask: int) -> List[int]:
+        key = (self.version, mask)
+        rows = _MASK_ROWS.get(key)
+        if rows is None:
+            pattern = _MASK_PATTERNS[mask]
+            rows = [
+                int.from_bytes(bytes(
+                    not is_function[x] and pattern(x, y) for x in range(self.size)
+                ), "big")
+                for y, is_function in enumerate(self._is_function)
+            ]
+            _MASK_ROWS[key] = rows
+        return rows
+
+    def _apply_mask(self, mask: int) -> None:
+        size = self.size
+        modules = self._modules
+        for y, mask_row in enumerate(self._mask_rows(mask)):
+            modules[y] = bytearray((int.from_bytes(modules[y], "big") ^ mask_row).to_bytes(size, "big"))
+
+    # ---- Mask selection ----
+
+    def _penalty_score(self) -> int:
+        size = self.size
+        rows = [row.translate(_MODULE_CHARS).decode("ascii") for row in self._modules]
+        columns = ["".join(column) for column in zip(*rows)]
+        penalty = 0
+
+        for line in rows + columns:
+            # Runs of five or more modules of the same color
+            for run in _RUN_RE.finditer(line):
+                penalty += run.end() - run.start() - 2
+            # Finder-like patterns
+            for pattern in _FINDER_LIKE:
+                penalty += 40 * line.count(pattern)
+
+        # 2x2 blocks of one color, found with bitwise ops on whole rows
+        full = (1 << size) - 1
+        bit_rows = [int(row, 2) for row in rows]
+        for upper, lower in zip(bit_rows, bit_rows[1:]):
+            same_vertical = ~(upper ^ lower) & full
+            same_block = same_vertical & (same_vertical >> 1) & ~(upper ^ (upper >> 1)) & (full >> 1)
+            penalty += 3 * bin(same_block).count("1")
+
+        # Balance of dark and light modules
+        dark = sum(row.count("1") for row in rows)
+        total = size * size
+        k = (abs(dark * 20 - total * 10) + total - 1) // total - 1
+        return penalty + k * 10
+
+
+# ---- Rendering ----
+
+def _png_chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+def render_png(qr: QrCode, scale: int = 8, border: int = 4) -> bytes:
+    """Render a QR code as a 1-bit grayscale PNG."""
+    width = (qr.size + 2 * border) * scale
+    quiet_row = "1" * (qr.size + 2 * border)
+    row_bytes = (width + 7) // 8
+    scanlines = []
+    for y in range(-border, qr.size + border):
+        if 0 <= y < qr.size:
+            bits = "1" * border + "".join("0" if m else "1" for m in qr.modules[y]) + "1" * border
+        else:
+            bits = quiet_row
+        pixels = "".join(bit * scale for bit in bits)
+        pixels += "0" * (row_bytes * 8 - width)
+        line = b"\x00" + int(pixels, 2).to_bytes(row_bytes, "big")
+        scanlines.extend([line] * scale)
+
+    header = struct.pack(">IIBBBBB", width, width, 1, 0, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n"
+            + _png_chunk(b"IHDR", header)
+            + _png_chunk(b"IDAT", zlib.compress(b"".join(scanlines), 9))
+            + _png_chunk(b"IEND", b""))
+
+
+def render_svg(qr: QrCode, border: int = 4) -> bytes:
+    """Render a QR code as an SVG document, one path for all dark modules."""
+    dimension = qr.size + 2 * border
+    parts = []
+    for y, row in enumerate(qr.modules):
+        for x, module in enumerate(row):
+            if module:
+                parts.append(f"M{x + border},{y + border}h1v1h-1z")
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<svg xmlns="http://www.w3.org/2000/svg" version="1.1" viewBox="0 0 {dimension} {dimension}" stroke="none">\n'
+        '<rect width="100%" height="100%" fill="#FFFFFF"/>\n'
+        f'<path d="{" ".join(parts)}" fill="#000000"/>\n'
+        '</svg>\n'
+    ).encode("utf-8")
+
+
+def encode_qr(text: str, level: str = "M", mask: Optional[int] = None) -> QrCode:
+    """Encode UTF-8 text as a QR code."""
+    return QrCode(text.encode("utf-8"), level, mask)
+
+
+def render_qr(text: str, level: str = "M", image_format: str = "png", scale: int = 8,
+              border: int = 4) -> Tuple[bytes, str, QrCode]:
+    """Encode and render text; returns the image bytes, MIME type and symbol."""
+    if not 1 <= scale <= 64:
+        raise ValueError("Scale must be between 1 and 64")
+    if not 0 <= border <= 32:
+        raise ValueError("Border must be between 0 and 32")
+    qr = encode_qr(text, level)
+    image_format = image_format.lower()
+    if image_format == "png":
+        return render_png(qr, scale, border), "image/png", qr
+    if image_format == "svg":
+        return render_svg(qr, border), "image/svg+xml", qr
+    raise ValueError("Format must be 'png' or 'svg'")
+
+
+# ---- Cached rendering and batch output ----
+
+render_cache = ByteLRUCache(settings.QR_CACHE_BYTES)
+
+
+def render_qr_cached(text: str, level: str = "M", image_format: str = "png", scale: int = 8,
+                     border: int = 4) -> Tuple[bytes, Dict[str, Any]]:
+    """Render through the byte-bounded cache; returns image bytes and metadata."""
+    key = (text, level.upper(), image_format.lower(), scale, border)
+    entry = render_cache.get(key)
+    if entry is not None:
+        return entry
+    image, mime_type, qr = render_qr(text, level, image_format, scale, border)
+    metadata = {"mime_type": mime_type, "version": qr.version, "modules": qr.size,
+                "error_correction": qr.level, "mask": qr.mask}
+    render_cache.put(key, image, metadata)
+    return image, metadata
+
+
+class _ZipStreamBuffer:
+    """Write-only sink that lets ZipFile emit an archive piece by piece."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_qr_zip(texts: Iterable[str], level: str = "M", image_format: str = "png", scale: int = 8,
+                border: int = 4) -> Iterator[bytes]:
+    """Yield a ZIP archive of rendered codes, one member at a time.
+
+    The sink is not seekable, so ZipFile writes data descriptors after each
+    member and only the member being rendered is ever held in memory.
+    """
+    buffer = _ZipStreamBuffer()
+    extension = image_format.lower()
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_STORED) as archive:
+        for index, text in enumerate(texts, start=1):
+            image, _ = render_qr_cached(text, level, image_format, scale, border)
+            archive.writestr(f"qr_{index:05d}.{extension}", image)
+            yield buffer.drain()
+    yield buffer.drain()
@@ -0,0 +1,134 @@
+"""Lexicon-based sentiment scoring.
+
+The bundled lexicon (``data/sentiment_lexicon.tsv``) is compiled once at
+import into a read-only mapping. Scoring is a single pass over the tokens:
+intensifiers scale the next sentiment word and a negator flips the polarity
+of the first sentiment word that follows it within a short window.
+"""
+import os
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional
+
+from progress import ProgressCallback
+from text_analysis import TEXT_CHUNK_CHARS, analyze_large_text, analyze_text, tokenize
+
+LEXICON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "sentiment_lexicon.tsv")
+
+NEGATORS = frozenset({
+    "not", "no", "never", "none", "nobody", "nothing", "neither", "nor", "without", "hardly",
+    "don't", "doesn't", "didn't", "isn't", "aren't", "wasn't", "weren't", "won't", "wouldn't",
+    "can't", "cannot", "couldn't", "shouldn't", "haven't", "hasn't", "hadn't", "ain't",
+})
+
+INTENSIFIERS = MappingProxyType({
+    "very": 1.5, "really": 1.5, "extremely": 2.0, "incredibly": 2.0, "so": 1.3, "too": 1.3,
+    "super": 1.5, "totally": 1.5, "absolutely": 1.8, "highly": 1.5, "quite": 1.2, "most": 1.3,
+    "slightly": 0.5, "somewhat": 0.6, "barely": 0.4, "kinda": 0.6, "little": 0.6, "bit": 0.6,
+})
+
+# Negated words keep part of their strength with the opposite sign
+NEGATION_FACTOR = -0.75
+# Number of tokens after a negator within which it can still apply
+NEGATION_WINDOW = 3
+# Comparative scores beyond this are labelled positive or negative
+NEUTRAL_THRESHOLD = 0.05
+
+
+def load_lexicon(path: str = LEXICON_PATH) -> Mapping[str, float]:
+    """Compile a ``word<TAB>valence`` lexicon file into a frozen mapping."""
+    entries = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            word, valence = line.split("\t")
+            entries[word] = float(valence)
+    return MappingProxyType(entries)
+
+
+LEXICON = load_lexicon()
+
+
+def score_sentiment(text: str, lexicon: Mapping[str, float] = LEXICON) -> Dict[str, Any]:
+    """Score the sentiment of one text."""
+    tokens = tokenize(text)
+    score = 0.0
+    positive = negative = 0
+    negation_left = 0
+    boost = 1.0
+    intensifiers = INTENSIFIERS
+
+    for token in tokens:
+        valence = lexicon.get(token)
+        if valence is not None:
+            valence *= boost
+            if negation_left:
+                valence *= NEGATION_FACTOR
+                negation_left = 1
+            if valence > 0:
+                positive += 1
+            elif valence < 0:
+                negative += 1
+            score += valence
+            boost = 1.0
+        elif token in NEGATORS:
+            negation_left = NEGATION_WINDOW + 1
+        elif token in intensifiers:
+            boost *= intensifiers[token]
+            continue
+        else:
+            boost = 1.0
+        if negation_left:
+            negation_left -= 1
+
+    comparative = score / len(tokens) if tokens else 0.0
+    if comparative > NEUTRAL_THRESHOLD:
+        label = "positive"
+    elif comparative < -NEUTRAL_THRESHOLD:
+        label = "negative"
+    else:
+        label = "neutral"
+
+    return {
+        "score": round(score, 3),
+        "comparative": round(comparative, 4),
+        "label": label,
+        "positive_words": positive,
+        "negative_words": negative,
+        "token_count": len(tokens)
+    }
+
+
+def analyze_text_with_sentiment(text: str, progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+    """Text statistics plus sentiment, in one call so a worker receives the text once.
+
+    Texts longer than ``TEXT_CHUNK_CHARS`` are analyzed chunk by chunk and
+    report their progress to ``progress``.
+    """
+    if len(text) > TEXT_CHUNK_CHARS:
+        stats = analyze_large_text(text, progress)
+    else:
+        stats = analyze_text(text)
+    return {**stats, "sentiment": score_sentiment(text)}
+
+
+def score_sentiments(texts: List[str], progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+    """Score many texts in one call and summarize the batch.
+
+    ``progress`` is called with the number of texts scored so far.
+    """
+    results = []
+    for text in texts:
+        results.append(score_sentiment(text))
+        if progress is not None:
+            progress(len(results), len(texts))
+    labels = {"positive": 0, "negative": 0, "neutral": 0}
+    for result in results:
+        labels[result["label"]] += 1
+    return {
+        "count": len(results),
+        "results": results,
+        "label_counts": labels,
+        "average_score": round(sum(r["score"] for r in results) / len(results), 3) if results else 0
+    }
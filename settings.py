@@ -0,0 +1,104 @@
+"""Runtime settings for the servers, read once from environment variables."""
+import os
+import tempfile
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer setting, falling back to the default when unset."""
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def _env_str(name: str, default: str) -> str:
+    """Read a string setting, falling back to the default when unset."""
+    return os.environ.get(name) or default
+
+
+# Path of the streamable HTTP MCP endpoint inside the web server
+MCP_HTTP_PATH = _env_str("MCP_HTTP_PATH", "/mcp")
+
+# Worker pools
+PROCESS_POOL_WORKERS = _env_int("PROCESS_POOL_WORKERS", os.cpu_count() or 1)
+IO_THREAD_WORKERS = _env_int("IO_THREAD_WORKERS", min(32, (os.cpu_count() or 1) + 4))
+TOOL_THREAD_WORKERS = _env_int("TOOL_THREAD_WORKERS", min(32, (os.cpu_count() or 1) + 4))
+
+# Tool execution: calls allowed to run or wait per pool before new ones are
+# rejected, and per-tool policy overrides as "tool=inline|thread|process,..."
+TOOL_THREAD_QUEUE_DEPTH = _env_int("TOOL_THREAD_QUEUE_DEPTH", 256)
+TOOL_PROCESS_QUEUE_DEPTH = _env_int("TOOL_PROCESS_QUEUE_DEPTH", 64)
+TOOL_EXECUTION_POLICIES = _env_str("TOOL_EXECUTION_POLICIES", "")
+
+# Admission control: tool calls running at once in total and per tool (0 = unlimited),
+# per-tool limit overrides as "tool=n,...", and deadlines in seconds as "tool=seconds,..."
+MAX_CONCURRENT_TOOL_CALLS = _env_int("MAX_CONCURRENT_TOOL_CALLS", 64)
+TOOL_MAX_CONCURRENCY = _env_int("TOOL_MAX_CONCURRENCY", 16)
+TOOL_CONCURRENCY_LIMITS = _env_str("TOOL_CONCURRENCY_LIMITS", "")
+TOOL_TIMEOUT_SECONDS = _env_int("TOOL_TIMEOUT_SECONDS", 60)
+TOOL_TIMEOUTS = _env_str("TOOL_TIMEOUTS", "")
+
+# Tracing: OTLP/JSON Lines file that finished spans are written to (empty = tracing off),
+# spans per written batch, longest wait before a batch is written, spans queued at most
+TRACE_EXPORT_PATH = _env_str("TRACE_EXPORT_PATH", "")
+TRACE_SERVICE_NAME = _env_str("TRACE_SERVICE_NAME", "enhanced-fastapi-mcp")
+TRACE_BATCH_SIZE = _env_int("TRACE_BATCH_SIZE", 512)
+TRACE_FLUSH_INTERVAL_MS = _env_int("TRACE_FLUSH_INTERVAL_MS", 1000)
+TRACE_QUEUE_SIZE = _env_int("TRACE_QUEUE_SIZE", 10_000)
+
+# On-demand profiling: shared token that switches it on for a request (empty = profiling off),
+# time between stack samples, longest profile, and finished profiles kept for GET /profiles
+PROFILE_TOKEN = _env_str("PROFILE_TOKEN", "")
+PROFILE_SAMPLE_INTERVAL_MS = _env_int("PROFILE_SAMPLE_INTERVAL_MS", 2)
+PROFILE_MAX_SECONDS = _env_int("PROFILE_MAX_SECONDS", 60)
+PROFILE_STORE_SIZE = _env_int("PROFILE_STORE_SIZE", 50)
+
+# Event-loop monitoring: lag sampling period, loop stall that triggers a stack snapshot,
+# duration that makes a request or tool call slow, and the rotating JSON log of both
+# (empty path = not written)
+LOOP_LAG_INTERVAL_MS = _env_int("LOOP_LAG_INTERVAL_MS", 50)
+LOOP_BLOCK_THRESHOLD_MS = _env_int("LOOP_BLOCK_THRESHOLD_MS", 250)
+SLOW_REQUEST_MS = _env_int("SLOW_REQUEST_MS", 1000)
+SLOW_LOG_PATH = _env_str("SLOW_LOG_PATH", "slow_requests.log")
+SLOW_LOG_MAX_BYTES = _env_int("SLOW_LOG_MAX_BYTES", 10 * 1024 * 1024)
+SLOW_LOG_BACKUPS = _env_int("SLOW_LOG_BACKUPS", 5)
+
+# Batched tool calls: calls run at once per call_many or JSON-RPC batch, and calls per batch
+BATCH_MAX_PARALLEL = _env_int("BATCH_MAX_PARALLEL", 8)
+BATCH_MAX_CALLS = _env_int("BATCH_MAX_CALLS", 100)
+
+# Least time between two progress notifications of one tool call
+PROGRESS_INTERVAL_MS = _env_int("PROGRESS_INTERVAL_MS", 500)
+
+# Batch text analysis: documents per shard sent to a worker (0 = automatic)
+TEXT_BATCH_SHARD_SIZE = _env_int("TEXT_BATCH_SHARD_SIZE", 0)
+
+# URL shortener
+SHORTENER_DB_PATH = _env_str("SHORTENER_DB_PATH", "shortener.db")
+SHORTENER_BASE_URL = _env_str("SHORTENER_BASE_URL", "http://localhost:8001/s")
+SHORTENER_CACHE_SIZE = _env_int("SHORTENER_CACHE_SIZE", 100_000)
+
+# QR codes: total size of rendered images kept in memory
+QR_CACHE_BYTES = _env_int("QR_CACHE_BYTES", 32 * 1024 * 1024)
+
+# File tools: paths are resolved inside this directory and may not escape it
+FILE_SANDBOX_ROOT = _env_str("FILE_SANDBOX_ROOT", os.getcwd())
+SCAN_CACHE_DIRS = _env_int("SCAN_CACHE_DIRS", 50_000)
+FILE_SLICE_MAX_BYTES = _env_int("FILE_SLICE_MAX_BYTES", 1024 * 1024)
+LINE_INDEX_DIR = _env_str("LINE_INDEX_DIR", os.path.join(tempfile.gettempdir(), "mcp_line_index"))
+
+# Weather: "simulated", "synthetic" (the latest minute of the synthetic history)
+# or "http" (an API at WEATHER_API_URL, see weather_stub_server.py)
+WEATHER_PROVIDER = _env_str("WEATHER_PROVIDER", "simulated")
+WEATHER_API_URL = _env_str("WEATHER_API_URL", "http://localhost:8010")
+WEATHER_TIMEOUT = _env_int("WEATHER_TIMEOUT", 5)
+WEATHER_MAX_CONNECTIONS = _env_int("WEATHER_MAX_CONNECTIONS", 20)
+WEATHER_CACHE_TTL = _env_int("WEATHER_CACHE_TTL", 300)
+WEATHER_STALE_TTL = _env_int("WEATHER_STALE_TTL", 3600)
+WEATHER_CACHE_SIZE = _env_int("WEATHER_CACHE_SIZE", 10_000)
+
+# Synthetic weather history: days of minute data kept per city, cities kept, generator seed
+WEATHER_HISTORY_DAYS = _env_int("WEATHER_HISTORY_DAYS", 366)
+WEATHER_HISTORY_CITIES = _env_int("WEATHER_HISTORY_CITIES", 16)
+WEATHER_SEED = _env_int("WEATHER_SEED", 0)
+
+# Palette extraction: largest accepted encoded image
+PALETTE_MAX_IMAGE_BYTES = _env_int("PALETTE_MAX_IMAGE_BYTES", 25 * 1024 * 1024)
@@ -0,0 +1,102 @@
+"""Near-duplicate detection with MinHash signatures and a banded LSH index.
+
+Each text is reduced to a fixed-size MinHash signature over its character
+shingles. Signatures are split into bands and every band is hashed into a
+bucket, so a lookup only compares against texts that share at least one
+bucket instead of against every stored text.
+"""
+import hashlib
+import re
+import threading
+from array import array
+from collections import defaultdict
+from typing import Dict, Hashable, List, Set, Tuple
+
+SHINGLE_SIZE = 3
+NUM_PERMUTATIONS = 128
+# 32 bands of 4 rows: pairs above ~0.42 Jaccard similarity become candidates
+NUM_BANDS = 32
+# Adding a word or two to a short task already drops its shingle similarity to ~0.8
+DEFAULT_THRESHOLD = 0.7
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[str]:
+    """Character shingles of the normalized text."""
+    normalized = _WHITESPACE_RE.sub(" ", text.lower()).strip()
+    if len(normalized) <= size:
+        return {normalized}
+    return {normalized[i:i + size] for i in range(len(normalized) - size + 1)}
+
+
+class MinHasher:
+    """Computes MinHash signatures with a fixed family of hash functions.
+
+    Each shingle is expanded into one 32-bit value per hash function with a
+    single seeded SHAKE-128 digest, and the signature is the column-wise
+    minimum over all shingles.
+    """
+
+    def __init__(self, num_permutations: int = NUM_PERMUTATIONS, seed: int = 1):
+        self.num_permutations = num_permutations
+        self._digest_size = 4 * num_permutations
+        self._seed = seed.to_bytes(8, "little")
+
+    def signature(self, text: str) -> Tuple[int, ...]:
+        seed, size = self._seed, self._digest_size
+        rows = [
+            array("I", hashlib.shake_128(seed + shingle.encode()).digest(size))
+            for shingle in shingles(text)
+        ]
+        return tuple(map(min, zip(*rows)))
+
+
+def estimated_similarity(first: Tuple[int, ...], second: Tuple[int, ...]) -> float:
+    """Fraction of matching signature slots, an estimate of Jaccard similarity."""
+    return sum(1 for x, y in zip(first, second) if x == y) / len(first)
+
+
+class LSHIndex:
+    """Banded locality-sensitive hash index over MinHash signatures."""
+
+    def __init__(self, num_permutations: int = NUM_PERMUTATIONS, num_bands: int = NUM_BANDS):
+        if num_permutations % num_bands:
+            raise ValueError("num_permutations must be a multiple of num_bands")
+        self.hasher = MinHasher(num_permutations)
+        self.num_bands = num_bands
+        self.rows = num_permutations // num_bands
+        self._buckets: List[Dict[Tuple[int, ...], List[Hashable]]] = [defaultdict(list) for _ in range(num_bands)]
+        self._signatures: Dict[Hashable, Tuple[int, ...]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def _bands(self, signature: Tuple[int, ...]):
+        rows = self.rows
+        for band in range(self.num_bands):
+            yield band, signature[band * rows:(band + 1) * rows]
+
+    def add(self, key: Hashable, text: str) -> None:
+        """Index a text under the given key."""
+        signature = self.hasher.signature(text)
+        with self._lock:
+            self._signatures[key] = signature
+            for band, rows in self._bands(signature):
+                self._buckets[band][rows].append(key)
+
+    def query(self, text: str, threshold: float = DEFAULT_THRESHOLD, limit: int = 10) -> List[Tuple[Hashable, float]]:
+        """Indexed keys whose estimated similarity to the text is at least threshold."""
+        signature = self.hasher.signature(text)
+        candidates = set()
+        for band, rows in self._bands(signature):
+            candidates.update(self._buckets[band].get(rows, ()))
+
+        matches = []
+        for key in candidates:
+            similarity = estimated_similarity(signature, self._signatures[key])
+            if similarity >= threshold:
+                matches.append((key, similarity))
+        matches.sort(key=lambda match: match[1], reverse=True)
+        return matches[:limit]
@@ -0,0 +1,18 @@
+"""The modules under test live at the top level of the repository."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+@pytest.fixture
+def sandbox(tmp_path, monkeypatch):
+    """A temporary directory as the file sandbox root."""
+    import file_tools
+
+    root = os.path.realpath(tmp_path / "sandbox")
+    os.makedirs(root)
+    monkeypatch.setattr(file_tools, "SANDBOX_ROOT", root)
+    return root
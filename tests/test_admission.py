@@ -0,0 +1,72 @@
+"""Deadlines must stop cooperative pool work, and work that runs on must be reported."""
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+from admission import AdmissionMiddleware
+from execution import THREAD, ToolExecutor
+from progress import ToolCancelled, tool_progress
+
+
+def _context(tool: str):
+    return SimpleNamespace(message=SimpleNamespace(name=tool))
+
+
+def test_deadline_cancels_progress_reporters():
+    stopped = threading.Event()
+
+    def work(progress):
+        try:
+            for done in range(500):
+                progress(done)
+                time.sleep(0.01)
+        except ToolCancelled:
+            stopped.set()
+
+    async def slow_tool(_context):
+        async with tool_progress(None, "items") as progress:
+            work_done = asyncio.get_running_loop().run_in_executor(None, work, progress)
+            try:
+                return await asyncio.shield(work_done)
+            except asyncio.CancelledError:
+                # Like a thread hop that waits for its thread, cancellation
+                # only goes through once the work has ended
+                await asyncio.wait([work_done])
+                raise
+
+    async def scenario():
+        admission = AdmissionMiddleware(0, 0, {}, 0, {"slow": 0.1})
+        started = time.monotonic()
+        result = await admission.on_call_tool(_context("slow"), slow_tool)
+        return result, time.monotonic() - started, admission.stats()
+
+    result, elapsed, stats = asyncio.run(scenario())
+    assert result.is_error
+    assert stopped.is_set()
+    assert elapsed < 2
+    assert stats["timed_out"] == 1 and stats["in_flight"] == 0
+
+
+def test_abandoned_work_is_reported_until_it_ends():
+    release = threading.Event()
+    executor = ToolExecutor({}, 4, 4)
+
+    async def scenario():
+        call = asyncio.create_task(executor.run("blocking", release.wait, 5, policy=THREAD))
+        await asyncio.sleep(0.05)
+        call.cancel()
+        await asyncio.gather(call, return_exceptions=True)
+        running = executor.stats()[THREAD]
+        release.set()
+        for _ in range(100):
+            if executor.stats()[THREAD]["in_flight"] == 0:
+                break
+            await asyncio.sleep(0.01)
+        return running, executor.stats()[THREAD]
+
+    running, finished = asyncio.run(scenario())
+    assert running["in_flight"] == 1
+    assert running["abandoned_in_flight"] == 1
+    assert finished["abandoned_in_flight"] == 0
+    assert finished["abandoned"] == 1
@@ -0,0 +1,48 @@
+"""Click totals must count every click once, across persists and restarts."""
+import asyncio
+
+from click_stats import ClickCounters
+
+
+def _day_clicks(stats):
+    return sum(point["clicks"] for point in stats["by_day"])
+
+
+def test_totals_while_persisting(tmp_path):
+    async def scenario():
+        counters = ClickCounters(str(tmp_path / "clicks.db"))
+        for _ in range(5):
+            counters.record("abc")
+        counters.fold()
+        persisting = asyncio.create_task(counters.persist())
+        stats = await asyncio.gather(*(counters.code_stats("abc") for _ in range(10)))
+        await persisting
+        stats.append(await counters.code_stats("abc"))
+        return stats
+
+    for stats in asyncio.run(scenario()):
+        assert stats["total_clicks"] == 5
+        assert _day_clicks(stats) == 5
+
+
+def test_history_survives_restart(tmp_path):
+    path = str(tmp_path / "clicks.db")
+
+    async def first_run():
+        counters = ClickCounters(path)
+        for _ in range(3):
+            counters.record("abc")
+        await counters.stop()
+
+    async def second_run():
+        counters = ClickCounters(path)
+        counters.record("abc")
+        counters.fold()
+        await counters.persist()
+        counters.record("abc")
+        return await counters.code_stats("abc")
+
+    asyncio.run(first_run())
+    stats = asyncio.run(second_run())
+    assert stats["total_clicks"] == 5
+    assert _day_clicks(stats) == 5
@@ -0,0 +1,47 @@
+"""Identical concurrent calls share one execution unless a caller asks for a profile."""
+import asyncio
+
+from fastmcp import Client, FastMCP
+
+from coalescing import SINGLE_FLIGHT, SingleFlightMiddleware
+
+
+def _server():
+    server = FastMCP("coalescing-test")
+    single_flight = SingleFlightMiddleware()
+    server.add_middleware(single_flight)
+    executions = []
+
+    @server.tool(tags={SINGLE_FLIGHT})
+    async def slow_lookup(key: str) -> str:
+        executions.append(key)
+        await asyncio.sleep(0.2)
+        return key.upper()
+
+    return server, single_flight, executions
+
+
+def _concurrent_calls(meta=None):
+    server, single_flight, executions = _server()
+
+    async def scenario():
+        async with Client(server) as client:
+            return await asyncio.gather(*(
+                client.call_tool("slow_lookup", {"key": "abc"}, meta=meta) for _ in range(3)
+            ))
+
+    results = asyncio.run(scenario())
+    assert [result.data for result in results] == ["ABC"] * 3
+    return single_flight, executions
+
+
+def test_identical_calls_run_once():
+    single_flight, executions = _concurrent_calls()
+    assert executions == ["abc"]
+    assert single_flight.stats()["coalesced"] == 2
+
+
+def test_profiled_calls_run_on_their_own():
+    single_flight, executions = _concurrent_calls({"profile": "token"})
+    assert executions == ["abc"] * 3
+    assert single_flight.stats()["coalesced"] == 0
@@ -0,0 +1,12 @@
+"""Execution policy overrides."""
+import pytest
+
+from execution import INLINE, PROCESS, THREAD, ToolExecutor, parse_policies
+
+
+def test_restrict_rejects_override_a_tool_cannot_run_under():
+    executor = ToolExecutor(parse_policies("hash_file=process,file_info=process"), 4, 4)
+    with pytest.raises(ValueError, match="hash_file"):
+        executor.restrict(["hash_file"], (INLINE, THREAD))
+    executor.restrict(["file_info"], (THREAD, PROCESS))
+
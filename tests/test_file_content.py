@@ -0,0 +1,88 @@
+"""Line offsets, slice limits and the tree digest around their block boundaries."""
+import hashlib
+import os
+
+import pytest
+
+import file_content
+import settings
+from file_content import LineIndex, hash_file, read_file_slice
+
+
+@pytest.fixture
+def small_blocks(monkeypatch, tmp_path):
+    monkeypatch.setattr(file_content, "LINE_INDEX_BLOCK_SIZE", 16)
+    monkeypatch.setattr(settings, "LINE_INDEX_DIR", str(tmp_path / "indexes"))
+
+
+def _write(root, name, data: bytes) -> str:
+    with open(os.path.join(root, name), "wb") as f:
+        f.write(data)
+    return name
+
+
+def test_line_offsets_across_block_boundaries(sandbox, small_blocks):
+    # Lines end exactly on, just before and just after 16-byte block boundaries
+    lines = [b"a" * 15 + b"\n", b"b" * 14 + b"\n", b"\n", b"c" * 40 + b"\n", b"d" * 3 + b"\n", b"tail"]
+    data = b"".join(lines)
+    path = os.path.join(sandbox, _write(sandbox, "lines.txt", data))
+    with open(path, "rb") as f:
+        index = LineIndex.build(f, os.stat(path))
+        starts = [0]
+        for line in lines[:-1]:
+            starts.append(starts[-1] + len(line))
+        assert [index.line_offset(f, line) for line in range(len(lines))] == starts
+        assert index.line_offset(f, len(lines)) is None
+    assert index.line_count == len(lines)
+
+    result = read_file_slice("lines.txt", start_line=4, line_count=2)
+    assert result["content"] == (lines[3] + lines[4]).decode()
+    assert result["total_lines"] == len(lines)
+
+
+def test_byte_slices_report_truncation_and_eof(sandbox, monkeypatch):
+    monkeypatch.setattr(settings, "FILE_SLICE_MAX_BYTES", 32)
+    name = _write(sandbox, "bytes.txt", b"x" * 100)
+
+    head = read_file_slice(name, offset=0, length=1000)
+    assert (head["bytes_returned"], head["truncated"], head["eof"]) == (32, True, False)
+    tail = read_file_slice(name, offset=80, length=1000)
+    assert (tail["bytes_returned"], tail["truncated"], tail["eof"]) == (20, False, True)
+    exact = read_file_slice(name, offset=0, length=10)
+    assert (exact["bytes_returned"], exact["truncated"], exact["eof"]) == (10, False, False)
+
+
+def test_line_slices_report_truncation_and_eof(sandbox, small_blocks, monkeypatch):
+    monkeypatch.setattr(settings, "FILE_SLICE_MAX_BYTES", 32)
+    name = _write(sandbox, "long.txt", b"short\n" + b"y" * 100 + b"\nlast")
+
+    cut = read_file_slice(name, start_line=2, line_count=1)
+    assert cut["truncated"] and not cut["eof"]
+    last = read_file_slice(name, start_line=3, line_count=5)
+    assert (last["content"], last["lines_returned"], last["truncated"], last["eof"]) == ("last", 1, False, True)
+    beyond = read_file_slice(name, start_line=10)
+    assert (beyond["lines_returned"], beyond["eof"]) == (0, True)
+
+
+def _reference_tree_digest(data: bytes, leaf_size: int) -> str:
+    def node(chunk, offset, depth, last):
+        return hashlib.blake2b(
+            chunk, fanout=0, depth=2, leaf_size=leaf_size, inner_size=64,
+            node_offset=offset, node_depth=depth, last_node=last
+        ).digest()
+
+    leaves = [data[i:i + leaf_size] for i in range(0, len(data), leaf_size)] or [b""]
+    digests = [node(leaf, i, 0, i == len(leaves) - 1) for i, leaf in enumerate(leaves)]
+    return node(b"".join(digests), 0, 1, True).hex()
+
+
+@pytest.mark.parametrize("size", [1024, 1025, 2 * 1024 + 300])
+def test_tree_digest_across_leaf_boundaries(sandbox, monkeypatch, size):
+    monkeypatch.setattr(file_content, "HASH_LEAF_SIZE", 1024)
+    data = bytes(range(256)) * (size // 256) + bytes(size % 256)
+    name = _write(sandbox, f"tree{size}.bin", data)
+
+    result = hash_file(name, "blake2b-tree")
+    assert result["digest"] == _reference_tree_digest(data, 1024)
+    assert result["digest"] != hash_file(name, "blake2b")["digest"]
+    assert hash_file(name, "sha256")["digest"] == hashlib.sha256(data).hexdigest()
@@ -0,0 +1,64 @@
+"""Paths that resolve outside the sandbox, through ``..`` or symlinks, are rejected."""
+import os
+
+import pytest
+
+import file_content
+import file_tools
+
+
+@pytest.fixture
+def outside(tmp_path):
+    directory = tmp_path / "outside"
+    directory.mkdir()
+    (directory / "secret.txt").write_text("secret")
+    return directory
+
+
+@pytest.mark.parametrize("path", [
+    "..",
+    "../outside/secret.txt",
+    "inner/../../outside/secret.txt",
+    "../sandbox-sibling",
+])
+def test_dot_dot_escapes_are_rejected(sandbox, outside, path):
+    os.makedirs(os.path.join(sandbox, "inner"))
+    os.makedirs(sandbox + "-sibling")
+    with pytest.raises(ValueError, match="outside the file sandbox"):
+        file_tools.resolve_path(path)
+
+
+def test_absolute_paths_outside_are_rejected(sandbox, outside):
+    with pytest.raises(ValueError, match="outside the file sandbox"):
+        file_tools.resolve_path(str(outside / "secret.txt"))
+    assert file_tools.resolve_path(os.path.join(sandbox, "a.txt")) == os.path.join(sandbox, "a.txt")
+
+
+def test_symlinks_out_of_the_sandbox_are_rejected(sandbox, outside):
+    os.symlink(outside / "secret.txt", os.path.join(sandbox, "file-link"))
+    os.symlink(outside, os.path.join(sandbox, "dir-link"))
+
+    for path in ("file-link", "dir-link", "dir-link/secret.txt"):
+        with pytest.raises(ValueError, match="outside the file sandbox"):
+            file_tools.resolve_path(path)
+    with pytest.raises(ValueError):
+        file_tools.file_info("file-link")
+    with pytest.raises(ValueError):
+        file_content.read_file_slice("dir-link/secret.txt")
+    with pytest.raises(ValueError):
+        file_content.hash_file("file-link")
+
+
+def test_symlinks_within_the_sandbox_resolve(sandbox):
+    with open(os.path.join(sandbox, "data.txt"), "w") as f:
+        f.write("data")
+    os.symlink(os.path.join(sandbox, "data.txt"), os.path.join(sandbox, "link"))
+    assert file_tools.resolve_path("link") == os.path.join(sandbox, "data.txt")
+    assert file_tools.file_info("link")["file_size_bytes"] == 4
+
+
+def test_scans_do_not_follow_symlinks_out(sandbox, outside):
+    os.symlink(outside, os.path.join(sandbox, "dir-link"))
+    summary = file_tools.scan_directory(".")
+    assert summary["files"] == 0
+    assert summary["total_bytes"] == 0
@@ -0,0 +1,39 @@
+"""Keyword rankings must follow inserts and stay readable while documents arrive."""
+import threading
+
+from keywords import KeywordIndex
+
+
+def test_corpus_ranking_follows_inserts():
+    index = KeywordIndex()
+    index.add_document("buy milk and eggs")
+    index.add_document("milk the cow")
+    assert index.top_keywords(top_k=1)[0]["term"] == "milk"
+
+    for _ in range(3):
+        index.add_document("quarterly report report")
+    top = index.top_keywords(top_k=2)
+    assert top[0]["term"] == "report"
+    assert top[0]["count"] == 6
+    assert index.token_count == sum(index.term_frequency.values())
+
+
+def test_queries_while_documents_are_added():
+    index = KeywordIndex()
+    errors = []
+
+    def add():
+        for i in range(2000):
+            index.add_document(f"term{i} shared words {i % 7}")
+
+    writer = threading.Thread(target=add)
+    writer.start()
+    while writer.is_alive():
+        try:
+            index.top_keywords(top_k=5)
+            index.top_keywords("shared term1 words", top_k=5)
+        except RuntimeError as e:
+            errors.append(e)
+    writer.join()
+    assert errors == []
+    assert index.top_keywords(top_k=1)[0]["term"] in ("shared", "words")
@@ -0,0 +1,61 @@
+"""Slow-request detection times HTTP requests until their response starts."""
+import asyncio
+import json
+
+from loop_monitor import LoopMonitor, SlowLog, SlowRequestMiddleware
+
+
+def _app(delay_before: float, delay_after: float):
+    async def app(scope, receive, send):
+        await asyncio.sleep(delay_before)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await asyncio.sleep(delay_after)
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+    return app
+
+
+def _request(app, path):
+    scope = {"type": "http", "method": "GET", "path": path, "headers": []}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    return app(scope, receive, send)
+
+
+def test_streams_and_uploads_are_not_slow(tmp_path):
+    path = tmp_path / "slow.log"
+
+    async def scenario():
+        monitor = LoopMonitor(0.01, 0.5, 0.05, SlowLog(str(path), 1_000_000, 1))
+        monitor.start()
+        await _request(SlowRequestMiddleware(_app(0, 0.1), monitor), "/events")
+        await _request(SlowRequestMiddleware(_app(0.1, 0), monitor, ["/upload"]), "/upload")
+        await _request(SlowRequestMiddleware(_app(0.1, 0), monitor), "/report")
+        await monitor.stop()
+        return monitor
+
+    monitor = asyncio.run(scenario())
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert monitor.slow_requests == 1
+    assert [record["target"] for record in records] == ["GET /report"]
+
+
+def test_log_records_are_written_between_start_and_stop(tmp_path):
+    path = tmp_path / "slow.log"
+
+    async def scenario():
+        monitor = LoopMonitor(0.01, 0.5, 0.05, SlowLog(str(path), 1_000_000, 1))
+        # Not started yet: nothing is written and no file is created
+        monitor._write({"event": "before_start"})
+        assert not path.exists()
+        monitor.start()
+        monitor._write({"event": "while_running"})
+        await monitor.stop()
+        monitor._write({"event": "after_stop"})
+
+    asyncio.run(scenario())
+    assert [json.loads(line) for line in path.read_text().splitlines()] == [{"event": "while_running"}]
@@ -0,0 +1,51 @@
+"""HTTP metrics must keep a bounded set of series and cached routes."""
+import asyncio
+
+from fastapi import FastAPI
+from starlette.responses import PlainTextResponse
+
+from metrics import OTHER_METHOD, HTTPMetricsMiddleware, MetricsRegistry
+
+
+def _app():
+    app = FastAPI()
+
+    @app.get("/stats")
+    async def stats():
+        return {}
+
+    @app.get("/s/{code}")
+    async def resolve(code: str):
+        return {"code": code}
+
+    return app
+
+
+def _request(middleware, method: str, path: str):
+    scope = {"type": "http", "method": method, "path": path, "root_path": "", "headers": [], "query_string": b""}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(_message):
+        pass
+
+    asyncio.run(middleware(scope, receive, send))
+
+
+def test_routes_are_labelled_by_template_and_standard_method():
+    registry = MetricsRegistry()
+    app = _app()
+    middleware = HTTPMetricsMiddleware(PlainTextResponse("ok"), registry, app)
+    for code in ("abc", "def", "ghi"):
+        _request(middleware, "GET", f"/s/{code}")
+    _request(middleware, "GET", "/stats")
+    _request(middleware, "BREW", "/stats")
+    _request(middleware, "GET", "/missing")
+
+    assert set(registry.routes) == {
+        ("GET", "/s/{code}"), ("GET", "/stats"), (OTHER_METHOD, "/stats"), ("GET", "unmatched")
+    }
+    assert registry.routes[("GET", "/s/{code}")].calls == 3
+    # Parameterized and unmatched paths are not cached, so they cannot evict static ones
+    assert len(middleware._static_names) == 2
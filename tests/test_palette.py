@@ -0,0 +1,70 @@
+"""Palettes have at most the requested colors, largest share first, and a seed fixes the result."""
+import base64
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import palette
+from palette import extract_palette, load_image
+
+
+def _png(pixels: np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def _three_bands() -> bytes:
+    pixels = np.zeros((10, 10, 3), np.uint8)
+    pixels[:5] = (255, 0, 0)
+    pixels[5:8] = (0, 255, 0)
+    pixels[8:] = (0, 0, 255)
+    return _png(pixels)
+
+
+def test_palette_of_known_colors():
+    result = extract_palette(_three_bands(), 3)
+    assert result["color_count"] == 3
+    assert [(color["hex"], color["proportion"]) for color in result["colors"]] == [
+        ("#ff0000", 0.5), ("#00ff00", 0.3), ("#0000ff", 0.2)
+    ]
+
+
+@pytest.mark.parametrize("color_count, expected", [(1, 1), (2, 2), (3, 3), (8, 3)])
+def test_palette_size(color_count, expected):
+    # Clusters left empty are dropped, so an image never has more colors than it contains
+    result = extract_palette(_three_bands(), color_count)
+    assert result["color_count"] == len(result["colors"]) == expected
+    assert sum(color["proportion"] for color in result["colors"]) == pytest.approx(1.0, abs=1e-3)
+
+
+@pytest.mark.parametrize("color_count", [0, palette.MAX_COLORS + 1])
+def test_palette_size_is_bounded(color_count):
+    with pytest.raises(ValueError):
+        extract_palette(_three_bands(), color_count)
+
+
+def test_same_seed_same_palette(monkeypatch):
+    # Sampling and k-means++ seeding both draw from the seeded generator;
+    # run in this process so the smaller sample applies
+    monkeypatch.setattr(palette, "process_pool_size", lambda: 1)
+    monkeypatch.setattr(palette, "MAX_SAMPLE_PIXELS", 2_000)
+    noise = _png(np.random.default_rng(1).integers(0, 256, (100, 100, 3), dtype=np.uint8))
+
+    def colors(seed):
+        result = extract_palette(noise, 6, seed)
+        assert result["sampled_pixels"] == 2_000
+        return [(color["hex"], color["proportion"]) for color in result["colors"]]
+
+    assert colors(0) == colors(0)
+    assert colors(7) == colors(7)
+    assert len(colors(0)) == 6
+
+
+def test_load_image_accepts_data_urls():
+    data = _three_bands()
+    assert load_image(f"data:image/png;base64,{base64.b64encode(data).decode()}") == data
+    with pytest.raises(ValueError):
+        load_image("not base64!")
@@ -0,0 +1,55 @@
+"""Generated passwords must be uniform and bounded; listed passwords must be caught."""
+import asyncio
+import random
+from collections import Counter
+
+import pytest
+
+from execution import INLINE, PROCESS
+from passwords import MAX_BATCH_CHARACTERS, build_alphabet, check_password_strength, generate_passwords
+
+
+def test_characters_are_drawn_uniformly():
+    # 256 % 62 == 8: without rejection the first 8 characters would come up 25% more often
+    alphabet = build_alphabet("letters,digits")
+    per_character = 10_000
+    passwords = generate_passwords(per_character, len(alphabet), alphabet)
+    counts = Counter("".join(passwords))
+
+    assert set(counts) == set(alphabet)
+    chi_square = sum((counts[c] - per_character) ** 2 / per_character for c in alphabet)
+    # 61 degrees of freedom; the chance of exceeding 130 by luck is below one in a million
+    assert chi_square < 130
+    assert max(counts.values()) < per_character * 1.06
+
+
+def test_batch_size_is_capped():
+    alphabet = build_alphabet()
+    assert len(generate_passwords(MAX_BATCH_CHARACTERS // 100, 100, alphabet)) == MAX_BATCH_CHARACTERS // 100
+    with pytest.raises(ValueError, match="must not exceed"):
+        generate_passwords(MAX_BATCH_CHARACTERS // 100 + 1, 100, alphabet)
+
+
+def test_listed_passwords_are_common_and_random_ones_are_not():
+    assert check_password_strength("password")["is_common"]
+    assert check_password_strength("Password")["is_common"]
+    fresh = "".join(random.Random(31).choice(build_alphabet()) for _ in range(20))
+    result = check_password_strength(fresh)
+    assert not result["is_common"]
+    assert result["strength"] == "strong"
+
+
+def test_single_passwords_skip_the_process_pool(monkeypatch):
+    import enhanced_server
+
+    policies = []
+    real_run = enhanced_server.tool_executor.run
+
+    async def run(tool, fn, *args, policy):
+        policies.append(policy)
+        return await real_run(tool, fn, *args, policy=INLINE)
+
+    monkeypatch.setattr(enhanced_server.tool_executor, "run", run)
+    asyncio.run(enhanced_server.generate_password(16))
+    asyncio.run(enhanced_server.generate_passwords(count=1000, length=16))
+    assert policies == [INLINE, PROCESS]
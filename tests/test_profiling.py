@@ -0,0 +1,77 @@
+"""One profile runs at a time; overlapping requests get None and are counted as busy."""
+import threading
+import time
+
+import pytest
+
+from profiling import Profile, Profiler
+
+
+def _profiler():
+    return Profiler("secret", 0.001, 5, 4)
+
+
+def _spin(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def test_profile_samples_the_block():
+    profiler = _profiler()
+    with profiler.profile("spin") as profile:
+        _spin(0.1)
+    assert isinstance(profile, Profile)
+    assert profile.samples > 0
+    assert "_spin" in profile.collapsed
+    assert profiler.get(profile.id) is profile
+    assert profiler.stats() == {"enabled": True, "profiled": 1, "busy": 0, "stored": 1}
+
+
+def test_overlapping_profile_from_another_thread_is_busy():
+    profiler = _profiler()
+    running, release = threading.Event(), threading.Event()
+
+    def first():
+        with profiler.profile("first"):
+            running.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=first)
+    thread.start()
+    running.wait(5)
+    with profiler.profile("second") as second:
+        assert second is None
+    release.set()
+    thread.join()
+
+    assert profiler.stats()["busy"] == 1
+    with profiler.profile("third") as third:
+        assert third is not None
+    assert profiler.stats()["profiled"] == 2
+
+
+def test_nested_profile_is_busy():
+    profiler = _profiler()
+    with profiler.profile("outer") as outer:
+        with profiler.profile("inner") as inner:
+            assert inner is None
+    assert outer is not None
+    assert (profiler.stats()["profiled"], profiler.stats()["busy"]) == (1, 1)
+
+
+def test_failing_block_releases_the_profiler():
+    profiler = _profiler()
+    with pytest.raises(RuntimeError):
+        with profiler.profile("failing"):
+            raise RuntimeError("boom")
+    with profiler.profile("next") as profile:
+        assert profile is not None
+    assert profiler.stats()["stored"] == 2
+
+
+def test_authorization():
+    assert _profiler().authorized("secret")
+    assert not _profiler().authorized("wrong")
+    assert not _profiler().authorized(None)
+    assert not Profiler("", 0.001, 5, 4).authorized("")
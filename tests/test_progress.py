@@ -0,0 +1,91 @@
+"""Progress checkpoints raise ToolCancelled once their tool call has ended."""
+import asyncio
+import threading
+import time
+
+import pytest
+
+import settings
+from progress import ToolCancelled, nested_call, tool_progress
+
+
+class _Context:
+    def __init__(self):
+        self.progress = []
+
+    async def report_progress(self, done, total, message):
+        self.progress.append((done, total))
+
+
+def test_checkpoints_raise_after_cancel():
+    async def scenario():
+        async with tool_progress(None, "items") as progress:
+            progress(1, 10)
+            progress.partial({"first": 1})
+            progress.cancel()
+            with pytest.raises(ToolCancelled):
+                progress(2, 10)
+            with pytest.raises(ToolCancelled):
+                progress.partial({"second": 2})
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_call_stops_work_in_a_thread():
+    checkpoints = []
+    stopped = threading.Event()
+
+    def work(progress):
+        try:
+            for done in range(1000):
+                progress(done, 1000)
+                checkpoints.append(done)
+                time.sleep(0.005)
+        except ToolCancelled:
+            stopped.set()
+
+    async def tool():
+        async with tool_progress(None, "items") as progress:
+            await asyncio.get_running_loop().run_in_executor(None, work, progress)
+
+    async def scenario():
+        call = asyncio.create_task(tool())
+        await asyncio.sleep(0.1)
+        call.cancel()
+        await asyncio.gather(call, return_exceptions=True)
+        # The thread runs on until its next checkpoint, then stops
+        for _ in range(100):
+            if stopped.is_set():
+                break
+            await asyncio.sleep(0.01)
+
+    asyncio.run(scenario())
+    assert stopped.is_set()
+    assert 0 < len(checkpoints) < 1000
+
+
+def test_leftover_work_stops_once_the_call_returns():
+    async def scenario():
+        async with tool_progress(None, "items") as progress:
+            progress(1, None)
+        return progress
+
+    progress = asyncio.run(scenario())
+    with pytest.raises(ToolCancelled):
+        progress(2, None)
+
+
+def test_nested_calls_send_no_notifications(monkeypatch):
+    monkeypatch.setattr(settings, "PROGRESS_INTERVAL_MS", 0)
+    context = _Context()
+
+    async def scenario():
+        async with tool_progress(context, "items") as progress:
+            progress(1, 2)
+            progress(2, 2)
+        with nested_call():
+            async with tool_progress(context, "items") as progress:
+                progress(1, 2)
+
+    asyncio.run(scenario())
+    assert context.progress == [(1, 2), (2, 2)]
@@ -0,0 +1,94 @@
+"""A known input encodes to a symbol that reads back per the QR specification."""
+from qr_encoder import encode_qr
+
+# "HELLO WORLD" in byte mode at level M: mode 0100, count 11, the bytes, the
+# 0000 terminator, then 0xEC/0x11 padding up to version 1-M's 16 data codewords
+HELLO_WORLD_DATA = [
+    0x40, 0xB4, 0x84, 0x54, 0xC4, 0xC4, 0xF2, 0x05,
+    0x74, 0xF5, 0x24, 0xC4, 0x40, 0xEC, 0x11, 0xEC,
+]
+# Format information of level M with mask 2 (ISO/IEC 18004 table C.1)
+FORMAT_M_MASK_2 = "101111001111100"
+FINDER_ROWS = ["1111111", "1000001", "1011101", "1011101", "1011101", "1000001", "1111111"]
+
+
+def _bits(row, start, stop):
+    return "".join(str(row[x]) for x in range(start, stop))
+
+
+def _is_function_module(x, y, size):
+    # Version 1: finders with separators and format areas, and timing patterns
+    return (
+        x == 6 or y == 6
+        or (x <= 8 and y <= 8) or (x >= size - 8 and y <= 8) or (x <= 8 and y >= size - 8)
+    )
+
+
+def _read_codewords(modules, size, mask):
+    bits = []
+    for right in range(size - 1, 0, -2):
+        if right <= 6:
+            right -= 1
+        upward = (right + 1) & 2 == 0
+        for vert in range(size):
+            y = size - 1 - vert if upward else vert
+            for x in (right, right - 1):
+                if not _is_function_module(x, y, size):
+                    bits.append(modules[y][x] ^ mask(x, y))
+    return [int("".join(map(str, bits[i:i + 8])), 2) for i in range(0, len(bits) - 7, 8)]
+
+
+def _gf_multiply(x, y):
+    product = 0
+    while y:
+        if y & 1:
+            product ^= x
+        y >>= 1
+        x <<= 1
+        if x & 0x100:
+            x ^= 0x11D
+    return product
+
+
+def _syndromes(codewords, count):
+    result = []
+    alpha = 1
+    for _ in range(count):
+        value = 0
+        for codeword in codewords:
+            value = _gf_multiply(value, alpha) ^ codeword
+        result.append(value)
+        alpha = _gf_multiply(alpha, 2)
+    return result
+
+
+def test_hello_world_version_1_m():
+    qr = encode_qr("HELLO WORLD", "M", mask=2)
+    modules = [[int(bit) for bit in row] for row in qr.modules]
+    size = len(modules)
+    assert (qr.version, qr.size, size) == (1, 21, 21)
+
+    for x0, y0 in ((0, 0), (size - 7, 0), (0, size - 7)):
+        assert [_bits(modules[y0 + dy], x0, x0 + 7) for dy in range(7)] == FINDER_ROWS
+    assert _bits(modules[6], 8, size - 8) == "10101"
+    assert "".join(str(modules[y][6]) for y in range(8, size - 8)) == "10101"
+    assert modules[size - 8][8] == 1
+
+    first_copy = _bits(modules[8], 0, 6) + str(modules[8][7]) + str(modules[8][8]) + str(modules[7][8]) + "".join(
+        str(modules[y][8]) for y in range(5, -1, -1)
+    )
+    second_copy = "".join(str(modules[y][8]) for y in range(size - 1, size - 8, -1)) + _bits(modules[8], size - 8, size)
+    assert first_copy == second_copy == FORMAT_M_MASK_2
+
+    codewords = _read_codewords(modules, size, lambda x, y: int(x % 3 == 0))
+    assert len(codewords) == 26
+    assert codewords[:16] == HELLO_WORLD_DATA
+    # 10 error correction codewords make a valid Reed-Solomon codeword
+    assert _syndromes(codewords, 10) == [0] * 10
+
+
+def test_automatic_mask_is_deterministic_and_valid():
+    first, second = encode_qr("HELLO WORLD", "M"), encode_qr("HELLO WORLD", "M")
+    assert first.mask == second.mask
+    assert first.modules == second.modules
+    assert first.modules == encode_qr("HELLO WORLD", "M", mask=first.mask).modules
@@ -0,0 +1,39 @@
+"""Sentiment scoring, alone and combined with text statistics."""
+import pytest
+
+from sentiment import NEGATION_FACTOR, analyze_text_with_sentiment, score_sentiment
+from text_analysis import analyze_text
+
+
+def test_text_and_sentiment_in_one_call():
+    text = "A great day. Not bad at all."
+    assert analyze_text_with_sentiment(text) == {**analyze_text(text), "sentiment": score_sentiment(text)}
+
+
+LEXICON = {"good": 2.0, "bad": -2.0}
+
+
+@pytest.mark.parametrize("text, score", [
+    ("good", 2.0),
+    ("not good", 2.0 * NEGATION_FACTOR),
+    ("don't like it bad", -2.0 * NEGATION_FACTOR),
+    # A negator reaches three tokens ahead, and only the first sentiment word
+    ("not a b good", 2.0 * NEGATION_FACTOR),
+    ("not a b c good", 2.0),
+    ("not good good", 2.0 * NEGATION_FACTOR + 2.0),
+    ("very good", 3.0),
+    ("extremely very bad", -6.0),
+    ("slightly good", 1.0),
+    ("not very good", 3.0 * NEGATION_FACTOR),
+    # An intensifier only scales the word right after it
+    ("very the good", 2.0),
+    ("very good good", 5.0),
+])
+def test_negation_and_intensifiers(text, score):
+    assert score_sentiment(text, LEXICON)["score"] == pytest.approx(score)
+
+
+def test_negation_flips_the_label():
+    assert score_sentiment("good", LEXICON)["label"] == "positive"
+    negated = score_sentiment("not good", LEXICON)
+    assert (negated["label"], negated["positive_words"], negated["negative_words"]) == ("negative", 0, 1)
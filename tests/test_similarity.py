@@ -0,0 +1,35 @@
+"""Near-duplicate todos must be caught at the default threshold, distinct ones not."""
+import pytest
+
+from similarity import DEFAULT_THRESHOLD, LSHIndex
+
+NEAR_DUPLICATES = [
+    ("buy milk and eggs at the store", "buy milk and eggs at the store today"),
+    ("buy milk and eggs at the store", "Buy milk and eggs at the store!"),
+    ("Write the quarterly report", "write quarterly report"),
+    ("water the plants on the balcony", "water the plants on the balcony tonight"),
+]
+
+DISTINCT = [
+    ("call mom", "call dad"),
+    ("buy milk", "buy bread"),
+    ("fix login bug", "fix logout bug"),
+    ("book flight to Paris", "book flight to Berlin"),
+]
+
+
+def _matches(stored: str, task: str):
+    index = LSHIndex()
+    index.add(0, stored)
+    # The lookup reject_duplicates makes before creating a todo
+    return index.query(task, DEFAULT_THRESHOLD, limit=3)
+
+
+@pytest.mark.parametrize("stored, task", NEAR_DUPLICATES)
+def test_near_duplicates_are_found(stored, task):
+    assert [key for key, _ in _matches(stored, task)] == [0]
+
+
+@pytest.mark.parametrize("stored, task", DISTINCT)
+def test_distinct_tasks_are_not_found(stored, task):
+    assert _matches(stored, task) == []
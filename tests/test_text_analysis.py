@@ -0,0 +1,76 @@
+"""Batch analysis must give the same answers as analyzing each document alone."""
+import random
+
+import pytest
+
+import settings
+import text_analysis
+from text_analysis import (
+    MAX_TOKEN_CHARS,
+    MIN_PARALLEL_DOCUMENTS,
+    TextStats,
+    TextStreamAnalyzer,
+    analyze_text,
+    analyze_texts,
+)
+
+WORDS = ["alpha", "beta", "gamma", "delta", "don't", "it's", "Omega", "x"]
+
+
+def _documents(count: int):
+    rng = random.Random(count)
+    documents = []
+    for _ in range(count):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(0, 40))]
+        text = " ".join(words)
+        documents.append(text.replace(" x ", ". ") + rng.choice(["", ".", " .", "  "]))
+    return documents
+
+
+@pytest.fixture
+def two_workers(monkeypatch):
+    # The parallel path only runs with more than one worker process
+    monkeypatch.setattr(settings, "PROCESS_POOL_WORKERS", 2)
+    monkeypatch.setattr(text_analysis, "process_pool_size", lambda: 2)
+
+
+@pytest.mark.parametrize("count", [1, MIN_PARALLEL_DOCUMENTS - 1, MIN_PARALLEL_DOCUMENTS, 3 * MIN_PARALLEL_DOCUMENTS])
+def test_batch_matches_serial_analysis(two_workers, count):
+    documents = _documents(count)
+    result = analyze_texts(documents)
+
+    serial = TextStats()
+    for document in documents:
+        serial.merge(TextStats.from_text(document))
+
+    assert result["workers"] == (2 if count >= MIN_PARALLEL_DOCUMENTS else 1)
+    assert result["documents"] == [analyze_text(document) for document in documents]
+    assert result["corpus"] == serial.to_dict()
+
+
+def test_batch_reports_progress_per_shard(two_workers):
+    documents = _documents(MIN_PARALLEL_DOCUMENTS)
+    calls = []
+    analyze_texts(documents, progress=lambda done, total: calls.append((done, total)))
+    assert calls[-1] == (len(documents), len(documents))
+    assert [done for done, _ in calls] == sorted(done for done, _ in calls)
+
+
+def test_stream_matches_whole_text_analysis():
+    text = " ".join(_documents(MIN_PARALLEL_DOCUMENTS)) + " café naïve."
+    data = text.encode("utf-8")
+    analyzer = TextStreamAnalyzer()
+    for start in range(0, len(data), 7):
+        analyzer.feed(data[start:start + 7])
+    assert analyzer.finish().to_dict() == TextStats.from_text(text).to_dict()
+
+
+def test_stream_carry_is_bounded_without_whitespace():
+    analyzer = TextStreamAnalyzer()
+    chunk = b"a" * 1000
+    for _ in range(1000):
+        analyzer.feed(chunk)
+        assert len(analyzer._carry) <= MAX_TOKEN_CHARS + len(chunk)
+    stats = analyzer.finish()
+    assert analyzer.bytes_received == 1000 * len(chunk)
+    assert stats.word_count >= 1
@@ -0,0 +1,64 @@
+"""Nested tool calls are internal spans, and the exporter counts every span it drops."""
+import asyncio
+import threading
+
+from fastmcp import Client, FastMCP
+
+from tracing import INTERNAL, SERVER, BatchSpanExporter, Span, ToolTracingMiddleware, Tracer
+
+
+class _Collector:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+
+def test_nested_tool_calls_are_internal_spans():
+    collector = _Collector()
+    server = FastMCP("tracing-test")
+    server.add_middleware(ToolTracingMiddleware(Tracer(collector)))
+
+    @server.tool
+    async def inner() -> str:
+        return "inner"
+
+    @server.tool
+    async def outer() -> str:
+        result = await server.call_tool("inner", {})
+        return f"outer+{result.structured_content['result']}"
+
+    async def scenario():
+        async with Client(server) as client:
+            return await client.call_tool("outer", {})
+
+    assert asyncio.run(scenario()).data == "outer+inner"
+    spans = {span.name: span for span in collector.spans}
+    outer_span, inner_span = spans["tools/call outer"], spans["tools/call inner"]
+    assert (outer_span.kind, inner_span.kind) == (SERVER, INTERNAL)
+    assert inner_span.parent_span_id == outer_span.span_id
+    assert inner_span.trace_id == outer_span.trace_id
+
+
+def test_concurrent_exports_are_queued_or_counted_as_dropped(tmp_path):
+    exporter = BatchSpanExporter(str(tmp_path / "spans.jsonl"), "test", batch_size=10_000, flush_interval=60, max_queue=500)
+    threads, per_thread = 8, 200
+    start = threading.Barrier(threads)
+
+    def export_many():
+        start.wait()
+        for _ in range(per_thread):
+            exporter.export(Span("span", INTERNAL, "0" * 32, None))
+
+    workers = [threading.Thread(target=export_many) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    stats = exporter.stats()
+    assert stats["queued"] == 500
+    assert stats["dropped"] == threads * per_thread - 500
+    exporter.shutdown()
+    assert exporter.stats()["exported"] == 500
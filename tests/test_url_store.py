@@ -0,0 +1,60 @@
+"""Short codes must stay unique, unknown codes must not reach SQLite, and codes must persist."""
+import hashlib
+
+from fastapi.testclient import TestClient
+
+from url_store import CODE_LENGTH, ShortUrlStore, base62_encode
+
+
+def _first_code(url: str) -> str:
+    digest = hashlib.sha256(f"0:{url}".encode()).digest()
+    return base62_encode(int.from_bytes(digest[:8], "big"))[:CODE_LENGTH]
+
+
+def test_colliding_code_gets_a_new_salt(tmp_path):
+    store = ShortUrlStore(str(tmp_path / "urls.db"), 100)
+    url = "https://example.com/wanted"
+    taken = _first_code(url)
+    # Another URL already holds the code this one hashes to first
+    store._db.execute("INSERT INTO short_urls (code, url) VALUES (?, ?)", (taken, "https://example.com/other"))
+    store._db.commit()
+    store._bloom.add(taken)
+
+    code = store.shorten(url)
+    assert code != taken and len(code) == CODE_LENGTH
+    assert store.resolve(code) == url
+    assert store.resolve(taken) == "https://example.com/other"
+    assert store.shorten(f"  {url} ") == code
+
+
+def test_unknown_codes_are_rejected_by_the_bloom_filter(tmp_path):
+    store = ShortUrlStore(str(tmp_path / "urls.db"), 100)
+    store.shorten("https://example.com/")
+    assert store.resolve_cached("zzzzzzz") == (True, None)
+    assert store.resolve("zzzzzzz") is None
+    assert store.bloom_rejections == 2
+
+
+def test_codes_survive_reopening(tmp_path):
+    path = str(tmp_path / "urls.db")
+    code = ShortUrlStore(path, 100).shorten("https://example.com/kept")
+    reopened = ShortUrlStore(path, 100)
+    # Not in the new hot set, but known to the rebuilt Bloom filter
+    assert reopened.resolve_cached(code) == (False, None)
+    assert reopened.resolve(code) == "https://example.com/kept"
+    assert len(reopened) == 1
+
+
+def test_redirect_route(tmp_path, monkeypatch):
+    import enhanced_server
+
+    store = ShortUrlStore(str(tmp_path / "urls.db"), 100)
+    monkeypatch.setattr(enhanced_server, "short_urls", store)
+    client = TestClient(enhanced_server.app)
+
+    created = client.post("/shorten", json={"url": " https://example.com/page "}).json()
+    assert created["original_url"] == "https://example.com/page"
+    response = client.get(f"/s/{created['short_code']}", follow_redirects=False)
+    assert response.status_code == 302
+    assert response.headers["location"] == "https://example.com/page"
+    assert client.get("/s/missing", follow_redirects=False).status_code == 404
@@ -0,0 +1,88 @@
+"""Weather readings are cached for ttl, served stale until stale_ttl, and fetched once per city."""
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+import weather
+import weather_stub_server
+from weather import WEATHER_FIELDS, HttpWeatherProvider, WeatherService
+
+TTL, STALE_TTL = 60, 300
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(weather, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    monkeypatch.setattr(weather_stub_server, "latency", 0.1)
+    monkeypatch.setattr(weather_stub_server, "request_counts", {})
+    return weather_stub_server
+
+
+def _service():
+    provider = HttpWeatherProvider("http://stub")
+    provider._client = httpx.AsyncClient(transport=httpx.ASGITransport(app=weather_stub_server.app), base_url="http://stub")
+    return WeatherService(provider, TTL, STALE_TTL)
+
+
+def _data(reading):
+    return {field: reading[field] for field in WEATHER_FIELDS}
+
+
+async def _settle(service):
+    while service.stats()["in_flight"]:
+        await asyncio.sleep(0.01)
+
+
+def test_concurrent_misses_share_one_upstream_request(clock, stub):
+    async def scenario():
+        service = _service()
+        try:
+            readings = await asyncio.gather(*(service.get("Paris") for _ in range(5)))
+            return readings, service.stats()
+        finally:
+            await service.aclose()
+
+    readings, stats = asyncio.run(scenario())
+    assert [reading["cache"] for reading in readings] == ["miss"] * 5
+    assert all(_data(reading) == _data(readings[0]) for reading in readings)
+    assert stub.request_counts == {"paris": 1}
+    assert (stats["upstream_requests"], stats["coalesced_requests"]) == (1, 4)
+
+
+def test_fresh_stale_and_expired_readings(clock, stub):
+    async def scenario():
+        service = _service()
+        try:
+            first = await service.get("Paris")
+            clock[0] += TTL - 1
+            fresh = await service.get("paris")
+            assert stub.request_counts == {"paris": 1}
+
+            clock[0] += 2
+            stale = await service.get("Paris")
+            # The stale reading is served at once; the refresh runs behind it
+            assert stub.request_counts == {"paris": 1}
+            await _settle(service)
+            assert stub.request_counts == {"paris": 2}
+            refreshed = await service.get("Paris")
+
+            clock[0] += STALE_TTL
+            expired = await service.get("Paris")
+            return first, fresh, stale, refreshed, expired, service.stats()
+        finally:
+            await service.aclose()
+
+    first, fresh, stale, refreshed, expired, stats = asyncio.run(scenario())
+    assert [r["cache"] for r in (first, fresh, stale, refreshed, expired)] == ["miss", "hit", "stale", "hit", "miss"]
+    assert _data(stale) == _data(first)
+    assert (stale["age_seconds"], refreshed["age_seconds"]) == (TTL + 1, 0)
+    assert stub.request_counts == {"paris": 3}
+    assert (stats["upstream_requests"], stats["stale_served"]) == (3, 1)
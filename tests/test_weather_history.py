@@ -0,0 +1,39 @@
+"""Synthetic weather history must be reproducible and downsample within bounds."""
+from array import array
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from weather_history import CityClimate, WeatherHistory, _city_seed, lttb
+
+
+def test_same_seed_gives_same_history():
+    first, second = WeatherHistory(days=3, seed=7), WeatherHistory(days=3, seed=7)
+    other = WeatherHistory(days=3, seed=8)
+    end = datetime.now(timezone.utc).isoformat()
+    assert first.query("Paris", end=end)["points"] == second.query("Paris", end=end)["points"]
+    assert first.query("Paris", end=end)["points"] != other.query("Paris", end=end)["points"]
+    # A fresh climate of the same city reproduces any day, and names ignore case
+    assert first.query(" PARIS ", end=end)["points"] == first.query("Paris", end=end)["points"]
+    assert CityClimate(_city_seed(7, "paris")).day(100) == CityClimate(_city_seed(7, "paris")).day(100)
+
+
+@pytest.mark.parametrize("method", ["buckets", "lttb"])
+def test_year_query_returns_at_most_requested_points(method):
+    history = WeatherHistory(days=366, seed=1)
+    end = datetime.now(timezone.utc)
+    result = history.query(
+        "Oslo", "humidity", (end - timedelta(days=365)).isoformat(), end.isoformat(), points=200, method=method
+    )
+    assert result["source_points"] > 365 * 1440
+    assert 0 < result["returned_points"] <= 200
+    assert len(result["points"]) == result["returned_points"]
+
+
+def test_lttb_keeps_first_and_last_points():
+    values = array("f", [((i * 37) % 101) / 10 for i in range(10_000)])
+    kept = lttb(values, 50)
+    assert len(kept) == 50
+    assert kept[0] == 0 and kept[-1] == len(values) - 1
+    assert kept == sorted(set(kept))
+    assert lttb(values[:10], 50) == list(range(10))
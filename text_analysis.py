@@ -0,0 +1,258 @@
+"""Text analysis shared by the MCP tools and REST endpoints.
+
+Statistics are kept as mergeable partial counters (``TextStats``) so that
+documents can be analysed independently in worker processes and combined
+afterwards in a single reduce step.
+"""
+import codecs
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import settings
+from progress import ProgressCallback
+from workers import get_process_pool, process_pool_size
+
+WORD_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+# Below this many documents the pool round trip costs more than it saves
+MIN_PARALLEL_DOCUMENTS = 64
+# Single texts longer than this are analyzed in chunks of about this size
+TEXT_CHUNK_CHARS = 1024 * 1024
+# Streamed runs of non-whitespace longer than this are split rather than carried
+MAX_TOKEN_CHARS = 4096
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase word tokens, keeping contractions whole."""
+    return WORD_RE.findall(text.lower())
+
+
+class TextStats:
+    """Mergeable counters for one document or a whole corpus."""
+
+    __slots__ = (
+        "character_count",
+        "space_count",
+        "word_count",
+        "sentence_count",
+        "total_word_length",
+        "word_counts",
+    )
+
+    def __init__(self):
+        self.character_count = 0
+        self.space_count = 0
+        self.word_count = 0
+        self.sentence_count = 0
+        self.total_word_length = 0
+        self.word_counts = Counter()
+
+    @classmethod
+    def from_text(cls, text: str) -> "TextStats":
+        """Count one complete document."""
+        stats = cls()
+        stats.add_words(text)
+        stats.sentence_count = sum(1 for s in text.split('.') if s.strip())
+        return stats
+
+    def add_words(self, text: str) -> None:
+        """Count characters and words of text that does not split a word."""
+        words = text.split()
+        self.character_count += len(text)
+        self.space_count += text.count(' ')
+        self.word_count += len(words)
+        self.total_word_length += sum(len(word) for word in words)
+        self.word_counts.update(words)
+
+    def merge(self, other: "TextStats") -> "TextStats":
+        """Fold another partial into this one and return self."""
+        self.character_count += other.character_count
+        self.space_count += other.space_count
+        self.word_count += other.word_count
+        self.sentence_count += other.sentence_count
+        self.total_word_length += other.total_word_length
+        self.word_counts.update(other.word_counts)
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Render the statistics in the ``text_analyzer`` response format."""
+        most_common = self.word_counts.most_common(1)
+        return {
+            "character_count": self.character_count,
+            "character_count_no_spaces": self.character_count - self.space_count,
+            "word_count": self.word_count,
+            "sentence_count": self.sentence_count,
+            "average_word_length": round(self.total_word_length / self.word_count, 2) if self.word_count else 0,
+            "most_common_word": most_common[0][0] if most_common else None
+        }
+
+
+class TextStreamAnalyzer:
+    """Analyze a document that arrives in chunks of bytes.
+
+    Only the trailing, possibly incomplete word of each chunk is carried
+    over to the next one, so memory use does not grow with document size.
+    A run without whitespace longer than ``MAX_TOKEN_CHARS`` is analyzed
+    as it arrives instead of being carried, which keeps that true for
+    input that never contains whitespace.
+    """
+
+    def __init__(self, encoding: str = "utf-8"):
+        self.stats = TextStats()
+        self.bytes_received = 0
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        self._carry = ""
+        self._in_sentence = False
+
+    def feed(self, data: bytes) -> None:
+        """Consume the next chunk of raw document bytes."""
+        self.bytes_received += len(data)
+        text = self._carry + self._decoder.decode(data)
+        # Split after the last whitespace so no word straddles two chunks
+        cut = len(text)
+        while cut and not text[cut - 1].isspace():
+            cut -= 1
+        if len(text) - cut > MAX_TOKEN_CHARS:
+            cut = len(text)
+        self._carry = text[cut:]
+        self._consume(text[:cut])
+
+    def finish(self) -> TextStats:
+        """Flush buffered input and return the document statistics."""
+        self._consume(self._carry + self._decoder.decode(b"", final=True))
+        self._carry = ""
+        if self._in_sentence:
+            self.stats.sentence_count += 1
+            self._in_sentence = False
+        return self.stats
+
+    def _consume(self, text: str) -> None:
+        if not text:
+            return
+        self.stats.add_words(text)
+        segments = text.split('.')
+        # A sentence is counted when the '.' closing a non-blank segment is seen
+        self._in_sentence = self._in_sentence or bool(segments[0].strip())
+        for segment in segments[1:]:
+            if self._in_sentence:
+                self.stats.sentence_count += 1
+            self._in_sentence = bool(segment.strip())
+
+
+def analyze_text(text: str) -> Dict[str, Any]:
+    """Analyze a single text and return its statistics."""
+    return TextStats.from_text(text).to_dict()
+
+
+def _split_text(text: str, size: int) -> List[str]:
+    """Cut text into pieces of about ``size`` characters, only at whitespace."""
+    pieces = []
+    start = 0
+    while len(text) - start > size:
+        cut = start + size
+        while cut < len(text) and not text[cut].isspace():
+            cut += 1
+        pieces.append(text[start:cut])
+        start = cut
+    pieces.append(text[start:])
+    return pieces
+
+
+def _analyze_chunk(text: str) -> Tuple[TextStats, Optional[Tuple[bool, int, bool]]]:
+    """Worker entry point: word counts of a chunk plus how its '.' segments look.
+
+    The segment shape is None for a chunk without a '.', else whether the
+    first segment is non-blank, the number of non-blank inner segments and
+    whether the last segment is non-blank. That is all it takes to count
+    sentences across chunk boundaries the way ``TextStats.from_text`` does.
+    """
+    stats = TextStats()
+    stats.add_words(text)
+    segments = text.split('.')
+    if len(segments) == 1:
+        return stats, None
+    inner = sum(1 for segment in segments[1:-1] if segment.strip())
+    return stats, (bool(segments[0].strip()), inner, bool(segments[-1].strip()))
+
+
+def analyze_large_text(text: str, progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+    """Analyze one long text in chunks, in parallel when the process pool has several workers.
+
+    Gives the same statistics as ``analyze_text``; ``progress`` is called
+    with the characters analyzed so far after every chunk.
+    """
+    chunks = _split_text(text, TEXT_CHUNK_CHARS)
+    if process_pool_size() > 1 and len(chunks) > 1:
+        results = get_process_pool().map(_analyze_chunk, chunks)
+    else:
+        results = map(_analyze_chunk, chunks)
+
+    stats = TextStats()
+    in_sentence = False
+    done = 0
+    for chunk, (chunk_stats, segments) in zip(chunks, results):
+        stats.merge(chunk_stats)
+        if segments is None:
+            in_sentence = in_sentence or bool(chunk.strip())
+        else:
+            first, inner, last = segments
+            # The first segment closes the sentence that may have begun in earlier chunks
+            stats.sentence_count += (in_sentence or first) + inner
+            in_sentence = last
+        done += len(chunk)
+        if progress is not None:
+            progress(done, len(text))
+    stats.sentence_count += in_sentence
+    return stats.to_dict()
+
+
+def _analyze_shard(texts: List[str]) -> Tuple[List[Dict[str, Any]], TextStats]:
+    """Worker entry point: per-document results plus the shard's merged partial."""
+    documents = []
+    shard = TextStats()
+    for text in texts:
+        stats = TextStats.from_text(text)
+        documents.append(stats.to_dict())
+        shard.merge(stats)
+    return documents, shard
+
+
+def _shard(texts: List[str], shard_size: int) -> List[List[str]]:
+    return [texts[i:i + shard_size] for i in range(0, len(texts), shard_size)]
+
+
+def analyze_texts(texts: List[str], progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+    """Analyze many documents across the process pool.
+
+    Documents are split into contiguous shards, each worker returns the
+    per-document statistics and one merged partial for its shard, and the
+    partials are reduced into the corpus-wide statistics. ``progress`` is
+    called with the documents analyzed so far after every shard.
+    """
+    workers = process_pool_size()
+    shard_size = settings.TEXT_BATCH_SHARD_SIZE
+    if not shard_size:
+        # A few shards per worker keeps the pool busy when documents vary in size
+        shard_size = max(1, -(-len(texts) // (workers * 4)))
+
+    if workers > 1 and len(texts) >= MIN_PARALLEL_DOCUMENTS:
+        results = get_process_pool().map(_analyze_shard, _shard(texts, shard_size))
+    else:
+        workers = 1
+        results = map(_analyze_shard, _shard(texts, shard_size))
+
+    documents = []
+    corpus = TextStats()
+    for shard_documents, shard_stats in results:
+        documents.extend(shard_documents)
+        corpus.merge(shard_stats)
+        if progress is not None:
+            progress(len(documents), len(texts))
+
+    return {
+        "document_count": len(documents),
+        "documents": documents,
+        "corpus": corpus.to_dict(),
+        "workers": workers
+    }
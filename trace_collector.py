@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Stand-in trace collector for reading the server's span export locally
+
+Start the main server with TRACE_EXPORT_PATH set, send it some requests,
+then print every trace as a tree of spans followed by per-span timings:
+
+    python trace_collector.py [path] [--follow]
+
+With --follow, new traces are printed as the server writes them.
+"""
+import json
+import sys
+import time
+from collections import defaultdict
+
+from metrics import LatencyHistogram
+
+# Spans of a trace may arrive in later batches than their parent
+FOLLOW_SETTLE_SECONDS = 2.0
+
+
+def read_spans(lines):
+    """Spans of every OTLP ExportTraceServiceRequest line"""
+    for line in lines:
+        if not line.strip():
+            continue
+        for resource_spans in json.loads(line).get("resourceSpans", []):
+            for scope_spans in resource_spans.get("scopeSpans", []):
+                yield from scope_spans.get("spans", [])
+
+
+def duration_ms(span):
+    return (int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1_000_000
+
+
+def print_trace(trace_id, spans):
+    by_id = {span["spanId"]: span for span in spans}
+    children = defaultdict(list)
+    roots = []
+    for span in spans:
+        parent = span.get("parentSpanId")
+        if parent in by_id:
+            children[parent].append(span)
+        else:
+            roots.append(span)
+
+    def show(span, depth):
+        error = " ERROR" if span.get("status", {}).get("code") == 2 else ""
+        print(f"  {'  ' * depth}{span['name']}  {duration_ms(span):.2f} ms{error}")
+        for child in sorted(children[span["spanId"]], key=lambda s: int(s["startTimeUnixNano"])):
+            show(child, depth + 1)
+
+    print(f"trace {trace_id}")
+    for root in sorted(roots, key=lambda s: int(s["startTimeUnixNano"])):
+        show(root, 0)
+
+
+def print_summary(spans):
+    histograms = defaultdict(LatencyHistogram)
+    for span in spans:
+        histograms[span["name"]].record(duration_ms(span) / 1000)
+    print(f"\n{'span':<40} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name, histogram in sorted(histograms.items(), key=lambda item: -item[1].total_seconds):
+        p50, p95, p99 = (seconds * 1000 for seconds in histogram.percentiles().values())
+        print(
+            f"{name[:40]:<40} {histogram.count:>7} {p50:>9.2f} {p95:>9.2f} {p99:>9.2f} "
+            f"{histogram.max_micros / 1000:>9.2f}"
+        )
+
+
+def collect(path):
+    traces = defaultdict(list)
+    with open(path, encoding="utf-8") as f:
+        spans = list(read_spans(f))
+    for span in spans:
+        traces[span["traceId"]].append(span)
+    for trace_id, trace_spans in traces.items():
+        print_trace(trace_id, trace_spans)
+    print_summary(spans)
+
+
+def follow(path):
+    pending = defaultdict(list)
+    last_seen = {}
+    with open(path, encoding="utf-8") as f:
+        f.seek(0, 2)
+        while True:
+            line = f.readline()
+            if line:
+                for span in read_spans([line]):
+                    pending[span["traceId"]].append(span)
+                    last_seen[span["traceId"]] = time.monotonic()
+                continue
+            settled = [
+                trace_id for trace_id, seen in last_seen.items()
+                if time.monotonic() - seen >= FOLLOW_SETTLE_SECONDS
+            ]
+            for trace_id in settled:
+                print_trace(trace_id, pending.pop(trace_id))
+                del last_seen[trace_id]
+            time.sleep(0.2)
+
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if arg != "--follow"]
+    path = args[0] if args else "traces.jsonl"
+    try:
+        if "--follow" in sys.argv:
+            follow(path)
+        else:
+            collect(path)
+    except KeyboardInterrupt:
+        pass
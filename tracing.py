@@ -0,0 +1,355 @@
+"""Lightweight request tracing with a local OTLP/JSON exporter.
+
+Spans follow the OpenTelemetry data model without depending on the SDK:
+
+- ``TracingMiddleware`` opens a server span per HTTP request. It continues
+  the trace of an incoming W3C ``traceparent`` header and returns the
+  request's own ``traceparent`` in the response headers.
+- ``ToolTracingMiddleware`` opens a span per MCP tool call. It continues
+  the trace of a ``traceparent`` in the request's ``_meta``, or else the
+  span that is current, e.g. the ``call_many`` call a tool runs under. It
+  returns the call's ``traceparent`` in the result's ``_meta``.
+- ``tracer.span(...)`` marks anything else worth timing, such as executor
+  runs, store operations and response serialization.
+
+Finished spans go to ``BatchSpanExporter``, which only appends them to a
+bounded queue, so tracing never waits for I/O. A background thread writes
+them in batches to a JSON Lines file, one OTLP ``ExportTraceServiceRequest``
+per line: the format of the OpenTelemetry Collector's file exporter, which
+``trace_collector.py`` reads. When the queue is full, new spans are dropped
+and counted.
+
+With no ``TRACE_EXPORT_PATH`` configured, tracing is off and a span costs
+one attribute check.
+"""
+import collections
+import contextvars
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from fastmcp.server.middleware import Middleware, MiddlewareContext
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+import settings
+
+# OTLP span kinds
+INTERNAL = 1
+SERVER = 2
+CLIENT = 3
+
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+_in_tool_call = contextvars.ContextVar("in_tool_call", default=False)
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[Tuple[str, str]]:
+    """Trace and parent span ids of a W3C traceparent header, if it is valid."""
+    match = _TRACEPARENT_RE.match((value or "").strip().lower())
+    if match is None or match.group(1) == "0" * 32 or match.group(2) == "0" * 16:
+        return None
+    return match.group(1), match.group(2)
+
+
+def request_meta(context: MiddlewareContext) -> Dict[str, Any]:
+    """The _meta of the client's MCP request; fastmcp does not pass it on in ``context.message``."""
+    ctx = context.fastmcp_context
+    request_context = ctx.request_context if ctx is not None else None
+    meta = getattr(request_context, "meta", None)
+    return meta if isinstance(meta, dict) else {}
+
+
+def _attribute_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _attribute_value(value)} for key, value in attributes.items()]
+
+
+class Span:
+    """One timed operation within a trace."""
+
+    __slots__ = (
+        "trace_id", "span_id", "parent_span_id", "name", "kind",
+        "start_ns", "end_ns", "attributes", "status", "status_message", "events"
+    )
+
+    def __init__(self, name: str, kind: int, trace_id: str, parent_span_id: Optional[str]):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_span_id = parent_span_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes: Dict[str, Any] = {}
+        self.status = 0
+        self.status_message = ""
+        self.events: List[Dict[str, Any]] = []
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_error(self, message: str) -> None:
+        self.status = STATUS_ERROR
+        self.status_message = message
+
+    def record_exception(self, exc: BaseException) -> None:
+        self.set_error(str(exc) or type(exc).__name__)
+        self.events.append({
+            "timeUnixNano": str(time.time_ns()),
+            "name": "exception",
+            "attributes": _attributes({"exception.type": type(exc).__name__, "exception.message": str(exc)})
+        })
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": _attributes(self.attributes),
+            "status": {"code": self.status, **({"message": self.status_message} if self.status_message else {})}
+        }
+        if self.parent_span_id:
+            span["parentSpanId"] = self.parent_span_id
+        if self.events:
+            span["events"] = self.events
+        return span
+
+
+class BatchSpanExporter:
+    """Writes finished spans to an OTLP/JSON Lines file from a background thread."""
+
+    def __init__(
+        self,
+        path: str,
+        service_name: str,
+        batch_size: int = 512,
+        flush_interval: float = 1.0,
+        max_queue: int = 10_000
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self._resource = {"attributes": _attributes({"service.name": service_name})}
+        self._queue: Deque[Span] = collections.deque()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        # export() is called from the event loop and from worker threads alike
+        self._queue_lock = threading.Lock()
+        self.exported = 0
+        self.dropped = 0
+        self.batches = 0
+
+    def export(self, span: Span) -> None:
+        """Queue a finished span; never blocks."""
+        with self._queue_lock:
+            if len(self._queue) >= self.max_queue:
+                self.dropped += 1
+                return
+            self._queue.append(span)
+            queued = len(self._queue)
+        if self._thread is None:
+            self._start()
+        if queued >= self.batch_size:
+            self._wakeup.set()
+
+    def _start(self) -> None:
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self) -> None:
+        """Write out every queued span."""
+        while True:
+            with self._queue_lock:
+                batch = [self._queue.popleft() for _ in range(min(len(self._queue), self.batch_size))]
+            if not batch:
+                return
+            request = {"resourceSpans": [{
+                "resource": self._resource,
+                "scopeSpans": [{"scope": {"name": "enhanced-mcp"}, "spans": [span.to_otlp() for span in batch]}]
+            }]}
+            line = json.dumps(request, separators=(",", ":")) + "\n"
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+            self.exported += len(batch)
+            self.batches += 1
+
+    def shutdown(self) -> None:
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "queued": len(self._queue),
+            "exported": self.exported,
+            "dropped": self.dropped,
+            "batches": self.batches
+        }
+
+
+class Tracer:
+    """Creates spans and hands them to the exporter when they end."""
+
+    def __init__(self, exporter: Optional[BatchSpanExporter]):
+        self.exporter = exporter
+        self.enabled = exporter is not None
+
+    @staticmethod
+    def current() -> Optional[Span]:
+        return _current_span.get()
+
+    @contextmanager
+    def span(
+        self,
+        name: str,
+        kind: int = INTERNAL,
+        attributes: Optional[Dict[str, Any]] = None,
+        parent: Optional[Tuple[str, str]] = None
+    ) -> Iterator[Optional[Span]]:
+        """Time the enclosed block as a child of ``parent`` or of the current span."""
+        if not self.enabled:
+            yield None
+            return
+        if parent is None:
+            current = _current_span.get()
+            parent = (current.trace_id, current.span_id) if current is not None else None
+        span = Span(name, kind, parent[0] if parent else os.urandom(16).hex(), parent[1] if parent else None)
+        if attributes:
+            span.attributes.update(attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end_ns = time.time_ns()
+            self.exporter.export(span)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, **(self.exporter.stats() if self.exporter is not None else {})}
+
+
+class TracedJSONResponse(JSONResponse):
+    """JSON response whose encoding shows up as a span."""
+
+    def render(self, content: Any) -> bytes:
+        with tracer.span("serialize json"):
+            return super().render(content)
+
+
+class TracingMiddleware:
+    """Server span per HTTP request, continuing an incoming traceparent."""
+
+    def __init__(self, app: ASGIApp, tracer: Tracer):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        parent = parse_traceparent(headers.get(b"traceparent", b"").decode("latin-1"))
+        attributes = {"http.request.method": scope["method"], "url.path": scope["path"]}
+        with self.tracer.span(f"HTTP {scope['method']}", SERVER, attributes, parent) as span:
+            async def send_with_trace(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.response.status_code", message["status"])
+                    if message["status"] >= 500:
+                        span.set_error(f"HTTP {message['status']}")
+                    message = dict(message)
+                    message["headers"] = [*message.get("headers", []), (b"traceparent", span.traceparent.encode())]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_trace)
+            finally:
+                route = scope.get("route")
+                if route is not None and hasattr(route, "path"):
+                    span.name = f"HTTP {scope['method']} {route.path}"
+                    span.set_attribute("http.route", route.path)
+
+
+class ToolTracingMiddleware(Middleware):
+    """Span per MCP tool call, continuing a traceparent sent in the request _meta."""
+
+    def __init__(self, tracer: Tracer):
+        self.tracer = tracer
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next) -> Any:
+        if not self.tracer.enabled:
+            return await call_next(context)
+        tool = context.message.name
+        # Calls made by another tool share its MCP request, _meta included, and
+        # belong under that tool's span instead
+        nested = _in_tool_call.get()
+        parent = None if nested else parse_traceparent(request_meta(context).get("traceparent"))
+        token = _in_tool_call.set(True)
+        try:
+            with self.tracer.span(
+                f"tools/call {tool}", INTERNAL if nested else SERVER, {"mcp.tool.name": tool}, parent
+            ) as span:
+                result = await call_next(context)
+                if result.is_error:
+                    span.set_error("Tool returned an error")
+                # A copy, since single-flight hands the same result to several callers
+                return result.model_copy(update={"meta": {**(result.meta or {}), "traceparent": span.traceparent}})
+        finally:
+            _in_tool_call.reset(token)
+
+
+def create_tracer() -> Tracer:
+    """Tracer writing to ``settings.TRACE_EXPORT_PATH``, or a disabled one."""
+    if not settings.TRACE_EXPORT_PATH:
+        return Tracer(None)
+    return Tracer(BatchSpanExporter(
+        settings.TRACE_EXPORT_PATH,
+        settings.TRACE_SERVICE_NAME,
+        settings.TRACE_BATCH_SIZE,
+        settings.TRACE_FLUSH_INTERVAL_MS / 1000,
+        settings.TRACE_QUEUE_SIZE
+    ))
+
+
+tracer = create_tracer()
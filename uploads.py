@@ -0,0 +1,151 @@
+"""Streaming multipart uploads fed straight into the text analyzer.
+
+The request body is parsed incrementally with ``python-multipart``; file
+part data is handed to a ``TextStreamAnalyzer`` as it arrives, so nothing
+is buffered in memory or spooled to disk.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ModuleNotFoundError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+from text_analysis import TextStats, TextStreamAnalyzer
+
+# Completed uploads kept around for progress queries
+MAX_TRACKED_UPLOADS = 1000
+
+
+class UploadProgress:
+    """Progress of one upload, readable while the body is still arriving."""
+
+    def __init__(self, upload_id: str, total_bytes: Optional[int]):
+        self.upload_id = upload_id
+        self.total_bytes = total_bytes
+        self.bytes_received = 0
+        self.status = "receiving"
+        self.started_at = time.monotonic()
+        self.finished_at = None
+
+    def complete(self) -> None:
+        self.status = "completed"
+        self.finished_at = time.monotonic()
+
+    def fail(self) -> None:
+        self.status = "failed"
+        self.finished_at = time.monotonic()
+
+    def to_dict(self) -> Dict[str, Any]:
+        elapsed = (self.finished_at or time.monotonic()) - self.started_at
+        return {
+            "upload_id": self.upload_id,
+            "status": self.status,
+            "bytes_received": self.bytes_received,
+            "total_bytes": self.total_bytes,
+            "percent": round(100 * self.bytes_received / self.total_bytes, 1) if self.total_bytes else None,
+            "elapsed_seconds": round(elapsed, 3),
+            "bytes_per_second": round(self.bytes_received / elapsed) if elapsed else 0
+        }
+
+
+class UploadTracker:
+    """Bounded registry of recent uploads, keyed by upload id."""
+
+    def __init__(self, max_entries: int = MAX_TRACKED_UPLOADS):
+        self._uploads = OrderedDict()
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+
+    def start(self, upload_id: str, total_bytes: Optional[int]) -> UploadProgress:
+        progress = UploadProgress(upload_id, total_bytes)
+        with self._lock:
+            self._uploads[upload_id] = progress
+            self._uploads.move_to_end(upload_id)
+            while len(self._uploads) > self._max_entries:
+                self._uploads.popitem(last=False)
+        return progress
+
+    def get(self, upload_id: str) -> Optional[UploadProgress]:
+        return self._uploads.get(upload_id)
+
+
+class MultipartTextAnalyzer:
+    """Analyze every file part of a multipart body as its bytes are written."""
+
+    def __init__(self, content_type: str):
+        mime_type, params = parse_options_header(content_type)
+        boundary = params.get(b"boundary")
+        if mime_type != b"multipart/form-data" or not boundary:
+            raise ValueError("Expected a multipart/form-data body with a boundary")
+
+        self.files: List[Dict[str, Any]] = []
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._current: Optional[TextStreamAnalyzer] = None
+        self._parser = MultipartParser(boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+
+    def write(self, chunk: bytes) -> None:
+        """Feed the next chunk of the raw request body."""
+        self._parser.write(chunk)
+
+    def finish(self) -> Dict[str, Any]:
+        """Finalize parsing and return per-file and combined statistics."""
+        self._parser.finalize()
+        corpus = TextStats()
+        files = []
+        for entry in self.files:
+            stats = entry.pop("stats")
+            corpus.merge(stats)
+            files.append({**entry, **stats.to_dict()})
+        return {"file_count": len(files), "files": files, "corpus": corpus.to_dict()}
+
+    def _on_part_begin(self) -> None:
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        filename = options.get(b"filename")
+        # Plain form fields are skipped; only file parts are analyzed
+        self._current = TextStreamAnalyzer() if filename is not None else None
+        if self._current is not None:
+            self.files.append({
+                "filename": filename.decode("utf-8", "replace"),
+                "content_type": self._headers.get(b"content-type", b"").decode("latin-1") or None,
+                "analyzer": self._current,
+            })
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._current is not None:
+            self._current.feed(data[start:end])
+
+    def _on_part_end(self) -> None:
+        if self._current is not None:
+            entry = self.files[-1]
+            analyzer = entry.pop("analyzer")
+            entry["size_bytes"] = analyzer.bytes_received
+            entry["stats"] = analyzer.finish()
+            self._current = None
@@ -0,0 +1,126 @@
+"""Persistent URL shortener storage.
+
+Codes are base62 strings derived from a hash of the URL and checked for
+collisions before they are stored in SQLite. Lookups go through an
+in-memory LRU hot set first; a Bloom filter of every issued code rejects
+unknown codes without touching the database. ``resolve_cached`` is that
+in-memory path on its own, so async callers can answer most lookups
+inline and send only the rest to ``resolve_stored`` on a thread.
+"""
+import hashlib
+import sqlite3
+import threading
+from typing import Optional, Tuple
+from urllib.parse import urlsplit
+
+from bloom import BloomFilter
+from caching import LRUCache
+
+BASE62_ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+CODE_LENGTH = 7
+MIN_BLOOM_CAPACITY = 1024
+ALLOWED_SCHEMES = ("http", "https")
+
+
+def base62_encode(number: int) -> str:
+    if number == 0:
+        return BASE62_ALPHABET[0]
+    digits = []
+    while number:
+        number, remainder = divmod(number, 62)
+        digits.append(BASE62_ALPHABET[remainder])
+    return "".join(reversed(digits))
+
+
+def validate_url(url: str) -> str:
+    """Return the URL if it is an absolute http(s) URL, else raise ValueError."""
+    parts = urlsplit(url.strip())
+    if parts.scheme.lower() not in ALLOWED_SCHEMES or not parts.netloc:
+        raise ValueError("URL must be an absolute http or https URL")
+    return url.strip()
+
+
+class ShortUrlStore:
+    """Code to URL map persisted in SQLite with a cached read path."""
+
+    def __init__(self, db_path: str, cache_size: int):
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS short_urls ("
+            "code TEXT PRIMARY KEY, url TEXT NOT NULL UNIQUE, "
+            "created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP)"
+        )
+        self._db.commit()
+        self._lock = threading.Lock()
+        self.cache = LRUCache(cache_size)
+        self.bloom_rejections = 0
+        self._rebuild_bloom()
+
+    def _rebuild_bloom(self) -> None:
+        codes = [row[0] for row in self._db.execute("SELECT code FROM short_urls")]
+        bloom = BloomFilter(max(MIN_BLOOM_CAPACITY, 2 * len(codes)))
+        for code in codes:
+            bloom.add(code)
+        self._bloom = bloom
+
+    def __len__(self) -> int:
+        return self._bloom.count
+
+    def shorten(self, url: str) -> str:
+        """Return the code for a URL, creating one if the URL is new."""
+        url = validate_url(url)
+        with self._lock:
+            row = self._db.execute("SELECT code FROM short_urls WHERE url = ?", (url,)).fetchone()
+            if row:
+                return row[0]
+
+            salt = 0
+            while True:
+                digest = hashlib.sha256(f"{salt}:{url}".encode()).digest()
+                code = base62_encode(int.from_bytes(digest[:8], "big"))[:CODE_LENGTH]
+                # The Bloom filter answers most "is this code free?" checks without a query
+                if code not in self._bloom or not self._db.execute(
+                        "SELECT 1 FROM short_urls WHERE code = ?", (code,)).fetchone():
+                    break
+                salt += 1
+
+            self._db.execute("INSERT INTO short_urls (code, url) VALUES (?, ?)", (code, url))
+            self._db.commit()
+            if self._bloom.count >= self._bloom.capacity:
+                self._rebuild_bloom()
+            else:
+                self._bloom.add(code)
+        self.cache.put(code, url)
+        return code
+
+    def resolve(self, code: str) -> Optional[str]:
+        """Look up the URL for a code, or None if the code was never issued."""
+        answered, url = self.resolve_cached(code)
+        return url if answered else self.resolve_stored(code)
+
+    def resolve_cached(self, code: str) -> Tuple[bool, Optional[str]]:
+        """Answer from the hot set and the Bloom filter alone: ``(answered, url)``."""
+        url = self.cache.get(code)
+        if url is not None:
+            return True, url
+        if code not in self._bloom:
+            self.bloom_rejections += 1
+            return True, None
+        return False, None
+
+    def resolve_stored(self, code: str) -> Optional[str]:
+        """Look up a code in SQLite and add it to the hot set."""
+        with self._lock:
+            row = self._db.execute("SELECT url FROM short_urls WHERE code = ?", (code,)).fetchone()
+        if row is None:
+            return None
+        self.cache.put(code, row[0])
+        return row[0]
+
+    def stats(self) -> dict:
+        return {
+            "short_urls": len(self),
+            "hot_cache": self.cache.stats(),
+            "bloom_filter_bytes": self._bloom.size_bytes,
+            "bloom_rejections": self.bloom_rejections
+        }
@@ -0,0 +1,224 @@
+"""Weather lookups behind a pluggable provider.
+
+``WeatherService`` sits in front of a provider and keeps upstream traffic
+flat as tool traffic grows:
+
+- a per-city cache serves readings younger than ``ttl`` directly;
+- concurrent lookups of the same city share one upstream request;
+- readings older than ``ttl`` but younger than ``stale_ttl`` are served
+  immediately while a single background request refreshes them.
+
+The synthetic provider reports the latest minute of the deterministic
+history in ``weather_history.py``. The HTTP provider expects
+``GET {base_url}/weather?city=<name>`` to return JSON with the same fields
+the simulated provider produces (see ``weather_stub_server.py``) and reuses
+pooled keep-alive connections.
+"""
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+import random
+import time
+from typing import Any, Dict, Optional
+
+import settings
+from caching import LRUCache
+from tracing import CLIENT, tracer
+from weather_history import WeatherHistory
+
+logger = logging.getLogger(__name__)
+
+CONDITIONS = ("Sunny", "Cloudy", "Rainy", "Snowy", "Foggy")
+WEATHER_FIELDS = (
+    "current_temperature", "min_temperature", "max_temperature", "condition", "humidity", "wind_speed"
+)
+
+
+def simulated_weather() -> Dict[str, Any]:
+    """One random weather reading."""
+    temperatures = [random.randint(-10, 35) for _ in range(3)]
+    return {
+        "current_temperature": temperatures[0],
+        "min_temperature": min(temperatures),
+        "max_temperature": max(temperatures),
+        "condition": random.choice(CONDITIONS),
+        "humidity": random.randint(30, 90),
+        "wind_speed": random.randint(5, 25)
+    }
+
+
+class WeatherProvider(ABC):
+    """Source of current weather readings."""
+
+    name = "provider"
+
+    @abstractmethod
+    async def fetch(self, city: str) -> Dict[str, Any]:
+        """Current reading for a city."""
+
+    async def aclose(self) -> None:
+        pass
+
+
+class SimulatedWeatherProvider(WeatherProvider):
+    """Random readings, for running without a weather backend."""
+
+    name = "simulated"
+
+    async def fetch(self, city: str) -> Dict[str, Any]:
+        return simulated_weather()
+
+
+class SyntheticWeatherProvider(WeatherProvider):
+    """Latest readings of the synthetic weather history."""
+
+    name = "synthetic"
+
+    def __init__(self, history: WeatherHistory):
+        self.history = history
+
+    async def fetch(self, city: str) -> Dict[str, Any]:
+        # Generating a day the history has not buffered yet takes milliseconds
+        return await asyncio.to_thread(self.history.current, city)
+
+
+class HttpWeatherProvider(WeatherProvider):
+    """Readings from an HTTP weather API over a pooled async client."""
+
+    name = "http"
+
+    def __init__(self, base_url: str, timeout: float = 5.0, max_connections: int = 20):
+        import httpx
+
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        )
+
+    async def fetch(self, city: str) -> Dict[str, Any]:
+        response = await self._client.get("/weather", params={"city": city})
+        response.raise_for_status()
+        data = response.json()
+        return {field: data[field] for field in WEATHER_FIELDS}
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+class _Reading:
+    __slots__ = ("data", "fetched_at")
+
+    def __init__(self, data: Dict[str, Any], fetched_at: float):
+        self.data = data
+        self.fetched_at = fetched_at
+
+
+class WeatherService:
+    """Cached, coalesced access to a weather provider.
+
+    Must be used from a single event loop.
+    """
+
+    def __init__(self, provider: WeatherProvider, ttl: float, stale_ttl: float, cache_size: int = 10_000):
+        self.provider = provider
+        self.ttl = ttl
+        self.stale_ttl = max(stale_ttl, ttl)
+        self._cache = LRUCache(cache_size)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.upstream_requests = 0
+        self.upstream_errors = 0
+        self.coalesced = 0
+        self.stale_served = 0
+
+    async def _fetch(self, key: str, city: str) -> _Reading:
+        self.upstream_requests += 1
+        try:
+            with tracer.span("weather.fetch", CLIENT, {"weather.provider": self.provider.name, "weather.city": city}):
+                reading = _Reading(await self.provider.fetch(city), time.monotonic())
+        except Exception:
+            self.upstream_errors += 1
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        self._cache.put(key, reading)
+        return reading
+
+    def _refresh(self, key: str, city: str) -> asyncio.Task:
+        """The upstream request for a city, starting one only if none is running."""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._fetch(key, city))
+            task.add_done_callback(self._log_failure)
+            self._inflight[key] = task
+        else:
+            self.coalesced += 1
+        return task
+
+    @staticmethod
+    def _log_failure(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Weather refresh failed: %s", task.exception())
+
+    async def get(self, city: str) -> Dict[str, Any]:
+        """Weather for a city plus where it came from and how old it is."""
+        key = city.strip().lower()
+        if not key:
+            raise ValueError("City must not be empty")
+        reading: Optional[_Reading] = self._cache.get(key)
+        age = time.monotonic() - reading.fetched_at if reading is not None else None
+
+        if reading is not None and age < self.ttl:
+            cache = "hit"
+        elif reading is not None and age < self.stale_ttl:
+            # Serve what we have and let one background request catch up
+            self._refresh(key, city)
+            self.stale_served += 1
+            cache = "stale"
+        else:
+            # Shield the shared request so one cancelled caller does not
+            # cancel it for everyone else waiting on the same city
+            reading = await asyncio.shield(self._refresh(key, city))
+            age = time.monotonic() - reading.fetched_at
+            cache = "miss"
+
+        return {
+            "city": city,
+            **reading.data,
+            "source": self.provider.name,
+            "cache": cache,
+            "age_seconds": round(age, 1)
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "provider": self.provider.name,
+            "upstream_requests": self.upstream_requests,
+            "upstream_errors": self.upstream_errors,
+            "coalesced_requests": self.coalesced,
+            "stale_served": self.stale_served,
+            "in_flight": len(self._inflight),
+            "cache": self._cache.stats()
+        }
+
+    async def aclose(self) -> None:
+        for task in list(self._inflight.values()):
+            task.cancel()
+        await self.provider.aclose()
+
+
+def create_weather_service(history: Optional[WeatherHistory] = None) -> WeatherService:
+    """Weather service for the provider selected in settings."""
+    if settings.WEATHER_PROVIDER == "http":
+        provider = HttpWeatherProvider(
+            settings.WEATHER_API_URL, settings.WEATHER_TIMEOUT, settings.WEATHER_MAX_CONNECTIONS
+        )
+    elif settings.WEATHER_PROVIDER == "synthetic":
+        provider = SyntheticWeatherProvider(history or WeatherHistory(
+            settings.WEATHER_HISTORY_DAYS, settings.WEATHER_HISTORY_CITIES, settings.WEATHER_SEED
+        ))
+    elif settings.WEATHER_PROVIDER == "simulated":
+        provider = SimulatedWeatherProvider()
+    else:
+        raise ValueError(f"Unknown WEATHER_PROVIDER: {settings.WEATHER_PROVIDER}")
+    return WeatherService(provider, settings.WEATHER_CACHE_TTL, settings.WEATHER_STALE_TTL, settings.WEATHER_CACHE_SIZE)
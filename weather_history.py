@@ -0,0 +1,294 @@
+"""Deterministic synthetic weather history with downsampled range queries.
+
+Every city gets minute-level temperature, humidity and wind series derived
+only from ``(seed, city, minute)``, so any process produces the same history
+for the same city. The series combine a seasonal curve, a daily cycle,
+random hourly weather fronts and a little per-minute noise.
+
+Each city keeps the trailing ``days`` of minutes in ``array('f')`` ring
+buffers (4 bytes per value). Days are generated the first time a query
+touches them, outside the store's lock, so a query that generates a
+year of minutes does not hold up readers of days already buffered. The
+least recently used cities are dropped. Range queries
+return at most a few hundred points. They use either min/max/avg buckets
+or Largest-Triangle-Three-Buckets (LTTB), which keeps the visual shape of
+the series.
+"""
+import hashlib
+import math
+import random
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+MINUTES_PER_DAY = 1440
+METRICS = ("temperature", "humidity", "wind_speed")
+DOWNSAMPLING_METHODS = ("buckets", "lttb")
+MAX_POINTS = 5000
+NOISE_TABLE_SIZE = 4093  # prime, so the noise pattern never lines up with days
+
+# Daily cycle peaking mid-afternoon (UTC), and the fraction of the way
+# through the hour for each minute, shared by every city
+_DIURNAL = [math.cos(2 * math.pi * (minute - 15 * 60) / MINUTES_PER_DAY) for minute in range(MINUTES_PER_DAY)]
+_HOUR_FRACTION = [minute / 60 for minute in range(60)]
+
+
+def _city_seed(seed: int, city: str) -> int:
+    digest = hashlib.blake2b(f"{seed}:{city}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+class CityClimate:
+    """Climate parameters of one city and the generator for its days."""
+
+    def __init__(self, seed: int):
+        self.seed = seed
+        rng = random.Random(seed)
+        self.mean_temperature = rng.uniform(-5, 25)
+        self.seasonal_swing = rng.uniform(3, 15)
+        self.daily_swing = rng.uniform(2, 8)
+        self.mean_humidity = rng.uniform(40, 80)
+        self.mean_wind = rng.uniform(5, 20)
+        noise = [rng.uniform(-1, 1) for _ in range(NOISE_TABLE_SIZE)]
+        # Stored twice over so a day's minutes never wrap around the table
+        self.noise = noise + noise
+
+    def _front(self, hour: int) -> Tuple[float, float, float]:
+        """Temperature, humidity and wind anomalies of one hourly weather front."""
+        rng = random.Random(self.seed ^ (hour * 0x9E3779B97F4A7C15 & 0xFFFFFFFFFFFFFFFF))
+        return rng.gauss(0, 2.5), rng.gauss(0, 10), rng.gauss(0, 4)
+
+    def day(self, day: int) -> Tuple[List[float], List[float], List[float]]:
+        """Minute values of every metric for one day since the epoch."""
+        # Day 0 of the epoch was 1 January; the coldest day is mid-January
+        day_of_year = day % 365.2425
+        seasonal = self.mean_temperature - self.seasonal_swing * math.cos(2 * math.pi * (day_of_year - 15) / 365.2425)
+        fronts = [self._front(day * 24 + hour) for hour in range(25)]
+        first_noise = day * MINUTES_PER_DAY % NOISE_TABLE_SIZE
+        daily_swing = self.daily_swing
+        mean_humidity = self.mean_humidity
+        mean_wind = self.mean_wind
+
+        temperature = []
+        humidity = []
+        wind = []
+        for hour in range(24):
+            (t0, h0, w0), (t1, h1, w1) = fronts[hour], fronts[hour + 1]
+            dt, dh, dw = t1 - t0, h1 - h0, w1 - w0
+            minutes = list(zip(
+                _DIURNAL[hour * 60:hour * 60 + 60],
+                _HOUR_FRACTION,
+                self.noise[first_noise + hour * 60:first_noise + hour * 60 + 60]
+            ))
+            temperature += [seasonal + daily_swing * c + t0 + dt * f + 0.3 * n for c, f, n in minutes]
+            humidity += [min(100.0, max(5.0, mean_humidity - 8 * c + h0 + dh * f + n)) for c, f, n in minutes]
+            wind += [max(0.0, mean_wind + 2 * c + w0 + dw * f + 1.5 * n) for c, f, n in minutes]
+        return temperature, humidity, wind
+
+
+class CitySeries:
+    """Ring buffers holding the trailing days of one city's minute values."""
+
+    def __init__(self, climate: CityClimate, days: int):
+        self.climate = climate
+        self.days = days
+        self.values = {metric: array("f", bytes(4 * days * MINUTES_PER_DAY)) for metric in METRICS}
+        self.stamps = array("q", [-1] * days)
+
+    def missing_days(self, first_day: int, last_day: int) -> List[int]:
+        return [day for day in range(first_day, last_day + 1) if self.stamps[day % self.days] != day]
+
+    def store_day(self, day: int, metrics: Tuple[List[float], List[float], List[float]]) -> None:
+        slot = day % self.days
+        if self.stamps[slot] != day:
+            start = slot * MINUTES_PER_DAY
+            for metric, minutes in zip(METRICS, metrics):
+                self.values[metric][start:start + MINUTES_PER_DAY] = array("f", minutes)
+            self.stamps[slot] = day
+
+    def read(self, metric: str, first_minute: int, last_minute: int) -> array:
+        """Values for a minute range that lies inside the buffered days."""
+        values = self.values[metric]
+        size = len(values)
+        start = first_minute % size
+        count = last_minute - first_minute + 1
+        if start + count <= size:
+            return values[start:start + count]
+        return values[start:] + values[:start + count - size]
+
+
+def _bucket_aggregates(values: array, first_minute: int, width: int) -> List[Dict[str, Any]]:
+    points = []
+    for offset in range(0, len(values), width):
+        chunk = values[offset:offset + width]
+        points.append({
+            "time": _minute_iso(first_minute + offset),
+            "min": round(min(chunk), 2),
+            "max": round(max(chunk), 2),
+            "avg": round(sum(chunk) / len(chunk), 2)
+        })
+    return points
+
+
+def lttb(values: array, threshold: int) -> List[int]:
+    """Indexes of the points Largest-Triangle-Three-Buckets keeps."""
+    count = len(values)
+    if threshold >= count or threshold < 3:
+        return list(range(count))
+    every = (count - 2) / (threshold - 2)
+    selected = [0]
+    a = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * every) + 1
+        end = int((bucket + 1) * every) + 1
+        # Average of the next bucket is the third corner of the triangle
+        next_start = end
+        next_end = min(int((bucket + 2) * every) + 1, count)
+        next_chunk = values[next_start:next_end]
+        avg_x = (next_start + next_end - 1) / 2
+        avg_y = sum(next_chunk) / len(next_chunk)
+        ya = values[a]
+        # Twice the triangle area is |(xa - xc)(yb - ya) - (xa - xb)(yc - ya)|,
+        # which is linear in the candidate point (xb, yb)
+        dx = a - avg_x
+        dy = avg_y - ya
+        chunk = values[start:end]
+        areas = [abs(dx * (y - ya) - (a - x) * dy) for x, y in enumerate(chunk, start)]
+        a = start + areas.index(max(areas))
+        selected.append(a)
+    selected.append(count - 1)
+    return selected
+
+
+def _minute_iso(minute: int) -> str:
+    return datetime.fromtimestamp(minute * 60, timezone.utc).isoformat()
+
+
+def _parse_time(value: Optional[str], default: datetime) -> datetime:
+    if value is None:
+        return default
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid ISO 8601 time: {value}")
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+class WeatherHistory:
+    """Synthetic minute-level weather history for any number of cities."""
+
+    def __init__(self, days: int = 366, max_cities: int = 16, seed: int = 0):
+        self.days = max(2, days)  # the current reading looks back a full day
+        self.max_cities = max_cities
+        self.seed = seed
+        self._cities: "OrderedDict[str, CitySeries]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _series(self, city: str) -> CitySeries:
+        key = city.strip().lower()
+        if not key:
+            raise ValueError("City must not be empty")
+        series = self._cities.get(key)
+        if series is None:
+            series = CitySeries(CityClimate(_city_seed(self.seed, key)), self.days)
+            self._cities[key] = series
+            while len(self._cities) > self.max_cities:
+                self._cities.popitem(last=False)
+        self._cities.move_to_end(key)
+        return series
+
+    def _minutes(self, city: str, metric: str, first_minute: int, last_minute: int) -> array:
+        first_day, last_day = first_minute // MINUTES_PER_DAY, last_minute // MINUTES_PER_DAY
+        while True:
+            with self._lock:
+                series = self._series(city)
+                missing = series.missing_days(first_day, last_day)
+                if not missing:
+                    return series.read(metric, first_minute, last_minute)
+            # Generated without the lock and published one day at a time; another
+            # query may have replaced a slot meanwhile, so check again before reading
+            for day in missing:
+                metrics = series.climate.day(day)
+                with self._lock:
+                    series.store_day(day, metrics)
+
+    def query(
+        self,
+        city: str,
+        metric: str = "temperature",
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        points: int = 300,
+        method: str = "buckets"
+    ) -> Dict[str, Any]:
+        """Downsampled values of one metric between two ISO 8601 times."""
+        if metric not in METRICS:
+            raise ValueError(f"metric must be one of: {', '.join(METRICS)}")
+        if method not in DOWNSAMPLING_METHODS:
+            raise ValueError(f"method must be one of: {', '.join(DOWNSAMPLING_METHODS)}")
+        if not 3 <= points <= MAX_POINTS:
+            raise ValueError(f"points must be between 3 and {MAX_POINTS}")
+
+        now = datetime.now(timezone.utc)
+        end_time = min(_parse_time(end, now), now)
+        start_time = _parse_time(start, end_time - timedelta(days=1))
+        last_minute = int(end_time.timestamp() // 60)
+        # Only the trailing days are kept, today included
+        oldest_minute = (int(now.timestamp() // 60) // MINUTES_PER_DAY - self.days + 1) * MINUTES_PER_DAY
+        first_minute = max(int(start_time.timestamp() // 60), oldest_minute)
+        if first_minute > last_minute:
+            raise ValueError("start must be before end and within the retained history")
+
+        started = time.perf_counter()
+        values = self._minutes(city, metric, first_minute, last_minute)
+        if method == "lttb":
+            data = [
+                {"time": _minute_iso(first_minute + index), "value": round(values[index], 2)}
+                for index in lttb(values, points)
+            ]
+            resolution = None
+        else:
+            width = max(1, math.ceil(len(values) / points))
+            data = _bucket_aggregates(values, first_minute, width)
+            resolution = width * 60
+
+        return {
+            "city": city,
+            "metric": metric,
+            "method": method,
+            "start": _minute_iso(first_minute),
+            "end": _minute_iso(last_minute),
+            "source_points": len(values),
+            "returned_points": len(data),
+            "bucket_seconds": resolution,
+            "points": data,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)
+        }
+
+    def current(self, city: str) -> Dict[str, Any]:
+        """Latest reading for a city with the range of the last 24 hours."""
+        last_minute = int(time.time() // 60)
+        first_minute = last_minute - MINUTES_PER_DAY + 1
+        temperatures = self._minutes(city, "temperature", first_minute, last_minute)
+        humidity = self._minutes(city, "humidity", last_minute, last_minute)[0]
+        wind = self._minutes(city, "wind_speed", last_minute, last_minute)[0]
+        temperature = temperatures[-1]
+        if humidity > 85:
+            condition = "Snowy" if temperature < 1 else "Rainy"
+        elif humidity > 75:
+            condition = "Foggy"
+        elif humidity > 60:
+            condition = "Cloudy"
+        else:
+            condition = "Sunny"
+        return {
+            "current_temperature": round(temperature, 1),
+            "min_temperature": round(min(temperatures), 1),
+            "max_temperature": round(max(temperatures), 1),
+            "condition": condition,
+            "humidity": round(humidity),
+            "wind_speed": round(wind, 1)
+        }
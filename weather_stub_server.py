@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Stand-in weather API for local testing of the HTTP weather provider
+
+Run it, then start the main server with WEATHER_PROVIDER=http:
+
+    python weather_stub_server.py [port] [latency_ms]
+"""
+import asyncio
+import sys
+
+import uvicorn
+from fastapi import FastAPI
+
+from weather import simulated_weather
+
+app = FastAPI(title="Weather API stub")
+latency = 0.0
+request_counts = {}
+
+
+@app.get("/weather")
+async def get_weather(city: str):
+    """Random weather reading for a city, after the configured latency"""
+    request_counts[city.lower()] = request_counts.get(city.lower(), 0) + 1
+    if latency:
+        await asyncio.sleep(latency)
+    return {"city": city, **simulated_weather()}
+
+
+@app.get("/stats")
+async def get_stats():
+    """Requests received per city, to check how many reached the upstream"""
+    return {"total_requests": sum(request_counts.values()), "by_city": request_counts}
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8010
+    latency = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.0
+    uvicorn.run(app, host="127.0.0.1", port=port)
@@ -0,0 +1,61 @@
+"""Shared worker pools for CPU-bound work and blocking file system calls."""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import settings
+
+_process_pool = None
+_thread_pool = None
+_tool_thread_pool = None
+_pool_lock = threading.Lock()
+
+
+def _process_context() -> multiprocessing.context.BaseContext:
+    # By the time the pool is created the server runs several threads (thread
+    # pools, span exporter, loop watchdog, log writer), and forking a threaded
+    # process can leave workers stuck on locks held at fork time. Workers are
+    # forked from a clean single-threaded server process instead.
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Return the shared process pool, creating it on first use."""
+    global _process_pool
+    if _process_pool is None:
+        with _pool_lock:
+            if _process_pool is None:
+                _process_pool = ProcessPoolExecutor(
+                    max_workers=settings.PROCESS_POOL_WORKERS, mp_context=_process_context()
+                )
+    return _process_pool
+
+
+def process_pool_size() -> int:
+    """Number of worker processes in the shared pool."""
+    return settings.PROCESS_POOL_WORKERS
+
+
+def get_thread_pool() -> ThreadPoolExecutor:
+    """Return the shared thread pool for blocking I/O, creating it on first use."""
+    global _thread_pool
+    if _thread_pool is None:
+        with _pool_lock:
+            if _thread_pool is None:
+                _thread_pool = ThreadPoolExecutor(max_workers=settings.IO_THREAD_WORKERS, thread_name_prefix="io")
+    return _thread_pool
+
+
+def get_tool_thread_pool() -> ThreadPoolExecutor:
+    """Return the thread pool that runs offloaded tools, creating it on first use.
+
+    Kept apart from the I/O pool because tools running here may themselves
+    wait on work submitted to the I/O pool.
+    """
+    global _tool_thread_pool
+    if _tool_thread_pool is None:
+        with _pool_lock:
+            if _tool_thread_pool is None:
+                _tool_thread_pool = ThreadPoolExecutor(max_workers=settings.TOOL_THREAD_WORKERS, thread_name_prefix="tool")
+    return _tool_thread_pool